@@ -11,8 +11,44 @@ APP_VERSION = "1.0.0"
 # Clé secrète (en production, utiliser une variable d'environnement)
 SECRET_KEY = secrets.token_hex(32)
 
+# Stockage : "json" (défaut, petites installations), "segments" (un fichier par mois)
+# ou "sqlite" (WAL, lectures indexées)
+STORAGE_BACKEND = "json"
+SQLITE_FILE = "boutique.db"
+
 # Fichiers et chemins
 USERS_FILE = "users.json"
+SALES_FILE = "sales.json"
+SALES_JOURNAL_FILE = "sales.journal.jsonl"  # None pour réécrire sales.json à chaque vente
+SALES_JOURNAL_COMPACT_EVERY = 1000  # Entrées de journal avant compaction du snapshot
+SALES_COMPACTION_RATIO = 0.25  # Part d'enregistrements morts (suppressions, remplacements) déclenchant la compaction
+SALES_COMPACTION_MIN_DEAD = 100  # Enregistrements morts minimum avant compaction (petits volumes)
+SALES_SEGMENTS_DIR = "sales_segments"  # Backend "segments" : un fichier JSONL par mois + manifeste
+SALES_SEGMENT_CACHE_SIZE = 12  # Segments gardés en mémoire (les autres mois sont relus à la demande)
+SALES_COLUMNAR = False  # Ventes en mémoire sous forme colonnaire (gros historiques)
+SALES_SNAPSHOT_CHUNK_SIZE = 512  # Entrées par bloc immuable de l'index par date (copie à l'écriture)
+SALES_CHANGE_LOG_SIZE = 10000  # Changements conservés pour /api/sales/changes
+SALES_UPSERT_MAX_BATCH = 1000  # Ventes maximum par POST /api/sales
+SALES_WRITER_MAX_BATCH = 1000  # Écritures validées au maximum par commit groupé
+CACHE_REVALIDATE_INTERVAL = 0.5  # Secondes entre deux vérifications des écritures d'autres processus
+
+# Import en masse (POST /api/sales/batch, import_sales.py)
+SALES_IMPORT_CHUNK_SIZE = 5000  # Ventes par lot (une écriture de stockage par lot)
+SALES_IMPORT_WORKERS = 2  # Processus de validation (0 : validation dans le processus courant)
+SALES_IMPORT_MAX_ERRORS = 100  # Erreurs détaillées renvoyées au maximum
+
+# Pagination de /api/sales
+SALES_PAGE_DEFAULT_LIMIT = 100
+SALES_PAGE_MAX_LIMIT = 1000
+
+# Cache des réponses JSON pré-sérialisées (/api/sales, /api/sales/user)
+RESPONSE_CACHE_MAX_BYTES = 32 * 1024 * 1024
+RESPONSE_CACHE_GZIP_MIN_SIZE = 1024  # En dessous, la réponse n'est pas compressée
+
+# Flux SSE des ventes (/api/sales/stream)
+SALES_STREAM_QUEUE_SIZE = 100  # Événements en attente par client avant resynchronisation
+SALES_STREAM_KEEPALIVE = 15  # Secondes entre deux commentaires keepalive
+
 STATIC_DIR = "../fondend/static"
 TEMPLATES_DIR = "../templates/fondend"
 
@@ -22,6 +58,25 @@ COOKIE_HTTPONLY = True
 COOKIE_SECURE = False  # Mettre True en production avec HTTPS
 COOKIE_SAMESITE = "lax"
 
+# Expiration des sessions côté serveur (secondes)
+SESSION_ABSOLUTE_TIMEOUT = COOKIE_MAX_AGE  # Durée de vie maximale d'une session
+SESSION_IDLE_TIMEOUT = 2 * 3600  # Inactivité maximale
+SESSION_SWEEP_INTERVAL = 60  # Fréquence du nettoyage en arrière-plan
+
+# Stockage des sessions : "memory" (un worker) ou "sqlite" (partagé entre workers)
+SESSION_BACKEND = "memory"
+SESSION_CACHE_TTL = 2.0  # Durée du cache local des sessions partagées (secondes)
+SESSION_TOUCH_INTERVAL = 60  # Écart minimal avant de réécrire l'échéance d'inactivité
+
 # Hashage des mots de passe (bcrypt)
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+LOGIN_HASH_WORKERS = 2  # Processus dédiés à bcrypt
+LOGIN_HASH_QUEUE_LIMIT = 32  # Vérifications en attente avant de répondre 503
+
+# Limitation des tentatives de connexion (seaux à jetons)
+LOGIN_THROTTLE_USER_BURST = 5  # Tentatives consécutives par nom d'utilisateur
+LOGIN_THROTTLE_USER_RATE = 5 / 60  # Jetons rendus par seconde (5 par minute)
+LOGIN_THROTTLE_IP_BURST = 20  # Tentatives consécutives par adresse client
+LOGIN_THROTTLE_IP_RATE = 30 / 60  # Jetons rendus par seconde (30 par minute)
+LOGIN_THROTTLE_MAX_KEYS = 10000  # Seaux conservés par limiteur (LRU)
 
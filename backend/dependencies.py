@@ -0,0 +1,39 @@
+"""
+Dépendances FastAPI partagées par les routers
+- Session résolue une seule fois par requête (request.state)
+"""
+from typing import Optional
+from fastapi import Depends, HTTPException, Request
+from services import session_service
+
+
+def get_optional_user(request: Request) -> Optional[str]:
+    """
+    Récupérer l'utilisateur connecté, s'il y en a un
+    
+    Args:
+        request: Requête FastAPI
+        
+    Returns:
+        Optional[str]: Nom d'utilisateur ou None
+    """
+    session = session_service.resolve_request(request)
+    return session["username"] if session else None
+
+
+def get_current_user(username: Optional[str] = Depends(get_optional_user)) -> str:
+    """
+    Récupérer l'utilisateur connecté ou refuser la requête
+    
+    Args:
+        username: Utilisateur résolu par get_optional_user
+        
+    Returns:
+        str: Nom d'utilisateur
+        
+    Raises:
+        HTTPException: 401 si la requête n'est pas authentifiée
+    """
+    if not username:
+        raise HTTPException(status_code=401, detail="Non authentifié")
+    return username
@@ -0,0 +1,54 @@
+"""
+Import hors ligne de ventes historiques (JSONL, une vente par ligne)
+
+Usage :
+    python import_sales.py ventes.jsonl [--created-by admin] [--workers 4] [--chunk-size 5000]
+    cat ventes.jsonl | python import_sales.py -
+
+Peut tourner serveur démarré : les workers relisent les ventes écrites par un
+autre processus (journal ou SQLite, voir CACHE_REVALIDATE_INTERVAL). Avec
+--created-by, les ventes existantes d'un autre vendeur ne sont pas remplacées
+(conflits signalés).
+"""
+import argparse
+import sys
+import time
+
+from services import sales_service, SalesImporter
+from config import SALES_IMPORT_CHUNK_SIZE, SALES_IMPORT_WORKERS
+
+
+def main() -> int:
+    """Importer le fichier passé en argument"""
+    parser = argparse.ArgumentParser(description="Importer des ventes au format JSONL")
+    parser.add_argument("file", help="Fichier JSONL ('-' pour l'entrée standard)")
+    parser.add_argument("--created-by", default=None, help="Vendeur imposé à toutes les ventes")
+    parser.add_argument("--workers", type=int, default=SALES_IMPORT_WORKERS, help="Processus de validation")
+    parser.add_argument("--chunk-size", type=int, default=SALES_IMPORT_CHUNK_SIZE, help="Ventes par lot")
+    args = parser.parse_args()
+    
+    importer = SalesImporter(workers=args.workers, chunk_size=args.chunk_size)
+    started = time.monotonic()
+    try:
+        if args.file == "-":
+            report = importer.import_lines(sales_service, sys.stdin.buffer, args.created_by)
+        else:
+            with open(args.file, "rb") as f:
+                report = importer.import_lines(sales_service, f, args.created_by)
+    finally:
+        importer.shutdown()
+        sales_service.close()
+    
+    for error in report["errors"]:
+        print(f"  ❌ Ligne {error['line']}: {error['error']}")
+    for sale_id in report["conflicts"]:
+        print(f"  ❌ Vente {sale_id}: appartient à un autre vendeur")
+    print(f"✅ {report['imported']} ventes importées en {time.monotonic() - started:.1f}s")
+    if report["rejected"]:
+        print(f"⚠️  {report['rejected']} lignes rejetées")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,7 +13,7 @@ from fastapi.templating import Jinja2Templates
 from config import APP_TITLE, APP_VERSION, STATIC_DIR, TEMPLATES_DIR
 
 # Services
-from services import user_service, session_service, sales_service
+from services import user_service, session_service, sales_service, password_hasher, sales_broadcaster, sales_importer
 
 # Routers
 from routers import auth_router, pages_router, api_router
@@ -48,6 +48,9 @@ def startup_event():
     """Initialiser l'application au démarrage"""
     # Initialiser les services
     user_service.initialize()
+    session_service.start_sweeper()
+    # Ajouts et suppressions de ventes poussés aux clients du flux SSE
+    sales_service.add_listener(sales_broadcaster.publish)
     
     print(f"✅ {APP_TITLE} v{APP_VERSION} démarré avec succès")
     print(f"📁 Utilisateurs chargés : {len(user_service.load_users())}")
@@ -56,6 +59,11 @@ def startup_event():
 @app.on_event("shutdown")
 def shutdown_event():
     """Nettoyer les ressources au shutdown"""
+    session_service.stop_sweeper()
+    password_hasher.shutdown()
+    sales_importer.shutdown()
+    # Écritures en file validées avant l'arrêt
+    sales_service.close()
     print(f"🛑 {APP_TITLE} arrêté")
 
 
@@ -2,13 +2,133 @@
 Router pour l'API REST
 Routes : /api/*
 """
-from fastapi import APIRouter, Request, HTTPException
-from datetime import datetime
-from services import session_service, sales_service
-from config import APP_VERSION
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Callable, Dict, Hashable, Iterable, Iterator, List, Optional
+import asyncio
+import csv
+import hashlib
+import io
+import json
+from services import (
+    session_service, sales_service, response_cache, sales_broadcaster, sales_importer,
+    sale_from_dict, ROLLUP_PERIODS, LEADERBOARD_METRICS, period_bounds
+)
+from dependencies import get_current_user
+from config import (
+    APP_VERSION, SALES_PAGE_DEFAULT_LIMIT, SALES_PAGE_MAX_LIMIT,
+    SALES_STREAM_KEEPALIVE, SALES_UPSERT_MAX_BATCH
+)
 
 router = APIRouter(prefix="/api")
 
+# En-tête CSV identique à l'export du tableau des ventes
+EXPORT_CSV_HEADER = ["Date", "Produit", "Quantité", "Paiement", "Total (€)"]
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson",
+}
+EXPORT_CHUNK_SIZE = 500
+
+
+def _csv_rows(sales: Iterable[Dict]) -> Iterator[str]:
+    """
+    Sérialiser les ventes en CSV, par blocs de lignes
+    
+    Args:
+        sales: Ventes à exporter
+        
+    Yields:
+        str: Bloc de lignes CSV
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_CSV_HEADER)
+    for position, sale in enumerate(sales, start=1):
+        sale_date = str(sale.get("sale_date", ""))[:10]
+        writer.writerow([
+            "/".join(reversed(sale_date.split("-"))),
+            sale.get("product_name", ""),
+            sale.get("quantity", 0),
+            sale.get("payment_method", ""),
+            sale.get("total_price", 0),
+        ])
+        if position % EXPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _jsonl_rows(sales: Iterable[Dict]) -> Iterator[str]:
+    """
+    Sérialiser les ventes en JSONL, par blocs de lignes
+    
+    Args:
+        sales: Ventes à exporter
+        
+    Yields:
+        str: Bloc de lignes JSON
+    """
+    lines = []
+    for sale in sales:
+        lines.append(json.dumps(sale, ensure_ascii=False))
+        if len(lines) == EXPORT_CHUNK_SIZE:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def _conditional(request: Request, response: Response, *parts: str) -> Optional[Response]:
+    """
+    Poser l'ETag dérivé de la version des ventes et traiter If-None-Match
+    
+    Args:
+        request: Requête FastAPI
+        response: Réponse en cours (reçoit l'ETag)
+        *parts: Éléments propres à la réponse (ex. utilisateur)
+        
+    Returns:
+        Optional[Response]: Réponse 304 si le client a déjà cette version, sinon None
+    """
+    etag = 'W/"' + "-".join((sales_service.get_data_version(),) + parts) + '"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    
+    if_none_match = request.headers.get("if-none-match", "")
+    # Comparaison faible : le préfixe W/ est ignoré
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if "*" in candidates or etag.removeprefix("W/") in candidates:
+        return Response(status_code=304, headers=headers)
+    
+    response.headers.update(headers)
+    return None
+
+
+def _cached_json(request: Request, response: Response, key: Hashable, build: Callable[[], Dict]) -> Response:
+    """
+    Servir un corps JSON pré-sérialisé (compressé si le client accepte gzip)
+    
+    Args:
+        request: Requête FastAPI
+        response: Réponse en cours (en-têtes déjà posés, ex. ETag)
+        key: Clé du cache (endpoint, utilisateur, paramètres)
+        build: Fonction produisant l'objet à sérialiser en cas d'absence
+        
+    Returns:
+        Response: Réponse JSON
+    """
+    entry = response_cache.get_or_build(key, sales_service.get_data_version(), build)
+    headers = dict(response.headers)
+    body = entry.body
+    if response_cache.should_compress(entry):
+        headers["Vary"] = "Accept-Encoding"
+        if "gzip" in request.headers.get("accept-encoding", ""):
+            headers["Content-Encoding"] = "gzip"
+            body = response_cache.compressed(key, entry)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 
 @router.get("/status")
 def api_status():
@@ -22,49 +142,237 @@ def api_status():
 
 
 @router.get("/user")
-def api_user(request: Request):
+def api_user(username: str = Depends(get_current_user)):
     """Récupérer les infos de l'utilisateur connecté"""
-    if not session_service.is_logged_in(request):
-        raise HTTPException(status_code=401, detail="Non authentifié")
     return {
-        "username": session_service.get_username(request),
+        "username": username,
         "logged_in": True
     }
 
 
-@router.get("/sales")
-def api_sales(request: Request):
-    """Récupérer toutes les ventes"""
-    if not session_service.is_logged_in(request):
-        raise HTTPException(status_code=401, detail="Non authentifié")
+@router.get("/sales", dependencies=[Depends(get_current_user)])
+def api_sales(
+    request: Request,
+    response: Response,
+    limit: int = Query(SALES_PAGE_DEFAULT_LIMIT, ge=1, le=SALES_PAGE_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    start: Optional[date] = Query(None, alias="from"),
+    end: Optional[date] = Query(None, alias="to"),
+    payment: Optional[str] = None,
+    created_by: Optional[str] = None
+):
+    """Récupérer une page de ventes (pagination par curseur, plus récentes d'abord)"""
+    not_modified = _conditional(request, response)
+    if not_modified:
+        return not_modified
     
-    sales = sales_service.load_sales()
-    return {
-        "sales": sales,
-        "count": len(sales),
-        "total_revenue": sales_service.get_total_revenue()
-    }
+    def build() -> Dict:
+        try:
+            page = sales_service.get_sales_page(limit, cursor, start, end, payment, created_by)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Curseur invalide")
+        return {
+            "sales": page["sales"],
+            "next_cursor": page["next_cursor"],
+            "count": sales_service.get_sales_count(),
+            "total_revenue": sales_service.get_total_revenue()
+        }
+    
+    key = ("sales", limit, cursor, start, end, payment, created_by)
+    return _cached_json(request, response, key, build)
+
+
+@router.post("/sales")
+def api_upsert_sales(
+    sales: List[Dict[str, Any]] = Body(...),
+    username: str = Depends(get_current_user)
+):
+    """Créer ou remplacer un lot de ventes par leur id client (rejouable sans doublon)"""
+    if len(sales) > SALES_UPSERT_MAX_BATCH:
+        raise HTTPException(status_code=413, detail="Lot trop volumineux")
+    
+    # Tout le lot est validé avant la première écriture
+    try:
+        parsed = [sale_from_dict(sale, created_by=username) for sale in sales]
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Vente invalide : {e}")
+    
+    result = sales_service.upsert_sales(parsed, owner=username)
+    result["version"] = sales_service.get_data_version()
+    return result
+
+
+@router.post("/sales/batch")
+async def api_import_sales(request: Request, username: str = Depends(get_current_user)):
+    """Importer des ventes en masse (corps JSONL lu en streaming, une vente par ligne)"""
+    return await sales_importer.import_stream(sales_service, request.stream(), created_by=username)
+
+
+@router.get("/sales/changes", dependencies=[Depends(get_current_user)])
+def api_sales_changes(since: Optional[str] = None):
+    """Récupérer les ventes modifiées depuis une version (synchronisation différentielle)"""
+    try:
+        return sales_service.get_changes(since)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Version invalide")
 
 
 @router.get("/sales/user")
-def api_user_sales(request: Request):
+def api_user_sales(request: Request, response: Response, username: str = Depends(get_current_user)):
     """Récupérer les ventes de l'utilisateur connecté"""
-    if not session_service.is_logged_in(request):
-        raise HTTPException(status_code=401, detail="Non authentifié")
+    # L'utilisateur fait partie de l'ETag : même URL, contenu propre à chacun
+    user_tag = hashlib.sha256(username.encode()).hexdigest()[:12]
+    not_modified = _conditional(request, response, user_tag)
+    if not_modified:
+        return not_modified
+    
+    def build() -> Dict:
+        summary = sales_service.get_user_summary(username)
+        return {
+            "sales": sales_service.get_sales_by_user(username),
+            "count": summary["count"],
+            "total_revenue": summary["total_revenue"]
+        }
+    
+    return _cached_json(request, response, ("sales/user", username), build)
+
+
+@router.get("/sales/export", dependencies=[Depends(get_current_user)])
+def api_sales_export(
+    format: str = "csv",
+    period: str = "all",
+    start: Optional[date] = Query(None, alias="from"),
+    end: Optional[date] = Query(None, alias="to"),
+    payment: Optional[str] = None,
+    created_by: Optional[str] = None
+):
+    """Exporter les ventes en CSV ou JSONL (réponse en streaming)"""
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="Format invalide")
+    
+    try:
+        period_start, period_end = period_bounds(period, date.today())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Période invalide")
+    
+    # Les bornes explicites from/to priment sur la période
+    sales = sales_service.iter_sales(start or period_start, end or period_end, payment, created_by)
+    rows = _csv_rows(sales) if format == "csv" else _jsonl_rows(sales)
+    return StreamingResponse(
+        rows,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="ventes_{period}.{format}"'}
+    )
+
+
+@router.get("/sales/search", dependencies=[Depends(get_current_user)])
+def api_sales_search(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(SALES_PAGE_DEFAULT_LIMIT, ge=1, le=SALES_PAGE_MAX_LIMIT),
+    cursor: Optional[str] = None
+):
+    """Rechercher des ventes par produit ou client (préfixes, sans accents ni casse)"""
+    not_modified = _conditional(request, response)
+    if not_modified:
+        return not_modified
+    
+    def build() -> Dict:
+        try:
+            return sales_service.search_sales(q, limit, cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Curseur invalide")
+    
+    return _cached_json(request, response, ("sales/search", q, limit, cursor), build)
+
+
+@router.get("/sales/top", dependencies=[Depends(get_current_user)])
+def api_sales_top(
+    request: Request,
+    response: Response,
+    by: str = "revenue",
+    n: int = Query(10, ge=1, le=100),
+    period: str = "all",
+    start: Optional[date] = Query(None, alias="from"),
+    end: Optional[date] = Query(None, alias="to")
+):
+    """Classer les meilleurs produits et clients (CA, quantité ou nombre de ventes)"""
+    if by not in LEADERBOARD_METRICS:
+        raise HTTPException(status_code=400, detail="Critère invalide")
+    try:
+        period_start, period_end = period_bounds(period, date.today())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Période invalide")
+    
+    # Les bornes explicites from/to priment sur la période
+    start, end = start or period_start, end or period_end
+    # Bornes résolues dans l'ETag et la clé : "day" ou "month" changent de sens avec la date
+    bounds = f"{start or ''}~{end or ''}"
+    not_modified = _conditional(request, response, bounds)
+    if not_modified:
+        return not_modified
+    
+    def build() -> Dict:
+        return {"by": by, "period": period, **sales_service.get_top(by, n, start, end)}
+    
+    return _cached_json(request, response, ("sales/top", by, n, period, bounds), build)
+
+
+@router.get("/sales/rollups", dependencies=[Depends(get_current_user)])
+def api_sales_rollups(
+    period: str = "day",
+    start: Optional[date] = Query(None, alias="from"),
+    end: Optional[date] = Query(None, alias="to")
+):
+    """Récupérer le CA et le nombre de ventes par période (jour/semaine/mois/année)"""
+    if period not in ROLLUP_PERIODS:
+        raise HTTPException(status_code=400, detail="Période invalide")
     
-    username = session_service.get_username(request)
-    sales = sales_service.get_sales_by_user(username)
     return {
-        "sales": sales,
-        "count": len(sales)
+        "period": period,
+        "rollups": sales_service.get_rollups(period, start, end)
     }
 
 
-@router.get("/sales/{sale_id}")
-def api_sale_detail(sale_id: str, request: Request):
+@router.get("/sales/storage", dependencies=[Depends(get_current_user)])
+def api_sales_storage():
+    """Récupérer l'état du stockage des ventes (enregistrements morts, compactions)"""
+    return sales_service.get_storage_stats()
+
+
+@router.get("/sales/stream", dependencies=[Depends(get_current_user)])
+async def api_sales_stream():
+    """Recevoir les ventes ajoutées et supprimées en temps réel (Server-Sent Events)"""
+    async def events() -> AsyncIterator[str]:
+        # Abonnement au début du flux : rien à libérer si le client part avant
+        queue = sales_broadcaster.subscribe()
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), SALES_STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    # Commentaire SSE : garde la connexion ouverte à travers les proxies
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event['sale'], ensure_ascii=False)}\n\n"
+        finally:
+            sales_broadcaster.unsubscribe(queue)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/sales/{sale_id}", dependencies=[Depends(get_current_user)])
+def api_sale_detail(sale_id: str, request: Request, response: Response):
     """Récupérer les détails d'une vente"""
-    if not session_service.is_logged_in(request):
-        raise HTTPException(status_code=401, detail="Non authentifié")
+    not_modified = _conditional(request, response)
+    if not_modified:
+        return not_modified
     
     sale = sales_service.get_sale_by_id(sale_id)
     if not sale:
@@ -2,10 +2,14 @@
 Router pour l'authentification
 Routes : /login, /logout
 """
-from fastapi import APIRouter, Request, Form
+from fastapi import APIRouter, Depends, Request, Form
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
-from services import user_service, session_service
+import math
+from typing import Optional
+from services import user_service, session_service, login_throttle, PasswordHasherBusyError
+from dependencies import get_optional_user
 from config import TEMPLATES_DIR, COOKIE_MAX_AGE, COOKIE_HTTPONLY, COOKIE_SECURE, COOKIE_SAMESITE
 
 router = APIRouter()
@@ -13,33 +17,56 @@ templates = Jinja2Templates(directory=TEMPLATES_DIR)
 
 
 @router.get("/login", response_class=HTMLResponse)
-def page_login(request: Request):
+def page_login(request: Request, username: Optional[str] = Depends(get_optional_user)):
     """Page de connexion"""
-    if session_service.is_logged_in(request):
+    if username:
         return RedirectResponse(url="/", status_code=302)
     return templates.TemplateResponse("login.html", {"request": request, "error": None})
 
 
 @router.post("/login")
-def do_login(request: Request, username: str = Form(...), password: str = Form(...)):
-    """Traitement de la connexion"""
+async def do_login(request: Request, username: str = Form(...), password: str = Form(...)):
+    """Traitement de la connexion (bcrypt dans le pool de processus dédié, lectures de stockage
+    dans le pool de threads : la boucle asyncio n'est jamais bloquée)"""
     
-    # Vérifier si l'utilisateur existe
-    if not user_service.user_exists(username):
+    # Limiter les tentatives avant tout calcul bcrypt
+    client_address = request.client.host if request.client else "unknown"
+    retry_after = login_throttle.check(username, client_address)
+    if retry_after:
+        return templates.TemplateResponse(
+            "login.html",
+            {"request": request, "error": "Trop de tentatives, veuillez réessayer plus tard"},
+            status_code=429,
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+    
+    # Une seule lecture du stockage (hors boucle asyncio) : None si l'utilisateur n'existe pas
+    hashed_password = await run_in_threadpool(user_service.get_password_hash, username)
+    if hashed_password is None:
         return templates.TemplateResponse(
             "login.html",
             {"request": request, "error": "Utilisateur inconnu"}
         )
     
-    # Authentifier l'utilisateur
-    if not user_service.authenticate(username, password):
+    # Authentifier l'utilisateur (refus immédiat si le pool de hashage est saturé)
+    try:
+        authenticated = await user_service.verify_password_async(password, hashed_password)
+    except PasswordHasherBusyError:
+        return templates.TemplateResponse(
+            "login.html",
+            {"request": request, "error": "Serveur occupé, veuillez réessayer"},
+            status_code=503,
+            headers={"Retry-After": "1"}
+        )
+    
+    if not authenticated:
         return templates.TemplateResponse(
             "login.html",
             {"request": request, "error": "Mot de passe incorrect"}
         )
     
     # Connexion réussie - créer une session
-    token = session_service.create_session(username)
+    token = await run_in_threadpool(session_service.create_session, username)
     response = RedirectResponse(url="/", status_code=302)
     response.set_cookie(
         key="session_token",
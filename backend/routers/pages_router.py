@@ -2,10 +2,11 @@
 Router pour les pages web
 Routes : /, /ventes
 """
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Depends, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
-from services import session_service
+from typing import Optional
+from dependencies import get_optional_user
 from config import TEMPLATES_DIR
 
 router = APIRouter()
@@ -13,23 +14,23 @@ templates = Jinja2Templates(directory=TEMPLATES_DIR)
 
 
 @router.get("/", response_class=HTMLResponse)
-def page_dashboard(request: Request):
+def page_dashboard(request: Request, username: Optional[str] = Depends(get_optional_user)):
     """Dashboard principal"""
-    if not session_service.is_logged_in(request):
+    if not username:
         return RedirectResponse(url="/login", status_code=302)
     return templates.TemplateResponse(
         "index.html",
-        {"request": request, "username": session_service.get_username(request)}
+        {"request": request, "username": username}
     )
 
 
 @router.get("/ventes", response_class=HTMLResponse)
-def page_ventes(request: Request):
+def page_ventes(request: Request, username: Optional[str] = Depends(get_optional_user)):
     """Page liste des ventes"""
-    if not session_service.is_logged_in(request):
+    if not username:
         return RedirectResponse(url="/login", status_code=302)
     return templates.TemplateResponse(
         "ventes.html",
-        {"request": request, "username": session_service.get_username(request)}
+        {"request": request, "username": username}
     )
 
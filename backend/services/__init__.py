@@ -3,7 +3,17 @@ Services de l'application (Domain-Driven Design)
 """
 from .user_service import user_service, UserService
 from .session_service import session_service, SessionService
-from .sales_service import sales_service, SalesService, Sale
+from .sales_service import sales_service, SalesService, Sale, sale_from_dict
+from .sales_columns import SalesColumns
+from .sales_rollups import ROLLUP_PERIODS, period_bounds
+from .sales_leaderboard import LEADERBOARD_METRICS
+from .password_hasher import password_hasher, PasswordHasher, PasswordHasherBusyError
+from .login_throttle import login_throttle, LoginThrottle, TokenBucketLimiter
+from .response_cache import response_cache, ResponseCache
+from .sales_events import sales_broadcaster, SalesBroadcaster
+from .sales_import import sales_importer, SalesImporter
+from .sales_writer import SalesWriter
+from .sales_compactor import SalesCompactor
 
 __all__ = [
     "user_service",
@@ -13,5 +23,24 @@ __all__ = [
     "sales_service",
     "SalesService",
     "Sale",
+    "sale_from_dict",
+    "SalesColumns",
+    "ROLLUP_PERIODS",
+    "period_bounds",
+    "LEADERBOARD_METRICS",
+    "password_hasher",
+    "PasswordHasher",
+    "PasswordHasherBusyError",
+    "login_throttle",
+    "LoginThrottle",
+    "TokenBucketLimiter",
+    "response_cache",
+    "ResponseCache",
+    "sales_broadcaster",
+    "SalesBroadcaster",
+    "sales_importer",
+    "SalesImporter",
+    "SalesWriter",
+    "SalesCompactor",
 ]
 
@@ -0,0 +1,134 @@
+"""
+Limitation des tentatives de connexion (Domain-Driven Design)
+Responsabilités :
+- Seaux à jetons par nom d'utilisateur et par adresse client
+- Nombre de seaux borné (LRU) pour une mémoire constante
+- Refus avant tout calcul bcrypt
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from config import (
+    LOGIN_THROTTLE_USER_BURST,
+    LOGIN_THROTTLE_USER_RATE,
+    LOGIN_THROTTLE_IP_BURST,
+    LOGIN_THROTTLE_IP_RATE,
+    LOGIN_THROTTLE_MAX_KEYS,
+)
+
+
+class TokenBucketLimiter:
+    """Seaux à jetons indexés par clé, dans un LRU de taille fixe"""
+    
+    def __init__(self, capacity: float, refill_rate: float, max_keys: int):
+        self.capacity = capacity
+        # Jetons rendus par seconde
+        self.refill_rate = refill_rate
+        self.max_keys = max_keys
+        # clé -> (jetons restants, dernier remplissage)
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+    
+    def _refilled(self, key: str, now: float) -> float:
+        """
+        Calculer les jetons disponibles d'un seau
+        
+        Args:
+            key: Clé du seau
+            now: Timestamp courant
+            
+        Returns:
+            float: Jetons disponibles
+        """
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return self.capacity
+        tokens, updated_at = bucket
+        return min(self.capacity, tokens + (now - updated_at) * self.refill_rate)
+    
+    def has_token(self, key: str, now: float) -> bool:
+        """
+        Vérifier qu'un jeton est disponible sans le consommer
+        
+        Args:
+            key: Clé du seau
+            now: Timestamp courant
+            
+        Returns:
+            bool: True si un jeton est disponible
+        """
+        return self._refilled(key, now) >= 1
+    
+    def consume(self, key: str, now: float) -> None:
+        """
+        Consommer un jeton (le seau le moins récemment utilisé est évincé si besoin)
+        
+        Args:
+            key: Clé du seau
+            now: Timestamp courant
+        """
+        tokens = self._refilled(key, now) - 1
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+    
+    def retry_after(self, key: str, now: float) -> float:
+        """
+        Calculer le délai avant le prochain jeton
+        
+        Args:
+            key: Clé du seau
+            now: Timestamp courant
+            
+        Returns:
+            float: Secondes à attendre
+        """
+        missing = 1 - self._refilled(key, now)
+        return max(0.0, missing / self.refill_rate)
+
+
+class LoginThrottle:
+    """Limiteur de tentatives de connexion par utilisateur et par adresse"""
+    
+    def __init__(
+        self,
+        user_limiter: Optional[TokenBucketLimiter] = None,
+        ip_limiter: Optional[TokenBucketLimiter] = None
+    ):
+        self.user_limiter = user_limiter or TokenBucketLimiter(
+            LOGIN_THROTTLE_USER_BURST, LOGIN_THROTTLE_USER_RATE, LOGIN_THROTTLE_MAX_KEYS
+        )
+        self.ip_limiter = ip_limiter or TokenBucketLimiter(
+            LOGIN_THROTTLE_IP_BURST, LOGIN_THROTTLE_IP_RATE, LOGIN_THROTTLE_MAX_KEYS
+        )
+        self._lock = threading.Lock()
+    
+    def check(self, username: str, client_address: str) -> float:
+        """
+        Enregistrer une tentative si les deux seaux le permettent
+        
+        Args:
+            username: Nom d'utilisateur saisi
+            client_address: Adresse du client
+            
+        Returns:
+            float: 0 si la tentative est autorisée, sinon secondes à attendre
+        """
+        now = time.monotonic()
+        with self._lock:
+            user_ok = self.user_limiter.has_token(username, now)
+            ip_ok = self.ip_limiter.has_token(client_address, now)
+            if not (user_ok and ip_ok):
+                return max(
+                    self.user_limiter.retry_after(username, now),
+                    self.ip_limiter.retry_after(client_address, now)
+                )
+            self.user_limiter.consume(username, now)
+            self.ip_limiter.consume(client_address, now)
+            return 0.0
+
+
+# Instance singleton du limiteur
+login_throttle = LoginThrottle()
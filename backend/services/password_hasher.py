@@ -0,0 +1,123 @@
+"""
+Hashage des mots de passe hors du threadpool (Domain-Driven Design)
+Responsabilités :
+- Exécution de bcrypt dans un pool de processus dédié (contourne le GIL)
+- File d'attente bornée : refus immédiat quand le pool est saturé
+"""
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Optional
+
+from config import LOGIN_HASH_WORKERS, LOGIN_HASH_QUEUE_LIMIT
+
+
+class PasswordHasherBusyError(Exception):
+    """Levée quand la file d'attente du pool de hashage est pleine"""
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    """Vérifier un mot de passe (exécuté dans un processus du pool)"""
+    from config import pwd_context
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def _hash(password: str) -> str:
+    """Hasher un mot de passe (exécuté dans un processus du pool)"""
+    from config import pwd_context
+    return pwd_context.hash(password)
+
+
+class PasswordHasher:
+    """Pool de processus borné pour bcrypt"""
+    
+    def __init__(self, workers: int = LOGIN_HASH_WORKERS, queue_limit: int = LOGIN_HASH_QUEUE_LIMIT):
+        self.workers = workers
+        # Tâches acceptées au maximum : en cours d'exécution + en attente
+        self.max_pending = workers + queue_limit
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """
+        Créer le pool au premier usage
+        
+        Returns:
+            ProcessPoolExecutor: Pool de processus
+        """
+        with self._lock:
+            if self._executor is None:
+                # "spawn" : pas de fork d'un processus serveur multi-thread
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+    
+    def _submit(self, fn: Callable, *args) -> Future:
+        """
+        Soumettre une tâche si une place est libre dans la file
+        
+        Args:
+            fn: Fonction à exécuter dans le pool
+            *args: Arguments de la fonction
+            
+        Returns:
+            Future: Résultat à venir
+            
+        Raises:
+            PasswordHasherBusyError: Si la file d'attente est pleine
+        """
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusyError("File de hashage pleine")
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+    
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """
+        Vérifier un mot de passe sans bloquer la boucle ni le threadpool
+        
+        Args:
+            plain_password: Mot de passe en clair
+            hashed_password: Hash du mot de passe
+            
+        Returns:
+            bool: True si le mot de passe correspond
+            
+        Raises:
+            PasswordHasherBusyError: Si la file d'attente est pleine
+        """
+        return await asyncio.wrap_future(self._submit(_verify, plain_password, hashed_password))
+    
+    async def hash(self, password: str) -> str:
+        """
+        Hasher un mot de passe dans le pool
+        
+        Args:
+            password: Mot de passe en clair
+            
+        Returns:
+            str: Hash du mot de passe
+            
+        Raises:
+            PasswordHasherBusyError: Si la file d'attente est pleine
+        """
+        return await asyncio.wrap_future(self._submit(_hash, password))
+    
+    def shutdown(self) -> None:
+        """Arrêter le pool de processus"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+# Instance singleton du pool
+password_hasher = PasswordHasher()
@@ -0,0 +1,155 @@
+"""
+Cache des réponses JSON pré-sérialisées (Domain-Driven Design)
+Responsabilités :
+- Corps JSON encodés une seule fois par version des données
+- Variante gzip calculée à la première demande
+- Éviction LRU dans un budget d'octets
+"""
+import gzip
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+from config import RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_GZIP_MIN_SIZE
+
+try:
+    import orjson
+except ImportError:  # Encodeur rapide optionnel
+    orjson = None
+
+
+def encode_json(payload: Any) -> bytes:
+    """
+    Encoder un objet en JSON compact (UTF-8)
+    
+    Args:
+        payload: Objet sérialisable
+        
+    Returns:
+        bytes: Corps JSON
+    """
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class CachedResponse:
+    """Corps JSON encodé et sa variante gzip éventuelle"""
+    
+    __slots__ = ("body", "gzip_body")
+    
+    def __init__(self, body: bytes):
+        self.body = body
+        self.gzip_body: Optional[bytes] = None
+    
+    @property
+    def size(self) -> int:
+        """Octets occupés par les corps"""
+        return len(self.body) + len(self.gzip_body or b"")
+
+
+class ResponseCache:
+    """Cache LRU de corps JSON, vidé dès que la version des données change"""
+    
+    def __init__(
+        self,
+        max_bytes: int = RESPONSE_CACHE_MAX_BYTES,
+        gzip_min_size: int = RESPONSE_CACHE_GZIP_MIN_SIZE
+    ):
+        self.max_bytes = max_bytes
+        self.gzip_min_size = gzip_min_size
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._version: Optional[str] = None
+        self._size = 0
+        self._lock = threading.Lock()
+    
+    def _sync_version(self, version: str) -> None:
+        """Vider le cache si les données ont changé (appelé sous verrou)"""
+        if version != self._version:
+            self._entries.clear()
+            self._size = 0
+            self._version = version
+    
+    def _evict(self) -> None:
+        """Évincer les entrées les moins récemment utilisées (appelé sous verrou)"""
+        while self._size > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self._size -= entry.size
+    
+    def get_or_build(self, key: Hashable, version: str, build: Callable[[], Any]) -> CachedResponse:
+        """
+        Récupérer un corps encodé, ou le construire et l'encoder
+        
+        Args:
+            key: Clé de la réponse (endpoint, utilisateur, paramètres)
+            version: Version courante des données
+            build: Fonction produisant l'objet à encoder
+            
+        Returns:
+            CachedResponse: Corps encodé
+        """
+        with self._lock:
+            self._sync_version(version)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        
+        # Construction hors verrou : deux requêtes simultanées peuvent encoder deux fois
+        entry = CachedResponse(encode_json(build()))
+        with self._lock:
+            # Données modifiées entre-temps : le corps est servi mais pas conservé
+            if version == self._version and entry.size <= self.max_bytes and key not in self._entries:
+                self._entries[key] = entry
+                self._size += entry.size
+                self._evict()
+        return entry
+    
+    def should_compress(self, entry: CachedResponse) -> bool:
+        """
+        Indiquer si un corps est assez gros pour être compressé
+        
+        Args:
+            entry: Corps encodé
+            
+        Returns:
+            bool: True si la variante gzip vaut la peine
+        """
+        return len(entry.body) >= self.gzip_min_size
+    
+    def compressed(self, key: Hashable, entry: CachedResponse) -> bytes:
+        """
+        Obtenir la variante gzip d'un corps (calculée une seule fois)
+        
+        Args:
+            key: Clé de la réponse
+            entry: Corps encodé
+            
+        Returns:
+            bytes: Corps compressé
+        """
+        if entry.gzip_body is None:
+            gzip_body = gzip.compress(entry.body, compresslevel=6)
+            with self._lock:
+                if entry.gzip_body is None:
+                    entry.gzip_body = gzip_body
+                    if self._entries.get(key) is entry:
+                        self._size += len(gzip_body)
+                        self._evict()
+        return entry.gzip_body
+    
+    def clear(self) -> None:
+        """Vider le cache"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+    
+    @property
+    def size(self) -> int:
+        """Octets occupés par le cache"""
+        return self._size
+
+
+# Instance singleton du cache
+response_cache = ResponseCache()
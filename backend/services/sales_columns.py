@@ -0,0 +1,322 @@
+"""
+Stockage colonnaire des ventes en mémoire
+Responsabilités :
+- Colonnes numériques dans des tableaux typés (array)
+- Colonnes texte répétitives encodées par dictionnaire
+- Agrégations calculées directement sur les colonnes
+- Suppressions par pierre tombale (ligne marquée morte), lignes mortes retirées par compaction
+"""
+from array import array
+from collections.abc import MutableMapping
+from itertools import compress
+from typing import Dict, Iterator, List
+
+
+# Colonnes numériques : nom -> (type array, type Python attendu)
+NUMERIC_COLUMNS = {
+    "quantity": ("q", int),
+    "unit_price": ("d", float),
+    "total_price": ("d", float),
+}
+
+# Colonnes texte encodées par dictionnaire (peu de valeurs distinctes)
+ENCODED_COLUMNS = ("product_name", "customer_name", "created_by", "payment_method")
+
+# Ordre des clés d'une vente reconstituée (celui du modèle Sale)
+SALE_FIELDS = (
+    "id", "product_name", "quantity", "unit_price", "total_price",
+    "customer_name", "sale_date", "created_by", "payment_method",
+)
+
+# Marqueur d'une clé absente de la vente d'origine
+_MISSING = object()
+
+
+def _coerce(value, expected_type: type):
+    """
+    Convertir une valeur numérique vers le type de sa colonne
+    
+    Args:
+        value: Valeur d'origine
+        expected_type: int ou float
+        
+    Returns:
+        Valeur convertie, ou 0 si la conversion perdrait de l'information
+    """
+    try:
+        converted = expected_type(value)
+    except (TypeError, ValueError, OverflowError):
+        return 0
+    return converted if converted == value else 0
+
+
+class StringDictionary:
+    """Encodage dictionnaire : chaque valeur distincte est stockée une seule fois"""
+    
+    def __init__(self):
+        self.values: List[str] = []
+        self._codes: Dict[str, int] = {}
+    
+    def encode(self, value: str) -> int:
+        """
+        Obtenir le code d'une valeur (créé au premier usage)
+        
+        Args:
+            value: Valeur texte
+            
+        Returns:
+            int: Code de la valeur
+        """
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self._codes[value] = code
+            self.values.append(value)
+        return code
+
+
+class ColumnsState:
+    """
+    Colonnes et index des lignes, publiés ensemble
+    
+    Un lecteur sans verrou prend l'état une fois et n'y lit que des lignes publiées :
+    une ligne est ajoutée à toutes les colonnes avant d'apparaître dans rows, et la
+    compaction construit un nouvel état remplacé en une seule affectation.
+    """
+    
+    __slots__ = ("ids", "dates", "numeric", "codes", "rows", "live", "extras", "tombstones")
+    
+    def __init__(self):
+        self.ids: List[str] = []
+        # Les dates restent des chaînes : ce sont les mêmes objets que les clés
+        # de l'index par date, les encoder ne libérerait aucune mémoire
+        self.dates: List[str] = []
+        self.numeric = {name: array(typecode) for name, (typecode, _) in NUMERIC_COLUMNS.items()}
+        self.codes = {name: array("I") for name in ENCODED_COLUMNS}
+        # id -> numéro de ligne (lignes vivantes seulement)
+        self.rows: Dict[str, int] = {}
+        # 1 par ligne vivante, 0 par pierre tombale : une suppression ne déplace aucune ligne
+        self.live = bytearray()
+        # Valeurs hors schéma par ligne (clés inconnues, types inattendus, clés absentes)
+        self.extras: Dict[int, Dict] = {}
+        self.tombstones = 0
+
+
+class SalesColumns(MutableMapping):
+    """Ventes indexées par id, stockées colonne par colonne (ordre d'insertion conservé)"""
+    
+    def __init__(self):
+        self._dictionaries = {name: StringDictionary() for name in ENCODED_COLUMNS}
+        self._state = ColumnsState()
+    
+    @property
+    def tombstones(self) -> int:
+        """Lignes mortes en attente de compaction"""
+        return self._state.tombstones
+    
+    def __len__(self) -> int:
+        return len(self._state.rows)
+    
+    def __iter__(self) -> Iterator[str]:
+        state = self._state
+        return compress(state.ids, state.live)
+    
+    def __contains__(self, sale_id) -> bool:
+        return sale_id in self._state.rows
+    
+    def __getitem__(self, sale_id: str) -> Dict:
+        state = self._state
+        row = state.rows[sale_id]
+        sale = {}
+        for field in SALE_FIELDS:
+            if field == "id":
+                sale[field] = state.ids[row]
+            elif field == "sale_date":
+                sale[field] = state.dates[row]
+            elif field in state.numeric:
+                sale[field] = state.numeric[field][row]
+            else:
+                sale[field] = self._dictionaries[field].values[state.codes[field][row]]
+        
+        extras = state.extras.get(row)
+        if extras:
+            for key, value in extras.items():
+                if value is _MISSING:
+                    del sale[key]
+                else:
+                    sale[key] = value
+        return sale
+    
+    def __setitem__(self, sale_id: str, sale: Dict) -> None:
+        state = self._state
+        row = len(state.ids)
+        extras = {key: value for key, value in sale.items() if key not in SALE_FIELDS}
+        if sale.get("id") != sale_id:
+            extras["id"] = sale.get("id", _MISSING)
+        
+        sale_date = sale.get("sale_date", _MISSING)
+        if not isinstance(sale_date, str):
+            extras["sale_date"] = sale_date
+            sale_date = ""
+        
+        numeric = []
+        for name, (_, expected_type) in NUMERIC_COLUMNS.items():
+            value = sale.get(name, _MISSING)
+            if type(value) is not expected_type:
+                # Type inattendu : valeur d'origine conservée à part
+                extras[name] = value
+                value = _coerce(value, expected_type)
+            numeric.append((name, value))
+        
+        codes = []
+        for name in ENCODED_COLUMNS:
+            value = sale.get(name, _MISSING)
+            if not isinstance(value, str):
+                extras[name] = value
+                value = ""
+            codes.append((name, self._dictionaries[name].encode(value)))
+        
+        # Ligne complète dans toutes les colonnes avant d'être publiée dans rows
+        state.ids.append(sale_id)
+        state.dates.append(sale_date)
+        for name, value in numeric:
+            state.numeric[name].append(value)
+        for name, code in codes:
+            state.codes[name].append(code)
+        if extras:
+            state.extras[row] = extras
+        state.live.append(1)
+        previous = state.rows.get(sale_id)
+        # Remplacement : les lecteurs voient l'ancienne ou la nouvelle ligne, jamais aucune
+        state.rows[sale_id] = row
+        if previous is not None:
+            self._bury(state, previous)
+    
+    def __delitem__(self, sale_id: str) -> None:
+        # Pierre tombale : coût constant, la ligne est retirée à la prochaine compaction
+        state = self._state
+        self._bury(state, state.rows.pop(sale_id))
+    
+    @staticmethod
+    def _bury(state: ColumnsState, row: int) -> None:
+        """
+        Marquer une ligne morte (déjà retirée de rows)
+        
+        Args:
+            state: État des colonnes
+            row: Numéro de la ligne
+        """
+        state.live[row] = 0
+        state.tombstones += 1
+    
+    def clear(self) -> None:
+        """Vider toutes les colonnes (les dictionnaires d'encodage sont conservés)"""
+        self._state = ColumnsState()
+    
+    def compact(self) -> int:
+        """
+        Retirer les lignes mortes (nouvel état recopié puis publié en une affectation)
+        
+        Les écritures doivent être suspendues pendant l'appel ; les lectures non.
+        
+        Returns:
+            int: Nombre de pierres tombales retirées
+        """
+        state = self._state
+        reclaimed = state.tombstones
+        if not reclaimed:
+            return 0
+        live = state.live
+        compacted = ColumnsState()
+        compacted.ids = list(compress(state.ids, live))
+        compacted.dates = list(compress(state.dates, live))
+        compacted.numeric = {
+            name: array(column.typecode, compress(column, live)) for name, column in state.numeric.items()
+        }
+        compacted.codes = {
+            name: array(column.typecode, compress(column, live)) for name, column in state.codes.items()
+        }
+        compacted.rows = {sale_id: row for row, sale_id in enumerate(compacted.ids)}
+        compacted.live = bytearray(b"\x01") * len(compacted.ids)
+        # Valeurs hors schéma renumérotées avec leurs lignes
+        compacted.extras = {
+            compacted.rows[state.ids[row]]: extras
+            for row, extras in state.extras.items() if live[row]
+        }
+        self._state = compacted
+        return reclaimed
+    
+    def total(self, column: str = "total_price") -> float:
+        """
+        Sommer une colonne numérique
+        
+        Args:
+            column: Nom de la colonne
+            
+        Returns:
+            float: Somme de la colonne
+        """
+        state = self._state
+        return sum(compress(state.numeric[column], state.live))
+    
+    def sum_by(self, key: str, column: str = "total_price") -> Dict[str, float]:
+        """
+        Sommer une colonne numérique par valeur d'une colonne encodée
+        
+        Args:
+            key: Colonne de regroupement (encodée)
+            column: Colonne à sommer
+            
+        Returns:
+            Dict[str, float]: Valeur de regroupement -> somme
+        """
+        totals = [0.0] * len(self._dictionaries[key].values)
+        state = self._state
+        live = state.live
+        for code, value in zip(compress(state.codes[key], live), compress(state.numeric[column], live)):
+            totals[code] += value
+        return self._decode_groups(key, totals, self._count_by_code(key))
+    
+    def count_by(self, key: str) -> Dict[str, int]:
+        """
+        Compter les ventes par valeur d'une colonne encodée
+        
+        Args:
+            key: Colonne de regroupement (encodée)
+            
+        Returns:
+            Dict[str, int]: Valeur de regroupement -> nombre de ventes
+        """
+        counts = self._count_by_code(key)
+        return self._decode_groups(key, counts, counts)
+    
+    def _count_by_code(self, key: str) -> List[int]:
+        """
+        Compter les ventes par code d'une colonne encodée
+        
+        Args:
+            key: Colonne de regroupement (encodée)
+            
+        Returns:
+            List[int]: Nombre de ventes pour chaque code
+        """
+        counts = [0] * len(self._dictionaries[key].values)
+        state = self._state
+        for code in compress(state.codes[key], state.live):
+            counts[code] += 1
+        return counts
+    
+    def _decode_groups(self, key: str, values: List, counts: List[int]) -> Dict:
+        """
+        Associer des résultats par code aux valeurs décodées (groupes vides exclus)
+        
+        Args:
+            key: Colonne de regroupement (encodée)
+            values: Résultat pour chaque code
+            counts: Nombre de ventes pour chaque code
+            
+        Returns:
+            Dict: Valeur décodée -> résultat
+        """
+        decoded = self._dictionaries[key].values
+        return {decoded[code]: value for code, value in enumerate(values) if counts[code]}
@@ -0,0 +1,122 @@
+"""
+Compaction des ventes en arrière-plan (Domain-Driven Design)
+Responsabilités :
+- Suppressions et remplacements laissés en pierres tombales sur le chemin des requêtes
+- Thread de compaction réveillé après les écritures, seuil vérifié hors requête
+- Statistiques des compactions (nombre, durée, enregistrements récupérés)
+"""
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+
+class SalesCompactor:
+    """Thread de compaction : réécrit le stockage quand les enregistrements morts dépassent le seuil"""
+    
+    def __init__(self, due: Callable[[], bool], compact: Callable[[], int]):
+        # due : seuil atteint ; compact : compaction, renvoie le nombre d'enregistrements récupérés
+        self._due = due
+        self._compact = compact
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        # Réveils demandés / traités (flush attend que tous soient traités)
+        self._requested = 0
+        self._checked = 0
+        # Une compaction à la fois (thread ou appel direct)
+        self._run_lock = threading.Lock()
+        self.runs = 0
+        self.running = False
+        self.reclaimed = 0
+        self.last_started: Optional[str] = None
+        self.last_duration: Optional[float] = None
+        self.last_reclaimed: Optional[int] = None
+        self.last_error: Optional[str] = None
+    
+    def notify(self) -> None:
+        """Signaler une écriture : le seuil sera vérifié par le thread de compaction"""
+        with self._condition:
+            if self._closed:
+                return
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="sales-compactor", daemon=True)
+                self._thread.start()
+            self._requested += 1
+            self._condition.notify_all()
+    
+    def run_if_due(self) -> bool:
+        """
+        Compacter immédiatement dans le thread appelant si le seuil est atteint
+        
+        Returns:
+            bool: True si une compaction a eu lieu
+        """
+        with self._run_lock:
+            if not self._due():
+                return False
+            started = time.monotonic()
+            self.running = True
+            self.last_started = datetime.now().isoformat()
+            try:
+                reclaimed = self._compact()
+            finally:
+                self.running = False
+                self.last_duration = round(time.monotonic() - started, 4)
+            self.runs += 1
+            self.reclaimed += reclaimed
+            self.last_reclaimed = reclaimed
+            self.last_error = None
+            return True
+    
+    def _run(self) -> None:
+        """Boucle du thread : les réveils arrivés pendant une compaction sont traités en une fois"""
+        while True:
+            with self._condition:
+                while self._checked == self._requested and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                target = self._requested
+            try:
+                self.run_if_due()
+            except Exception as e:
+                # Réessayée au prochain réveil ; visible dans les statistiques
+                self.last_error = str(e)
+            with self._condition:
+                self._checked = target
+                self._condition.notify_all()
+    
+    def flush(self) -> None:
+        """Attendre que les réveils déjà demandés aient été traités"""
+        with self._condition:
+            target = self._requested
+            while self._checked < target and self._thread is not None and not self._closed:
+                self._condition.wait()
+    
+    def stats(self) -> Dict:
+        """
+        Statistiques des compactions
+        
+        Returns:
+            Dict: {"runs", "running", "reclaimed", "last_started", "last_duration",
+            "last_reclaimed", "last_error"}
+        """
+        return {
+            "runs": self.runs,
+            "running": self.running,
+            "reclaimed": self.reclaimed,
+            "last_started": self.last_started,
+            "last_duration": self.last_duration,
+            "last_reclaimed": self.last_reclaimed,
+            "last_error": self.last_error,
+        }
+    
+    def close(self) -> None:
+        """Arrêter le thread (une compaction en cours se termine)"""
+        with self._condition:
+            thread, self._thread = self._thread, None
+            self._closed = True
+            self._condition.notify_all()
+        if thread is not None:
+            thread.join()
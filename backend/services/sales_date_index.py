@@ -0,0 +1,373 @@
+"""
+Index des ventes trié par date (Domain-Driven Design)
+Responsabilités :
+- Entrées (sale_date, id, vente) triées, découpées en blocs immuables
+- Copie à l'écriture : chaque modification publie une nouvelle version qui
+  partage tous les blocs non touchés avec la précédente
+- Lecteurs sans verrou sur une version figée (aucune lecture déchirée)
+- Pagination par curseur (keyset) du plus récent au plus ancien
+- Encodage opaque des curseurs
+"""
+import base64
+import json
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from itertools import accumulate
+from operator import itemgetter
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config import SALES_SNAPSHOT_CHUNK_SIZE
+
+SaleKey = Tuple[str, str]
+# Entrée de l'index : (sale_date, id, vente ou None si la vente n'est pas conservée)
+SaleEntry = Tuple[str, str, Optional[Dict]]
+
+# Tri des entrées sur la clé seule (les ventes ne sont jamais comparées)
+_entry_key = itemgetter(0, 1)
+
+
+def sale_key(sale: Dict) -> SaleKey:
+    """
+    Construire la clé de tri d'une vente
+    
+    Args:
+        sale: Vente
+        
+    Returns:
+        SaleKey: (sale_date, id)
+    """
+    sale_date = sale.get("sale_date")
+    sale_id = sale.get("id")
+    if type(sale_date) is str and type(sale_id) is str:
+        # Cas courant : pas de conversion
+        return (sale_date, sale_id)
+    return (str(sale_date or ""), str(sale_id or ""))
+
+
+def encode_cursor(key: SaleKey) -> str:
+    """
+    Encoder une clé en curseur opaque
+    
+    Args:
+        key: Clé de la dernière vente renvoyée
+        
+    Returns:
+        str: Curseur base64 URL-safe
+    """
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> SaleKey:
+    """
+    Décoder un curseur opaque
+    
+    Args:
+        cursor: Curseur reçu du client
+        
+    Returns:
+        SaleKey: Clé de la dernière vente renvoyée
+        
+    Raises:
+        ValueError: Si le curseur est invalide
+    """
+    try:
+        sale_date, sale_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Curseur invalide") from e
+    return (str(sale_date), str(sale_id))
+
+
+class DateIndexView:
+    """Version figée de l'index : blocs triés immuables, partagés entre versions"""
+    
+    __slots__ = ("chunks", "maxes", "size", "_offsets")
+    
+    def __init__(
+        self,
+        chunks: Tuple[Tuple[SaleEntry, ...], ...],
+        maxes: Optional[Tuple[SaleKey, ...]] = None,
+        size: Optional[int] = None
+    ):
+        self.chunks = chunks
+        # Clé de la dernière entrée de chaque bloc (dichotomie entre blocs)
+        self.maxes = maxes if maxes is not None else tuple(chunk[-1][:2] for chunk in chunks)
+        self.size = size if size is not None else sum(map(len, chunks))
+        self._offsets: Optional[Tuple[int, ...]] = None
+    
+    @property
+    def offsets(self) -> Tuple[int, ...]:
+        """Position globale de la première entrée de chaque bloc (calculée à la première lecture)"""
+        if self._offsets is None:
+            # Deux lecteurs concurrents calculent au pire la même valeur
+            self._offsets = tuple(accumulate(map(len, self.chunks), initial=0))
+        return self._offsets
+    
+    def __len__(self) -> int:
+        return self.size
+    
+    def position(self, key: tuple) -> int:
+        """
+        Position de la première entrée supérieure ou égale à une clé
+        
+        Args:
+            key: Clé (sale_date, id) ou préfixe (sale_date,)
+            
+        Returns:
+            int: Position globale
+        """
+        index = bisect_left(self.maxes, key)
+        if index == len(self.chunks):
+            return self.size
+        return self.offsets[index] + bisect_left(self.chunks[index], key)
+    
+    def _bounds(
+        self,
+        start: Optional[date],
+        end: Optional[date],
+        before: Optional[SaleKey] = None
+    ) -> Tuple[int, int]:
+        """
+        Positions [low, high) des entrées d'un intervalle de jours
+        
+        Args:
+            start: Premier jour inclus (optionnel)
+            end: Dernier jour inclus (optionnel)
+            before: Clé exclue à partir de laquelle s'arrêter (optionnel)
+            
+        Returns:
+            Tuple[int, int]: Positions de début (incluse) et de fin (exclue)
+        """
+        low = self.position((start.isoformat(),)) if start else 0
+        high = self.position(((end + timedelta(days=1)).isoformat(),)) if end else self.size
+        if before is not None:
+            high = min(high, self.position(before))
+        return low, high
+    
+    def iter_backward(self, low: int, high: int) -> Iterator[SaleEntry]:
+        """
+        Parcourir les entrées de high - 1 à low, bloc par bloc
+        
+        Args:
+            low: Première position incluse
+            high: Dernière position exclue
+            
+        Yields:
+            SaleEntry: Entrées de la plus récente à la plus ancienne
+        """
+        position = high - 1
+        while position >= low:
+            index = bisect_right(self.offsets, position) - 1
+            chunk, base = self.chunks[index], self.offsets[index]
+            stop = max(low - base, 0)
+            for offset in range(position - base, stop - 1, -1):
+                yield chunk[offset]
+            position = base + stop - 1
+    
+    def iter_forward(self, low: int, high: int) -> Iterator[SaleEntry]:
+        """
+        Parcourir les entrées de low à high - 1, bloc par bloc
+        
+        Args:
+            low: Première position incluse
+            high: Dernière position exclue
+            
+        Yields:
+            SaleEntry: Entrées de la plus ancienne à la plus récente
+        """
+        position = low
+        while position < high:
+            index = bisect_right(self.offsets, position) - 1
+            chunk, base = self.chunks[index], self.offsets[index]
+            stop = min(high - base, len(chunk))
+            yield from chunk[position - base:stop]
+            position = base + stop
+    
+    def page(
+        self,
+        limit: int,
+        before: Optional[SaleKey] = None,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        predicate: Optional[Callable[[SaleEntry], bool]] = None
+    ) -> Tuple[List[SaleEntry], Optional[SaleKey]]:
+        """
+        Parcourir les entrées du plus récent au plus ancien
+        
+        Args:
+            limit: Nombre maximum d'entrées
+            before: Curseur (clé exclue) à partir duquel reprendre
+            start: Premier jour inclus (optionnel)
+            end: Dernier jour inclus (optionnel)
+            predicate: Filtre supplémentaire sur les entrées (optionnel)
+            
+        Returns:
+            Tuple: (entrées de la page, clé du curseur suivant ou None)
+        """
+        page: List[SaleEntry] = []
+        for entry in self.iter_backward(*self._bounds(start, end, before)):
+            if predicate is not None and not predicate(entry):
+                continue
+            if len(page) == limit:
+                # Il reste au moins une entrée : la page suivante existe
+                return page, page[-1][:2]
+            page.append(entry)
+        return page, None
+    
+    def iter_range(self, start: Optional[date] = None, end: Optional[date] = None) -> Iterator[SaleEntry]:
+        """
+        Parcourir les entrées d'un intervalle par ordre chronologique
+        
+        Args:
+            start: Premier jour inclus (optionnel)
+            end: Dernier jour inclus (optionnel)
+            
+        Yields:
+            SaleEntry: Entrées dans l'ordre chronologique
+        """
+        return self.iter_forward(*self._bounds(start, end))
+
+
+_EMPTY_VIEW = DateIndexView(())
+
+
+class SalesDateIndex:
+    """
+    Ventes triées par date puis par ID, publiées en versions immuables
+    
+    Les écritures (sous le verrou du service) remplacent la version courante ;
+    les lecteurs travaillent sur la version obtenue par snapshot() sans verrou.
+    """
+    
+    def __init__(self, keep_sales: bool = True, chunk_size: int = SALES_SNAPSHOT_CHUNK_SIZE):
+        # False : entrées sans la vente (stockage colonnaire, relue par id)
+        self.keep_sales = keep_sales
+        self.chunk_size = chunk_size
+        self._view = _EMPTY_VIEW
+    
+    def __len__(self) -> int:
+        """Nombre d'entrées indexées"""
+        return self._view.size
+    
+    def snapshot(self) -> DateIndexView:
+        """
+        Obtenir la version courante (immuable)
+        
+        Returns:
+            DateIndexView: Version figée de l'index
+        """
+        return self._view
+    
+    def clear(self) -> None:
+        """Vider l'index"""
+        self._view = _EMPTY_VIEW
+    
+    def _entry(self, sale: Dict) -> SaleEntry:
+        """
+        Construire l'entrée d'une vente
+        
+        Args:
+            sale: Vente
+            
+        Returns:
+            SaleEntry: (sale_date, id, vente ou None)
+        """
+        sale_date, sale_id = sale_key(sale)
+        return (sale_date, sale_id, sale if self.keep_sales else None)
+    
+    def _split(self, entries: List[SaleEntry]) -> List[Tuple[SaleEntry, ...]]:
+        """
+        Découper des entrées triées en blocs d'au plus chunk_size entrées
+        
+        Args:
+            entries: Entrées triées
+            
+        Returns:
+            List[Tuple[SaleEntry, ...]]: Blocs immuables
+        """
+        return [tuple(entries[i:i + self.chunk_size]) for i in range(0, len(entries), self.chunk_size)]
+    
+    def _publish(self, view: DateIndexView, changes: Dict[int, List[Tuple[SaleEntry, ...]]]) -> None:
+        """
+        Publier une nouvelle version en remplaçant certains blocs
+        
+        Args:
+            view: Version de départ
+            changes: Position du bloc -> blocs qui le remplacent (liste vide : supprimé)
+        """
+        chunks = list(view.chunks)
+        maxes = list(view.maxes)
+        size = view.size
+        # Remplacement depuis la fin : les positions restant à traiter ne bougent pas
+        for index in sorted(changes, reverse=True):
+            replacement = changes[index]
+            size += sum(map(len, replacement)) - len(chunks[index])
+            chunks[index:index + 1] = replacement
+            maxes[index:index + 1] = [chunk[-1][:2] for chunk in replacement]
+        # Affectation atomique : les lecteurs voient l'ancienne ou la nouvelle version
+        self._view = DateIndexView(tuple(chunks), tuple(maxes), size)
+    
+    def add(self, sale: Dict) -> None:
+        """
+        Insérer une vente à sa place (seul son bloc est copié)
+        
+        Args:
+            sale: Vente ajoutée
+        """
+        self.add_many([sale])
+    
+    def add_many(self, sales: Iterable[Dict]) -> None:
+        """
+        Insérer plusieurs ventes (chaque bloc touché n'est copié qu'une fois)
+        
+        Args:
+            sales: Ventes ajoutées
+        """
+        entries = sorted(map(self._entry, sales), key=_entry_key)
+        if not entries:
+            return
+        view = self._view
+        if not view.chunks:
+            self._view = DateIndexView(tuple(self._split(entries)))
+            return
+        
+        # Répartition des nouvelles entrées par bloc de destination
+        last = len(view.chunks) - 1
+        targets: Dict[int, List[SaleEntry]] = {}
+        for entry in entries:
+            index = min(bisect_left(view.maxes, entry[:2]), last)
+            targets.setdefault(index, []).append(entry)
+        
+        changes = {}
+        for index, added in targets.items():
+            merged = list(view.chunks[index])
+            for entry in added:
+                merged.insert(bisect_left(merged, entry[:2]), entry)
+            # Bloc découpé seulement au double de la taille cible (pas de blocs d'une entrée)
+            changes[index] = [tuple(merged)] if len(merged) <= 2 * self.chunk_size else self._split(merged)
+        self._publish(view, changes)
+    
+    def remove(self, sale: Dict) -> None:
+        """
+        Retirer une vente de l'index
+        
+        Args:
+            sale: Vente supprimée
+        """
+        key = sale_key(sale)
+        view = self._view
+        index = bisect_left(view.maxes, key)
+        if index == len(view.chunks):
+            return
+        chunk = view.chunks[index]
+        position = bisect_left(chunk, key)
+        if position < len(chunk) and chunk[position][:2] == key:
+            remaining = chunk[:position] + chunk[position + 1:]
+            self._publish(view, {index: [remaining] if remaining else []})
+    
+    def page(self, *args, **kwargs) -> Tuple[List[SaleEntry], Optional[SaleKey]]:
+        """Paginer sur la version courante (voir DateIndexView.page)"""
+        return self._view.page(*args, **kwargs)
+    
+    def iter_range(self, start: Optional[date] = None, end: Optional[date] = None) -> Iterator[SaleEntry]:
+        """Parcourir la version courante par ordre chronologique (voir DateIndexView.iter_range)"""
+        return self._view.iter_range(start, end)
@@ -0,0 +1,91 @@
+"""
+Diffusion des changements de ventes (Domain-Driven Design)
+Responsabilités :
+- Un seul diffuseur asyncio pour tous les clients connectés
+- Publication thread-safe depuis le threadpool (routes synchrones)
+- Files bornées : un client trop lent est invité à se resynchroniser
+"""
+import asyncio
+import threading
+from typing import Dict, Optional, Set
+
+from config import SALES_STREAM_QUEUE_SIZE
+
+
+class SalesBroadcaster:
+    """Diffuseur des événements de ventes vers les abonnés (flux SSE)"""
+    
+    def __init__(self, queue_size: int = SALES_STREAM_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+    
+    def subscribe(self) -> asyncio.Queue:
+        """
+        Abonner un client (à appeler depuis la boucle asyncio)
+        
+        Returns:
+            asyncio.Queue: File des événements du client
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._subscribers.add(queue)
+        return queue
+    
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        """
+        Désabonner un client
+        
+        Args:
+            queue: File renvoyée par subscribe
+        """
+        with self._lock:
+            self._subscribers.discard(queue)
+    
+    def publish(self, event_type: str, sale: Dict) -> None:
+        """
+        Publier un événement (appelable depuis n'importe quel thread)
+        
+        Args:
+            event_type: "created", "updated", "deleted" ou "resync"
+            sale: Vente concernée (seulement l'id pour une suppression)
+        """
+        with self._lock:
+            loop = self._loop
+            if loop is None or not self._subscribers:
+                return
+        event = {"type": event_type, "sale": sale}
+        try:
+            loop.call_soon_threadsafe(self._dispatch, event)
+        except RuntimeError:
+            # Boucle arrêtée (shutdown)
+            pass
+    
+    def _dispatch(self, event: Dict) -> None:
+        """
+        Copier l'événement dans la file de chaque abonné (exécuté dans la boucle)
+        
+        Args:
+            event: Événement à diffuser
+        """
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for queue in subscribers:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Client en retard : ses événements sont remplacés par une resynchronisation
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"type": "resync", "sale": None})
+    
+    @property
+    def subscribers_count(self) -> int:
+        """Nombre de clients abonnés"""
+        return len(self._subscribers)
+
+
+# Instance singleton du diffuseur
+sales_broadcaster = SalesBroadcaster()
@@ -0,0 +1,264 @@
+"""
+Import en masse des ventes (Domain-Driven Design)
+Responsabilités :
+- Lecture de ventes au format JSONL, par lots de lignes
+- Validation des lots en parallèle dans un pool de processus
+- Écriture lot par lot pendant la validation des lots suivants
+"""
+import asyncio
+import json
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import AsyncIterator, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config import SALES_IMPORT_CHUNK_SIZE, SALES_IMPORT_WORKERS, SALES_IMPORT_MAX_ERRORS
+from .sales_service import Sale, SalesService, sale_from_dict
+
+# Lot de lignes : (numéro de la première ligne, lignes)
+LineBatch = Tuple[int, List[bytes]]
+
+
+def parse_sales_lines(
+    lines: List[bytes],
+    first_line: int,
+    created_by: Optional[str] = None
+) -> Tuple[List[Sale], List[Dict]]:
+    """
+    Valider un lot de lignes JSONL (exécuté dans un processus du pool)
+    
+    Args:
+        lines: Lignes du lot
+        first_line: Numéro de la première ligne (pour les erreurs)
+        created_by: Vendeur imposé (sinon lu dans chaque vente)
+        
+    Returns:
+        Tuple: Ventes valides et erreurs {"line", "error"}
+    """
+    sales: List[Sale] = []
+    errors: List[Dict] = []
+    for offset, line in enumerate(lines):
+        if not line.strip():
+            continue
+        try:
+            sales.append(sale_from_dict(json.loads(line), created_by))
+        except ValueError as e:
+            errors.append({"line": first_line + offset, "error": str(e)})
+    return sales, errors
+
+
+def _batches(lines: Iterable[bytes], chunk_size: int) -> Iterator[LineBatch]:
+    """
+    Regrouper des lignes en lots numérotés
+    
+    Args:
+        lines: Lignes JSONL
+        chunk_size: Lignes par lot
+        
+    Yields:
+        LineBatch: Lots de lignes
+    """
+    batch: List[bytes] = []
+    first_line = 1
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= chunk_size:
+            yield first_line, batch
+            first_line += len(batch)
+            batch = []
+    if batch:
+        yield first_line, batch
+
+
+async def _abatches(body: AsyncIterator[bytes], chunk_size: int) -> AsyncIterator[LineBatch]:
+    """
+    Découper un corps de requête en streaming en lots de lignes numérotés
+    
+    Args:
+        body: Morceaux du corps de requête
+        chunk_size: Lignes par lot
+        
+    Yields:
+        LineBatch: Lots de lignes
+    """
+    batch: List[bytes] = []
+    first_line = 1
+    buffer = b""
+    async for data in body:
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        batch.extend(lines)
+        while len(batch) >= chunk_size:
+            yield first_line, batch[:chunk_size]
+            first_line += chunk_size
+            batch = batch[chunk_size:]
+    if buffer:
+        batch.append(buffer)
+    if batch:
+        yield first_line, batch
+
+
+class SalesImporter:
+    """Import JSONL validé en parallèle et écrit par lots"""
+    
+    def __init__(
+        self,
+        workers: int = SALES_IMPORT_WORKERS,
+        chunk_size: int = SALES_IMPORT_CHUNK_SIZE,
+        max_errors: int = SALES_IMPORT_MAX_ERRORS
+    ):
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+        # Lots validés d'avance au maximum (mémoire bornée)
+        self.max_pending = max(workers, 1) * 2
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+    
+    def _submit(self, batch: LineBatch, created_by: Optional[str]) -> Future:
+        """
+        Valider un lot dans le pool (ou immédiatement si workers = 0)
+        
+        Args:
+            batch: Lot de lignes
+            created_by: Vendeur imposé
+            
+        Returns:
+            Future: (ventes valides, erreurs)
+        """
+        first_line, lines = batch
+        if self.workers <= 0:
+            future: Future = Future()
+            future.set_result(parse_sales_lines(lines, first_line, created_by))
+            return future
+        
+        with self._lock:
+            if self._executor is None:
+                # "spawn" : pas de fork d'un processus serveur multi-thread
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor.submit(parse_sales_lines, lines, first_line, created_by)
+    
+    def _new_report(self) -> Dict:
+        """Compte rendu vide d'un import"""
+        return {"imported": 0, "rejected": 0, "errors": [], "conflicts": []}
+    
+    def _record_errors(self, report: Dict, errors: List[Dict]) -> None:
+        """
+        Ajouter les erreurs d'un lot au compte rendu
+        
+        Args:
+            report: Compte rendu de l'import
+            errors: Erreurs du lot
+        """
+        report["rejected"] += len(errors)
+        room = self.max_errors - len(report["errors"])
+        if room > 0:
+            report["errors"].extend(errors[:room])
+    
+    def _record_conflicts(self, report: Dict, conflicts: List[str]) -> None:
+        """
+        Ajouter au compte rendu les ventes d'un autre vendeur non remplacées
+        
+        Args:
+            report: Compte rendu de l'import
+            conflicts: Ids ignorés du lot
+        """
+        report["rejected"] += len(conflicts)
+        room = self.max_errors - len(report["conflicts"])
+        if room > 0:
+            report["conflicts"].extend(conflicts[:room])
+    
+    def import_lines(
+        self,
+        service: SalesService,
+        lines: Iterable[bytes],
+        created_by: Optional[str] = None
+    ) -> Dict:
+        """
+        Importer des lignes JSONL (ligne de commande)
+        
+        Args:
+            service: Service de ventes cible
+            lines: Lignes JSONL
+            created_by: Vendeur imposé (sinon lu dans chaque vente) ; les ventes existantes
+                d'un autre vendeur ne sont alors pas remplacées
+                
+        Returns:
+            Dict: {"imported": int, "rejected": int, "errors": List[Dict], "conflicts": List[str]}
+        """
+        report = self._new_report()
+        pending: Deque[Future] = deque()
+        
+        def commit(future: Future) -> None:
+            sales, errors = future.result()
+            self._record_errors(report, errors)
+            conflicts: List[str] = []
+            report["imported"] += service.add_sales(sales, self.chunk_size, False, created_by, conflicts)
+            self._record_conflicts(report, conflicts)
+        
+        # Les lots suivants sont validés pendant l'écriture du lot courant
+        for batch in _batches(lines, self.chunk_size):
+            pending.append(self._submit(batch, created_by))
+            if len(pending) >= self.max_pending:
+                commit(pending.popleft())
+        while pending:
+            commit(pending.popleft())
+        
+        service.compact_if_needed()
+        return report
+    
+    async def import_stream(
+        self,
+        service: SalesService,
+        body: AsyncIterator[bytes],
+        created_by: Optional[str] = None
+    ) -> Dict:
+        """
+        Importer un corps de requête JSONL reçu en streaming
+        
+        Args:
+            service: Service de ventes cible
+            body: Morceaux du corps de requête
+            created_by: Vendeur imposé ; les ventes existantes d'un autre vendeur ne sont
+                pas remplacées (comme POST /api/sales)
+                
+        Returns:
+            Dict: {"imported": int, "rejected": int, "errors": List[Dict], "conflicts": List[str]}
+        """
+        report = self._new_report()
+        pending: Deque[Future] = deque()
+        
+        async def commit(future: Future) -> None:
+            sales, errors = await asyncio.wrap_future(future)
+            self._record_errors(report, errors)
+            conflicts: List[str] = []
+            # Écriture hors de la boucle asyncio
+            report["imported"] += await asyncio.to_thread(
+                service.add_sales, sales, self.chunk_size, False, created_by, conflicts
+            )
+            self._record_conflicts(report, conflicts)
+        
+        async for batch in _abatches(body, self.chunk_size):
+            pending.append(self._submit(batch, created_by))
+            if len(pending) >= self.max_pending:
+                await commit(pending.popleft())
+        while pending:
+            await commit(pending.popleft())
+        
+        await asyncio.to_thread(service.compact_if_needed)
+        return report
+    
+    def shutdown(self) -> None:
+        """Arrêter le pool de processus"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+# Instance singleton de l'importeur
+sales_importer = SalesImporter()
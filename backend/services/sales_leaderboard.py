@@ -0,0 +1,218 @@
+"""
+Classements des produits et des clients (Domain-Driven Design)
+Responsabilités :
+- Compteurs CA / quantité / nombre de ventes par produit et par client
+- Compteurs globaux et mensuels maintenus à chaque ajout/suppression
+- Top N par sélection partielle, sans reparcourir l'historique
+"""
+import heapq
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .sales_rollups import ROLLUP_PERIODS, sale_day
+
+# Dimensions classées : nom -> champ de la vente
+LEADERBOARD_DIMENSIONS = {
+    "products": "product_name",
+    "customers": "customer_name",
+}
+
+# Critères de classement : nom -> position dans les compteurs [revenue, quantity, count]
+LEADERBOARD_METRICS = {
+    "revenue": 0,
+    "quantity": 1,
+    "count": 2,
+}
+
+# Compteurs d'une dimension : nom (produit ou client) -> (revenue, quantity, count) ;
+# tuples remplacés à chaque modification, jamais modifiés en place (lecteurs sans verrou)
+Counters = Dict[str, Tuple[float, int, int]]
+
+_month_key = ROLLUP_PERIODS["month"]
+
+
+def _empty_counters() -> Dict[str, Counters]:
+    """Créer des compteurs vides pour chaque dimension"""
+    return {dimension: {} for dimension in LEADERBOARD_DIMENSIONS}
+
+
+def _apply(counters: Dict[str, Counters], sale: Dict, sign: int) -> None:
+    """
+    Ajouter (sign = 1) ou retirer (sign = -1) une vente des compteurs
+    
+    Args:
+        counters: Compteurs par dimension
+        sale: Vente
+        sign: 1 ou -1
+    """
+    revenue = sale.get("total_price", 0) * sign
+    quantity = sale.get("quantity", 0) * sign
+    for dimension, field in LEADERBOARD_DIMENSIONS.items():
+        name = sale.get(field)
+        if not isinstance(name, str) or not name:
+            # Vente sans client (passage en caisse) : absente du classement
+            continue
+        entries = counters[dimension]
+        entry = entries.get(name)
+        if entry is None:
+            if sign < 0:
+                continue
+            entry = (0.0, 0, 0)
+        if entry[2] + sign <= 0:
+            del entries[name]
+        else:
+            entries[name] = (entry[0] + revenue, entry[1] + quantity, entry[2] + sign)
+
+
+def _merge(target: Dict[str, Counters], source: Dict[str, Counters]) -> None:
+    """
+    Additionner des compteurs dans d'autres
+    
+    Args:
+        target: Compteurs modifiés
+        source: Compteurs ajoutés
+    """
+    for dimension, entries in source.items():
+        target_entries = target[dimension]
+        # Copie en une opération : la source peut être modifiée par un écrivain
+        for name, (revenue, quantity, count) in list(entries.items()):
+            entry = target_entries.get(name)
+            if entry is None:
+                target_entries[name] = (revenue, quantity, count)
+            else:
+                target_entries[name] = (entry[0] + revenue, entry[1] + quantity, entry[2] + count)
+
+
+def _next_month(day: date) -> date:
+    """Premier jour du mois suivant"""
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+class SalesLeaderboard:
+    """Classements maintenus à chaque ajout/suppression de vente"""
+    
+    def __init__(self):
+        self._totals = _empty_counters()
+        # Mois "YYYY-MM" -> compteurs du mois
+        self._monthly: Dict[str, Dict[str, Counters]] = {}
+    
+    def clear(self) -> None:
+        """Vider tous les compteurs"""
+        self._totals = _empty_counters()
+        self._monthly = {}
+    
+    def add(self, sale: Dict) -> None:
+        """
+        Comptabiliser une vente
+        
+        Args:
+            sale: Vente ajoutée
+        """
+        _apply(self._totals, sale, 1)
+        day = sale_day(sale)
+        if day is not None:
+            _apply(self._monthly.setdefault(_month_key(day), _empty_counters()), sale, 1)
+    
+    def remove(self, sale: Dict) -> None:
+        """
+        Retirer une vente
+        
+        Args:
+            sale: Vente supprimée
+        """
+        _apply(self._totals, sale, -1)
+        day = sale_day(sale)
+        month = self._monthly.get(_month_key(day)) if day is not None else None
+        if month is not None:
+            _apply(month, sale, -1)
+            if not any(month.values()):
+                del self._monthly[_month_key(day)]
+    
+    def _counters(
+        self,
+        start: Optional[date],
+        end: Optional[date],
+        scan: Callable[[date, date], Iterable[Dict]]
+    ) -> Dict[str, Counters]:
+        """
+        Compteurs d'une période : mois complets lus dans les compteurs mensuels,
+        jours des mois incomplets relus via scan
+        
+        Args:
+            start: Premier jour inclus (optionnel)
+            end: Dernier jour inclus (optionnel)
+            scan: Fonction renvoyant les ventes d'un intervalle de jours
+            
+        Returns:
+            Dict[str, Counters]: Compteurs par dimension
+        """
+        if start is None and end is None:
+            return self._totals
+        
+        # Premier et dernier jour couverts par des mois complets
+        full_start = start
+        if start is not None and start.day != 1:
+            full_start = _next_month(start)
+        full_end = end
+        if end is not None and _next_month(end) - timedelta(days=1) != end:
+            full_end = end.replace(day=1) - timedelta(days=1)
+        counters = _empty_counters()
+        
+        if full_start is not None and full_end is not None and full_start > full_end:
+            # Aucun mois complet (ex. jour ou semaine) : relecture des ventes de la période
+            for sale in scan(start, end):
+                _apply(counters, sale, 1)
+            return counters
+        
+        for month, month_counters in list(self._monthly.items()):
+            if (full_start is None or month >= _month_key(full_start)) and \
+                    (full_end is None or month <= _month_key(full_end)):
+                _merge(counters, month_counters)
+        if start is not None and start < full_start:
+            for sale in scan(start, full_start - timedelta(days=1)):
+                _apply(counters, sale, 1)
+        if end is not None and full_end < end:
+            for sale in scan(full_end + timedelta(days=1), end):
+                _apply(counters, sale, 1)
+        return counters
+    
+    def top(
+        self,
+        metric: str,
+        limit: int,
+        start: Optional[date],
+        end: Optional[date],
+        scan: Callable[[date, date], Iterable[Dict]]
+    ) -> Dict[str, List[Dict]]:
+        """
+        Classer les produits et les clients d'une période
+        
+        Args:
+            metric: "revenue", "quantity" ou "count"
+            limit: Nombre d'entrées par classement
+            start: Premier jour inclus (optionnel)
+            end: Dernier jour inclus (optionnel)
+            scan: Fonction renvoyant les ventes d'un intervalle de jours (mois incomplets)
+            
+        Returns:
+            Dict[str, List[Dict]]: {"products": [...], "customers": [...]} ; chaque entrée
+            {"name", "revenue", "quantity", "count"}, de la meilleure à la moins bonne
+            
+        Raises:
+            ValueError: Si le critère est inconnu
+        """
+        if metric not in LEADERBOARD_METRICS:
+            raise ValueError(f"Critère inconnu : {metric}")
+        position = LEADERBOARD_METRICS[metric]
+        
+        counters = self._counters(start, end, scan)
+        result = {}
+        for dimension, entries in counters.items():
+            # Égalité : ordre alphabétique des noms ; copie des compteurs en une opération
+            # (compteurs globaux partagés avec les écrivains)
+            best = heapq.nsmallest(limit, list(entries.items()), key=lambda item: (-item[1][position], item[0]))
+            result[dimension] = [
+                {"name": name, "revenue": round(revenue, 2), "quantity": quantity, "count": count}
+                for name, (revenue, quantity, count) in best
+            ]
+        return result
@@ -0,0 +1,175 @@
+"""
+Agrégats temporels des ventes (Domain-Driven Design)
+Responsabilités :
+- Buckets journaliers (CA et nombre de ventes, par moyen de paiement)
+- Regroupement par semaine, mois ou année à partir des buckets journaliers
+"""
+from datetime import date, timedelta
+from operator import itemgetter
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Clé de regroupement de chaque période à partir d'un jour
+ROLLUP_PERIODS: Dict[str, Callable[[date], str]] = {
+    "day": lambda d: d.isoformat(),
+    "week": lambda d: "{0}-W{1:02d}".format(*d.isocalendar()),
+    "month": lambda d: f"{d.year}-{d.month:02d}",
+    "year": lambda d: str(d.year),
+}
+
+
+def period_bounds(period: str, today: date) -> Tuple[Optional[date], Optional[date]]:
+    """
+    Calculer les bornes d'une période courante (filtres du tableau des ventes)
+    
+    Args:
+        period: "day", "week" (à partir du lundi), "month", "year" ou "all"
+        today: Jour de référence
+        
+    Returns:
+        Tuple[Optional[date], Optional[date]]: (premier jour, dernier jour) inclus
+        
+    Raises:
+        ValueError: Si la période est inconnue
+    """
+    if period == "all":
+        return None, None
+    if period == "day":
+        return today, today
+    if period == "week":
+        return today - timedelta(days=today.weekday()), today
+    if period == "month":
+        next_month = (today.replace(day=1) + timedelta(days=32)).replace(day=1)
+        return today.replace(day=1), next_month - timedelta(days=1)
+    if period == "year":
+        return today.replace(month=1, day=1), today.replace(month=12, day=31)
+    raise ValueError(f"Période inconnue : {period}")
+
+
+def sale_day(sale: Dict) -> Optional[date]:
+    """
+    Extraire le jour d'une vente à partir de sa date ISO
+    
+    Args:
+        sale: Vente
+        
+    Returns:
+        Optional[date]: Jour de la vente ou None si la date est invalide
+    """
+    try:
+        return date.fromisoformat(str(sale.get("sale_date", ""))[:10])
+    except ValueError:
+        return None
+
+
+def _empty_bucket() -> Dict:
+    """Créer un bucket vide"""
+    return {"count": 0, "revenue": 0.0, "by_payment": {}}
+
+
+def _merge_into(target: Dict, count: int, revenue: float, payment: str) -> None:
+    """
+    Ajouter (ou retirer avec des valeurs négatives) une contribution à un bucket
+    
+    Args:
+        target: Bucket à modifier
+        count: Nombre de ventes
+        revenue: Chiffre d'affaires
+        payment: Moyen de paiement
+    """
+    target["count"] += count
+    target["revenue"] += revenue
+    by_payment = target["by_payment"].setdefault(payment, {"count": 0, "revenue": 0.0})
+    by_payment["count"] += count
+    by_payment["revenue"] += revenue
+    if by_payment["count"] <= 0:
+        del target["by_payment"][payment]
+
+
+def _merged(bucket: Dict, count: int, revenue: float, payment: str) -> Dict:
+    """
+    Construire un nouveau bucket avec une contribution en plus (ou en moins)
+    
+    Le bucket d'origine n'est pas modifié : un lecteur concurrent le voit entier.
+    
+    Args:
+        bucket: Bucket de départ
+        count: Nombre de ventes
+        revenue: Chiffre d'affaires
+        payment: Moyen de paiement
+        
+    Returns:
+        Dict: Nouveau bucket
+    """
+    by_payment = dict(bucket["by_payment"])
+    values = by_payment.get(payment) or {"count": 0, "revenue": 0.0}
+    if values["count"] + count <= 0:
+        by_payment.pop(payment, None)
+    else:
+        by_payment[payment] = {"count": values["count"] + count, "revenue": values["revenue"] + revenue}
+    return {"count": bucket["count"] + count, "revenue": bucket["revenue"] + revenue, "by_payment": by_payment}
+
+
+class DailyRollups:
+    """Buckets journaliers maintenus à chaque ajout/suppression de vente"""
+    
+    def __init__(self):
+        # Buckets remplacés à chaque modification, jamais modifiés en place
+        self._buckets: Dict[date, Dict] = {}
+    
+    def clear(self) -> None:
+        """Vider tous les buckets"""
+        self._buckets = {}
+    
+    def add(self, sale: Dict) -> None:
+        """
+        Comptabiliser une vente dans son bucket journalier
+        
+        Args:
+            sale: Vente ajoutée
+        """
+        day = sale_day(sale)
+        if day is None:
+            return
+        bucket = self._buckets.get(day) or _empty_bucket()
+        self._buckets[day] = _merged(bucket, 1, sale.get("total_price", 0), sale.get("payment_method") or "")
+    
+    def remove(self, sale: Dict) -> None:
+        """
+        Retirer une vente de son bucket journalier
+        
+        Args:
+            sale: Vente supprimée
+        """
+        day = sale_day(sale)
+        bucket = self._buckets.get(day)
+        if bucket is None:
+            return
+        bucket = _merged(bucket, -1, -sale.get("total_price", 0), sale.get("payment_method") or "")
+        if bucket["count"] <= 0:
+            del self._buckets[day]
+        else:
+            self._buckets[day] = bucket
+    
+    def rollup(self, period: str, start: Optional[date] = None, end: Optional[date] = None) -> List[Dict]:
+        """
+        Regrouper les buckets journaliers par période
+        
+        Args:
+            period: "day", "week", "month" ou "year"
+            start: Premier jour inclus (optionnel)
+            end: Dernier jour inclus (optionnel)
+            
+        Returns:
+            List[Dict]: Une entrée par période, triées chronologiquement
+        """
+        period_key = ROLLUP_PERIODS[period]
+        periods: Dict[str, Dict] = {}
+        # Copie en une opération : lecture cohérente pendant les écritures
+        for day, bucket in sorted(list(self._buckets.items()), key=itemgetter(0)):
+            if (start is not None and day < start) or (end is not None and day > end):
+                continue
+            target = periods.setdefault(period_key(day), _empty_bucket())
+            for payment, values in bucket["by_payment"].items():
+                _merge_into(target, values["count"], values["revenue"], payment)
+        
+        return [{"period": key, **values} for key, values in periods.items()]
@@ -0,0 +1,242 @@
+"""
+Index de recherche plein texte des ventes (Domain-Driven Design)
+Responsabilités :
+- Découpage des noms de produit et de client en mots normalisés (sans accents, minuscules)
+- Index inversé mot -> ventes, maintenu à chaque ajout/suppression
+- Recherche par préfixe de chaque mot, résultats du plus récent au plus ancien
+"""
+import heapq
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from .sales_date_index import DateIndexView, SaleKey, sale_key
+
+# Champs indexés
+SEARCH_FIELDS = ("product_name", "customer_name")
+
+# Au-delà d'une vente sur DENSE_RATIO, la recherche parcourt l'index par date
+DENSE_RATIO = 8
+
+_WORD = re.compile(r"\w+")
+
+
+@lru_cache(maxsize=65536)
+def tokenize(text: str) -> Tuple[str, ...]:
+    """
+    Découper un texte en mots normalisés (accents retirés, casse ignorée)
+    
+    Les noms se répètent beaucoup d'une vente à l'autre : le résultat est mis en cache.
+    
+    Args:
+        text: Texte à découper
+        
+    Returns:
+        Tuple[str, ...]: Mots distincts, dans l'ordre d'apparition
+    """
+    decomposed = unicodedata.normalize("NFKD", text)
+    folded = "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+    return tuple(dict.fromkeys(_WORD.findall(folded)))
+
+
+def _sale_tokens(sale: Dict) -> Set[str]:
+    """
+    Mots indexés d'une vente
+    
+    Args:
+        sale: Vente
+        
+    Returns:
+        Set[str]: Mots des champs indexés
+    """
+    tokens: Set[str] = set()
+    for field in SEARCH_FIELDS:
+        value = sale.get(field)
+        if isinstance(value, str):
+            tokens.update(tokenize(value))
+    return tokens
+
+
+def _estimated_size(postings: List[Set[SaleKey]]) -> int:
+    """
+    Majorer le nombre de ventes d'un mot de la requête
+    
+    Args:
+        postings: Listes des mots correspondant au préfixe
+        
+    Returns:
+        int: Somme des tailles des listes
+    """
+    return sum(len(keys) for keys in postings)
+
+
+class SalesSearchIndex:
+    """Index inversé des ventes : mot normalisé -> clés (sale_date, id)"""
+    
+    def __init__(self):
+        self._postings: Dict[str, Set[SaleKey]] = {}
+        # Mots triés pour la recherche par préfixe (dichotomie) ; liste remplacée,
+        # jamais modifiée en place : un lecteur garde une version cohérente
+        self._words: List[str] = []
+    
+    def __len__(self) -> int:
+        """Nombre de mots distincts indexés"""
+        return len(self._words)
+    
+    def clear(self) -> None:
+        """Vider l'index"""
+        self._postings = {}
+        self._words = []
+    
+    def add(self, sale: Dict) -> None:
+        """
+        Indexer les mots d'une vente
+        
+        Args:
+            sale: Vente ajoutée
+        """
+        key = sale_key(sale)
+        for token in _sale_tokens(sale):
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = set()
+                words = self._words.copy()
+                insort(words, token)
+                self._words = words
+            postings.add(key)
+    
+    def remove(self, sale: Dict) -> None:
+        """
+        Retirer les mots d'une vente
+        
+        Args:
+            sale: Vente supprimée
+        """
+        key = sale_key(sale)
+        for token in _sale_tokens(sale):
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.discard(key)
+            if not postings:
+                del self._postings[token]
+                words = self._words.copy()
+                del words[bisect_left(words, token)]
+                self._words = words
+    
+    def _prefix_postings(self, prefix: str) -> List[Set[SaleKey]]:
+        """
+        Listes de ventes des mots commençant par un préfixe
+        
+        Args:
+            prefix: Préfixe normalisé
+            
+        Returns:
+            List[Set[SaleKey]]: Une liste par mot correspondant
+        """
+        postings = []
+        words = self._words
+        position = bisect_left(words, prefix)
+        while position < len(words) and words[position].startswith(prefix):
+            # Mot retiré depuis la lecture de la liste : ignoré
+            keys = self._postings.get(words[position])
+            if keys:
+                postings.append(keys)
+            position += 1
+        return postings
+    
+    def _candidates(self, query: str) -> List[List[Set[SaleKey]]]:
+        """
+        Listes de ventes de chaque mot de la requête, du plus sélectif au moins sélectif
+        
+        Args:
+            query: Texte recherché
+            
+        Returns:
+            List[List[Set[SaleKey]]]: Pour chaque mot, les listes des mots qu'il préfixe
+            (vide si la requête n'a aucun mot ou si un mot ne correspond à rien)
+        """
+        candidates = []
+        for prefix in tokenize(query):
+            postings = self._prefix_postings(prefix)
+            if not postings:
+                return []
+            candidates.append(postings)
+        candidates.sort(key=_estimated_size)
+        return candidates
+    
+    def matches(self, query: str) -> Set[SaleKey]:
+        """
+        Trouver les ventes contenant un mot commençant par chacun des mots de la requête
+        
+        Args:
+            query: Texte recherché (ex. "caf choc")
+            
+        Returns:
+            Set[SaleKey]: Clés des ventes correspondantes (vide si la requête n'a aucun mot)
+        """
+        candidates = self._candidates(query)
+        if not candidates:
+            return set()
+        
+        # Intersection en partant du préfixe le plus sélectif
+        result = set().union(*candidates[0])
+        for postings in candidates[1:]:
+            if len(postings) == 1:
+                result &= postings[0]
+            else:
+                result = {key for key in result if any(key in keys for keys in postings)}
+            if not result:
+                break
+        return result
+    
+    def search(
+        self,
+        query: str,
+        limit: int,
+        before: Optional[SaleKey] = None,
+        date_view: Optional[DateIndexView] = None,
+        resolve: Optional[Callable[[tuple], Optional[Dict]]] = None
+    ) -> Tuple[List[tuple], Optional[SaleKey]]:
+        """
+        Rechercher une page de ventes, de la plus récente à la plus ancienne
+        
+        Args:
+            query: Texte recherché
+            limit: Nombre maximum de clés
+            before: Renvoyer seulement les clés strictement antérieures (curseur)
+            date_view: Version de l'index par date (parcours des requêtes peu sélectives)
+            resolve: Vente d'une entrée de l'index (mots relus sur la vente lors de ce parcours)
+            
+        Returns:
+            Tuple: (clés ou entrées de l'index de la page, clé du curseur suivant ou None)
+        """
+        candidates = self._candidates(query)
+        if not candidates:
+            return [], None
+        
+        dense = _estimated_size(candidates[0]) * DENSE_RATIO >= len(date_view or ())
+        if date_view is not None and resolve is not None and dense:
+            # Requête peu sélective (ex. une seule lettre) : parcourir les ventes récentes
+            # au lieu de construire l'ensemble des correspondances ; un préfixe court
+            # pouvant couvrir des milliers de mots, ce sont les mots de la vente qui sont testés
+            prefixes = tokenize(query)
+            
+            def matches_all(entry: tuple) -> bool:
+                sale = resolve(entry)
+                if sale is None:
+                    return False
+                tokens = _sale_tokens(sale)
+                return all(any(token.startswith(prefix) for token in tokens) for prefix in prefixes)
+            
+            return date_view.page(limit, before, predicate=matches_all)
+        
+        matched = self.matches(query)
+        if before is not None:
+            matched = [key for key in matched if key < before]
+        # Sélection partielle : pas de tri complet des correspondances
+        keys = heapq.nlargest(limit + 1, matched)
+        next_key = keys[limit - 1] if len(keys) > limit else None
+        return keys[:limit], next_key
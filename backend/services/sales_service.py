@@ -5,14 +5,36 @@ Responsabilités :
 - Calculs et statistiques
 - Persistance des données de ventes
 """
-import json
-import os
-from datetime import datetime
-from typing import List, Dict, Optional
-from dataclasses import dataclass, asdict
+import math
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future
+from functools import partial
+from datetime import date, datetime
+from typing import Any, Callable, Deque, Iterable, Iterator, List, Dict, MutableMapping, Optional, Tuple
+from dataclasses import dataclass, fields
+from config import (
+    SALES_JOURNAL_COMPACT_EVERY,
+    SALES_COMPACTION_RATIO,
+    SALES_COMPACTION_MIN_DEAD,
+    SALES_COLUMNAR,
+    SALES_CHANGE_LOG_SIZE,
+    SALES_IMPORT_CHUNK_SIZE,
+    CACHE_REVALIDATE_INTERVAL,
+)
+from storage import SalesStorage, JsonSalesStorage, create_sales_storage
+from .sales_columns import SalesColumns
+from .sales_rollups import DailyRollups
+from .sales_date_index import DateIndexView, SaleEntry, SalesDateIndex, decode_cursor, encode_cursor, sale_key
+from .sales_search import SalesSearchIndex
+from .sales_leaderboard import SalesLeaderboard
+from .sales_writer import SalesWriter
+from .sales_compactor import SalesCompactor
 
 
-@dataclass
+@dataclass(slots=True)
 class Sale:
     """Modèle de données pour une vente"""
     id: str
@@ -23,44 +45,602 @@ class Sale:
     customer_name: str
     sale_date: str
     created_by: str
+    payment_method: str = ""
+
+
+# Champs du modèle Sale, dans l'ordre de déclaration
+SALE_FIELDS = tuple(field.name for field in fields(Sale))
+
+
+def sale_to_dict(sale: Sale) -> Dict:
+    """
+    Convertir une vente en dictionnaire (copie superficielle, plus rapide que asdict)
+    
+    Args:
+        sale: Objet Sale
+        
+    Returns:
+        Dict: Vente sous forme de dictionnaire
+    """
+    return {name: getattr(sale, name) for name in SALE_FIELDS}
+
+
+def _number(data: Dict, key: str, kind: type, default: Any = None):
+    """
+    Lire un champ numérique d'une vente reçue en JSON
+    
+    Args:
+        data: Vente reçue
+        key: Nom du champ
+        kind: int ou float
+        default: Valeur si le champ est absent (obligatoire si None)
+        
+    Returns:
+        Valeur du champ convertie
+        
+    Raises:
+        ValueError: Si le champ est absent, non numérique, non fini (NaN, infini)
+            ou non entier pour int
+    """
+    value = data.get(key, default)
+    if value is None:
+        raise ValueError(f"champ {key} manquant")
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"champ {key} non numérique")
+    try:
+        # NaN ou infini (1e999 est lu comme inf) : fausserait les agrégats et les exports
+        if not math.isfinite(value):
+            raise ValueError(f"champ {key} non fini")
+        if kind is int and value != int(value):
+            raise ValueError(f"champ {key} non entier")
+        return kind(value)
+    except OverflowError:
+        # Entier JSON trop grand pour un float
+        raise ValueError(f"champ {key} hors limites")
+
+
+def sale_from_dict(data: Dict, created_by: Optional[str] = None) -> Sale:
+    """
+    Valider une vente reçue en JSON et construire l'objet Sale
+    
+    Args:
+        data: Vente reçue
+        created_by: Vendeur imposé (sinon lu dans data)
+        
+    Returns:
+        Sale: Vente validée
+        
+    Raises:
+        ValueError: Si la vente est incomplète ou invalide
+    """
+    if not isinstance(data, dict):
+        raise ValueError("objet attendu")
+    for key in ("id", "product_name", "sale_date"):
+        if not isinstance(data.get(key), str) or not data[key]:
+            raise ValueError(f"champ {key} manquant")
+    
+    quantity = _number(data, "quantity", int)
+    unit_price = _number(data, "unit_price", float)
+    total_price = _number(data, "total_price", float, quantity * unit_price)
+    if quantity <= 0 or unit_price < 0:
+        raise ValueError("quantité ou prix invalide")
+    sale_date = data["sale_date"]
+    if sale_date.endswith(("Z", "z")):
+        # Suffixe UTC des navigateurs (toISOString) : refusé par fromisoformat avant Python 3.11
+        sale_date = sale_date[:-1] + "+00:00"
+    datetime.fromisoformat(sale_date)
+    
+    if created_by is None:
+        created_by = data.get("created_by")
+        if not isinstance(created_by, str) or not created_by:
+            raise ValueError("champ created_by manquant")
+    return Sale(
+        id=data["id"],
+        product_name=data["product_name"],
+        quantity=quantity,
+        unit_price=unit_price,
+        total_price=total_price,
+        customer_name=str(data.get("customer_name") or ""),
+        sale_date=sale_date,
+        created_by=created_by,
+        payment_method=str(data.get("payment_method") or "")
+    )
 
 
 class SalesService:
     """Service de gestion des ventes"""
     
-    def __init__(self, sales_file: str = "sales.json"):
-        self.sales_file = sales_file
-        self._sales_cache: Optional[List[Dict]] = None
+    def __init__(
+        self,
+        sales_file: str = "sales.json",
+        journal_file: Optional[str] = None,
+        compact_every: int = SALES_JOURNAL_COMPACT_EVERY,
+        storage: Optional[SalesStorage] = None,
+        columnar: bool = SALES_COLUMNAR,
+        revalidate_interval: float = CACHE_REVALIDATE_INTERVAL,
+        compaction_ratio: float = SALES_COMPACTION_RATIO,
+        compaction_min_dead: int = SALES_COMPACTION_MIN_DEAD
+    ):
+        # Backend de stockage (snapshot JSON + journal optionnel par défaut)
+        self.storage = storage or JsonSalesStorage(sales_file, journal_file, compact_every)
+        self.columnar = columnar
+        # Mutations en mémoire et mise en file des écritures sous ce verrou : l'ordre
+        # des écritures de stockage est celui des modifications en mémoire
+        self._lock = threading.RLock()
+        # Thread écrivain unique : écritures de stockage validées par lots
+        self._writer = SalesWriter(self.storage)
+        # Suppressions et remplacements laissés en pierres tombales (journal, colonnes) :
+        # réécriture en arrière-plan quand leur part atteint compaction_ratio
+        self.compaction_ratio = compaction_ratio
+        self.compaction_min_dead = compaction_min_dead
+        self._compactor = SalesCompactor(self._compaction_due, self._compact_dead_records)
+        self._loaded = False
+        # Écritures des autres processus (workers) relues au plus une fois par intervalle
+        self.revalidate_interval = revalidate_interval
+        self._next_revalidation = 0.0
+        # Version des données : incrémentée à chaque écriture (ETag des réponses)
+        # Le préfixe aléatoire évite de réutiliser une version après redémarrage
+        self._version_prefix = uuid.uuid4().hex[:8]
+        self._version = 0
+        # Journal des changements (version, id) pour la synchronisation différentielle ;
+        # complet pour toute version >= _changes_floor
+        self._change_log: Deque[Tuple[int, str]] = deque(maxlen=SALES_CHANGE_LOG_SIZE)
+        self._changes_floor = 0
+        # Abonnés notifiés à chaque ajout/suppression (ex. flux SSE)
+        self._listeners: List[Callable[[str, Dict], None]] = []
+        # Ventes en mémoire (ordre d'insertion) : id -> vente, en dictionnaires
+        # ou en colonnes typées (mémoire réduite, ventes reconstituées à la lecture)
+        self._sales_by_id: MutableMapping[str, Dict] = SalesColumns() if columnar else {}
+        # Index created_by -> ids des ventes (dictionnaire ordonné, retrait en O(1))
+        self._sale_ids_by_user: Dict[str, Dict[str, None]] = {}
+        # Agrégats maintenus à chaque ajout/suppression
+        self._total_revenue = 0.0
+        self._revenue_by_user: Dict[str, float] = {}
+        self._rollups = DailyRollups()
+        # Index triés par date (global et par utilisateur) pour la pagination
+        # Versions immuables publiées à chaque écriture : les lecteurs n'attendent
+        # jamais le verrou et ne voient jamais une modification à moitié faite
+        self._date_index = SalesDateIndex(keep_sales=not columnar)
+        self._date_index_by_user: Dict[str, SalesDateIndex] = {}
+        # Index inversé des noms de produit et de client (recherche)
+        self._search_index = SalesSearchIndex()
+        # Compteurs par produit et par client (classements)
+        self._leaderboard = SalesLeaderboard()
     
-    def load_sales(self) -> List[Dict]:
+    def _build_indexes(self, sales: List[Dict]) -> None:
+        """
+        Reconstruire les index à partir de la liste complète des ventes
+        
+        Args:
+            sales: Liste des ventes
+        """
+        self._sales_by_id.clear()
+        self._sale_ids_by_user = {}
+        self._total_revenue = 0.0
+        self._revenue_by_user = {}
+        self._rollups.clear()
+        self._date_index.clear()
+        self._date_index_by_user = {}
+        self._search_index.clear()
+        self._leaderboard.clear()
+        for sale in sales:
+            self._index_sale(sale, aggregate=not self.columnar, dated=False)
+        self._index_dates(sales)
+        
+        if self.columnar:
+            # Agrégats calculés en une passe sur les colonnes
+            self._total_revenue = self._sales_by_id.total()
+            self._revenue_by_user = self._sales_by_id.sum_by("created_by")
+    
+    def _index_sale(self, sale: Dict, aggregate: bool = True, dated: bool = True) -> None:
+        """
+        Ajouter une vente dans les index et les agrégats
+        
+        Args:
+            sale: Vente à indexer
+            aggregate: Mettre à jour le CA total et par utilisateur
+            dated: Insérer la vente dans les index par date (False : voir _index_dates)
+        """
+        sale_id = sale.get("id")
+        username = sale.get("created_by")
+        self._sales_by_id[sale_id] = sale
+        self._sale_ids_by_user.setdefault(username, {})[sale_id] = None
+        if aggregate:
+            total_price = sale.get("total_price", 0)
+            self._total_revenue += total_price
+            self._revenue_by_user[username] = self._revenue_by_user.get(username, 0.0) + total_price
+        self._rollups.add(sale)
+        self._search_index.add(sale)
+        self._leaderboard.add(sale)
+        if dated:
+            self._date_index.add(sale)
+            self._user_date_index(username).add(sale)
+    
+    def _index_dates(self, sales: List[Dict]) -> None:
+        """
+        Insérer un lot de ventes dans les index par date (un tri par index)
+        
+        Args:
+            sales: Ventes déjà indexées avec dated=False
+        """
+        self._date_index.add_many(sales)
+        sales_by_user: Dict[str, List[Dict]] = {}
+        for sale in sales:
+            sales_by_user.setdefault(sale.get("created_by"), []).append(sale)
+        for username, user_sales in sales_by_user.items():
+            self._user_date_index(username).add_many(user_sales)
+    
+    def _user_date_index(self, username: str) -> SalesDateIndex:
+        """
+        Index par date d'un vendeur (créé au premier usage)
+        
+        Args:
+            username: Vendeur
+            
+        Returns:
+            SalesDateIndex: Index du vendeur
+        """
+        date_index = self._date_index_by_user.get(username)
+        if date_index is None:
+            date_index = self._date_index_by_user[username] = SalesDateIndex(keep_sales=not self.columnar)
+        return date_index
+    
+    def _date_view(self, created_by: Optional[str] = None) -> DateIndexView:
+        """
+        Version courante de l'index par date (global ou d'un vendeur)
+        
+        Args:
+            created_by: Vendeur (optionnel)
+            
+        Returns:
+            DateIndexView: Version figée, lisible sans verrou
+        """
+        if created_by is None:
+            return self._date_index.snapshot()
+        date_index = self._date_index_by_user.get(created_by)
+        return date_index.snapshot() if date_index is not None else DateIndexView(())
+    
+    def _entry_sale(self, entry: tuple) -> Optional[Dict]:
+        """
+        Vente d'une entrée d'index (relue par id si l'entrée ne la contient pas)
+        
+        Args:
+            entry: SaleEntry (sale_date, id, vente) ou clé (sale_date, id)
+            
+        Returns:
+            Optional[Dict]: Vente, ou None si elle a été supprimée entre-temps
+        """
+        sale = entry[2] if len(entry) > 2 else None
+        return sale if sale is not None else self._sales_by_id.get(entry[1])
+    
+    def _unindex_sale(self, sale: Dict) -> None:
+        """
+        Retirer une vente des index et des agrégats
+        
+        Args:
+            sale: Vente à retirer
+        """
+        sale_id = sale.get("id")
+        username = sale.get("created_by")
+        total_price = sale.get("total_price", 0)
+        self._sales_by_id.pop(sale_id, None)
+        self._total_revenue -= total_price
+        self._revenue_by_user[username] = self._revenue_by_user.get(username, 0.0) - total_price
+        self._rollups.remove(sale)
+        self._search_index.remove(sale)
+        self._leaderboard.remove(sale)
+        self._date_index.remove(sale)
+        user_date_index = self._date_index_by_user.get(username)
+        if user_date_index is not None:
+            user_date_index.remove(sale)
+            if not user_date_index:
+                del self._date_index_by_user[username]
+        
+        user_sale_ids = self._sale_ids_by_user.get(username)
+        if user_sale_ids is not None:
+            user_sale_ids.pop(sale_id, None)
+        if not user_sale_ids:
+            # Plus aucune vente : repartir de zéro (évite les résidus flottants)
+            self._sale_ids_by_user.pop(username, None)
+            self._revenue_by_user.pop(username, None)
+        if not self._sales_by_id:
+            self._total_revenue = 0.0
+    
+    def _reads_from_storage(self) -> bool:
         """
-        Charger les ventes depuis le fichier JSON
+        Indiquer si les lectures ponctuelles passent directement par le backend
         
         Returns:
-            List[Dict]: Liste des ventes
+            bool: True si le backend est indexé et que le cache n'est pas chargé
         """
-        if self._sales_cache is not None:
-            return self._sales_cache
+        return not self._loaded and self.storage.indexed
+    
+    def _range_from_storage(self, start: Optional[date], end: Optional[date]) -> bool:
+        """
+        Indiquer si une lecture par période est servie par le backend sans charger le cache
         
-        if os.path.exists(self.sales_file):
-            with open(self.sales_file, "r") as f:
-                self._sales_cache = json.load(f)
-                return self._sales_cache
+        Args:
+            start: Premier jour inclus (optionnel)
+            end: Dernier jour inclus (optionnel)
+            
+        Returns:
+            bool: True si la période est bornée et que les lectures passent par le backend
+            (segments : seuls ceux qui recoupent la période sont lus)
+        """
+        return (start is not None or end is not None) and self._reads_from_storage()
+    
+    def _ensure_loaded(self) -> None:
+        """Charger les ventes en mémoire au premier besoin (puis les maintenir à jour)"""
+        if self._loaded:
+            self._revalidate()
+            return
+        with self._lock:
+            if not self._loaded:
+                # Écritures en file (backend indexé) visibles avant le chargement
+                self._writer.flush()
+                self._build_indexes(self.storage.load_all())
+                self._loaded = True
+                self._next_revalidation = time.monotonic() + self.revalidate_interval
+    
+    def _revalidate(self, force: bool = False) -> None:
+        """
+        Appliquer les écritures faites par d'autres processus depuis la dernière vérification
         
-        # Retourner une liste vide si le fichier n'existe pas
-        self._sales_cache = []
-        return self._sales_cache
+        Vérification limitée à une par revalidate_interval (un stat de fichier ou une
+        requête indexée) ; seules les mutations nouvelles sont relues.
+        
+        Args:
+            force: Vérifier même si l'intervalle n'est pas écoulé
+        """
+        if not self._loaded and not self.storage.indexed:
+            # Rien en mémoire : le premier chargement lira l'état à jour
+            return
+        now = time.monotonic()
+        if not force and now < self._next_revalidation:
+            return
+        events: List[Tuple[str, Dict]] = []
+        with self._lock:
+            if not force and now < self._next_revalidation:
+                return
+            self._next_revalidation = now + self.revalidate_interval
+            changes = self.storage.poll_changes()
+            if changes is None:
+                events.append(self._reload())
+            else:
+                for change in changes:
+                    event = self._apply_external(change)
+                    if event is not None:
+                        events.append(event)
+        for event_type, sale in events:
+            self._publish(event_type, sale)
+    
+    def _reload(self) -> Tuple[str, Dict]:
+        """
+        Recharger entièrement l'état stocké (remplacé par un autre processus, appelé sous verrou)
+        
+        Returns:
+            Tuple[str, Dict]: Événement de resynchronisation à publier
+        """
+        count = 0
+        if self._loaded:
+            # Écritures de ce processus encore en file incluses dans le rechargement
+            self._writer.flush()
+            sales = self.storage.load_all()
+            self._build_indexes(sales)
+            count = len(sales)
+        self._version += 1
+        # Remplacement complet : non exprimable en différences
+        self._change_log.clear()
+        self._changes_floor = self._version
+        return ("resync", {"count": count})
+    
+    def _apply_external(self, change: Dict) -> Optional[Tuple[str, Dict]]:
+        """
+        Appliquer une mutation écrite par un autre processus (appelé sous verrou)
+        
+        Args:
+            change: {"op": "add", "sale": ...} ou {"op": "delete", "id": ...}
+            
+        Returns:
+            Optional[Tuple[str, Dict]]: Événement à publier, ou None si l'état est déjà à jour
+        """
+        if change.get("op") == "add":
+            sale = change["sale"]
+            current = self._sales_by_id.get(sale.get("id")) if self._loaded else None
+            if self._loaded:
+                if current == sale:
+                    return None
+                if current is not None:
+                    self._unindex_sale(current)
+                self._index_sale(sale)
+            self._record_change(sale.get("id"))
+            return ("created" if current is None else "updated", sale)
+        
+        if change.get("op") == "delete":
+            sale_id = change.get("id")
+            if self._loaded:
+                current = self._sales_by_id.get(sale_id)
+                if current is None:
+                    return None
+                self._unindex_sale(current)
+            self._record_change(sale_id)
+            return ("deleted", {"id": sale_id})
+        return None
+    
+    def load_sales(self) -> List[Dict]:
+        """
+        Charger les ventes depuis le backend de stockage
+        
+        Returns:
+            List[Dict]: Liste des ventes (ordre d'insertion)
+        """
+        self._ensure_loaded()
+        return list(self._sales_by_id.values())
     
     def save_sales(self, sales: List[Dict]) -> None:
         """
-        Sauvegarder les ventes dans le fichier JSON
+        Sauvegarder toutes les ventes (snapshot complet)
         
         Args:
             sales: Liste des ventes
         """
-        with open(self.sales_file, "w") as f:
-            json.dump(sales, f, indent=2)
-        self._sales_cache = sales
+        with self._lock:
+            self._build_indexes(sales)
+            self._loaded = True
+            self._version += 1
+            # Remplacement complet : non exprimable en différences
+            self._change_log.clear()
+            self._changes_floor = self._version
+            commit = self._write_snapshot(sales)
+        commit.result()
+        # Écritures des autres workers conservées par la réécriture : appliquées en mémoire
+        self._revalidate(force=True)
+    
+    def _write_snapshot(self, sales: List[Dict]) -> Future:
+        """
+        Mettre en file la réécriture complète du stockage (appelé sous verrou)
+        
+        Dans un même lot, seul le snapshot le plus récent est écrit : il contient
+        toutes les modifications mises en file avant lui.
+        
+        Args:
+            sales: État complet des ventes
+            
+        Returns:
+            Future: Acquittement de l'écriture
+        """
+        return self._writer.submit(partial(self.storage.save_all, sales), replace_key="snapshot")
+    
+    def compact(self) -> None:
+        """Réécrire le stockage sans enregistrements morts (vide le journal)"""
+        if self.storage.compacts_in_place:
+            # Le backend relit l'état stocké sous son verrou, écritures des autres workers
+            # comprises ; dans le thread écrivain, ordonnée avec les autres écritures
+            self._writer.submit(self.storage.compact).result()
+            # Écritures des autres workers intégrées au passage : appliquées en mémoire
+            self._revalidate(force=True)
+            return
+        with self._lock:
+            # Écritures des autres processus intégrées avant de réécrire le snapshot
+            self._revalidate(force=True)
+            commit = self._write_snapshot(self.load_sales())
+        commit.result()
+    
+    def compact_if_needed(self) -> None:
+        """Compacter immédiatement si le backend le demande ou si le seuil d'enregistrements morts est atteint"""
+        self._compactor.run_if_due()
+    
+    def _schedule_compaction(self) -> None:
+        """Après une écriture : vérifier le seuil en arrière-plan (ou tout de suite sans journal)"""
+        if self.storage.durable_appends:
+            self._compactor.notify()
+        else:
+            # Sans journal, l'écriture n'est durable qu'une fois le snapshot réécrit
+            self.compact_if_needed()
+    
+    def _over_threshold(self, dead: int, records: int) -> bool:
+        """
+        Indiquer si des enregistrements morts justifient une compaction
+        
+        Args:
+            dead: Enregistrements morts (pierres tombales, versions remplacées)
+            records: Enregistrements au total
+            
+        Returns:
+            bool: True si dead atteint compaction_min_dead et compaction_ratio * records
+        """
+        return dead >= self.compaction_min_dead and dead >= self.compaction_ratio * records
+    
+    def _record_counts(self) -> Optional[Tuple[int, int]]:
+        """
+        Ventes vivantes et enregistrements stockés
+        
+        Returns:
+            Optional[Tuple[int, int]]: (vivantes, stockées), ou None si le backend supprime
+            physiquement ou si les ventes vivantes ne sont pas connues sans tout charger
+        """
+        records = self.storage.stored_records()
+        if records is None:
+            return None
+        if self._loaded:
+            return len(self._sales_by_id), records
+        if self.storage.indexed:
+            return self.storage.count(), records
+        return None
+    
+    def _memory_tombstones(self) -> Tuple[int, int]:
+        """
+        Pierres tombales des colonnes en mémoire
+        
+        Returns:
+            Tuple[int, int]: (lignes mortes, lignes au total) ; (0, 0) hors mode colonnaire
+        """
+        if not self.columnar:
+            return 0, 0
+        tombstones = self._sales_by_id.tombstones
+        return tombstones, len(self._sales_by_id) + tombstones
+    
+    def _compaction_due(self) -> bool:
+        """
+        Indiquer si une compaction est nécessaire
+        
+        Returns:
+            bool: True si le backend la demande ou si un seuil d'enregistrements morts est atteint
+        """
+        if self.storage.needs_compaction() or self._over_threshold(*self._memory_tombstones()):
+            return True
+        counts = self._record_counts()
+        return counts is not None and self._over_threshold(max(counts[1] - counts[0], 0), counts[1])
+    
+    def _compact_dead_records(self) -> int:
+        """
+        Retirer les enregistrements morts des colonnes en mémoire puis du stockage
+        
+        Returns:
+            int: Nombre d'enregistrements morts retirés
+        """
+        reclaimed = 0
+        if self._over_threshold(*self._memory_tombstones()):
+            with self._lock:
+                reclaimed += self._sales_by_id.compact()
+        
+        counts = self._record_counts()
+        dead = max(counts[1] - counts[0], 0) if counts is not None else 0
+        if self.storage.needs_compaction() or (counts is not None and self._over_threshold(dead, counts[1])):
+            self.compact()
+            after = self._record_counts()
+            reclaimed += max(dead - (max(after[1] - after[0], 0) if after is not None else 0), 0)
+        return reclaimed
+    
+    def get_storage_stats(self) -> Dict:
+        """
+        Obtenir l'état du stockage et des compactions (supervision)
+        
+        Returns:
+            Dict: {"backend", "live", "records", "dead", "dead_ratio", "memory_tombstones",
+            "compaction": {"runs", "running", "reclaimed", "last_started", "last_duration",
+            "last_reclaimed", "last_error", "ratio", "min_dead"}} ; live, records, dead et
+            dead_ratio valent None si le backend supprime physiquement
+        """
+        counts = self._record_counts()
+        live = records = dead = dead_ratio = None
+        if counts is not None:
+            live, records = counts
+            dead = max(records - live, 0)
+            dead_ratio = round(dead / records, 4) if records else 0.0
+        return {
+            "backend": type(self.storage).__name__,
+            "live": live,
+            "records": records,
+            "dead": dead,
+            "dead_ratio": dead_ratio,
+            "memory_tombstones": self._memory_tombstones()[0],
+            "compaction": {
+                **self._compactor.stats(),
+                "ratio": self.compaction_ratio,
+                "min_dead": self.compaction_min_dead,
+            },
+        }
     
     def add_sale(self, sale: Sale) -> Sale:
         """
@@ -72,11 +652,237 @@ class SalesService:
         Returns:
             Sale: La vente ajoutée
         """
-        sales = self.load_sales()
-        sales.append(asdict(sale))
-        self.save_sales(sales)
+        sale_data = sale_to_dict(sale)
+        with self._lock:
+            # Même id : la vente remplace l'existante (comme le stockage), index compris
+            current = self.get_sale_by_id(sale_data["id"])
+            if not self._reads_from_storage():
+                if current is not None:
+                    self._unindex_sale(current)
+                self._index_sale(sale_data)
+            commit = self._writer.submit(partial(self.storage.append, sale_data))
+            self._record_change(sale_data["id"])
+        # Attente hors verrou : les ventes concurrentes rejoignent le même commit
+        commit.result()
+        self._schedule_compaction()
+        self._publish("created" if current is None else "updated", sale_data)
         return sale
     
+    def add_sales(
+        self,
+        sales: Iterable[Sale],
+        chunk_size: int = SALES_IMPORT_CHUNK_SIZE,
+        compact: bool = True,
+        owner: Optional[str] = None,
+        conflicts: Optional[List[str]] = None
+    ) -> int:
+        """
+        Ajouter des ventes en lots : une seule écriture de stockage par lot
+        
+        Args:
+            sales: Ventes à ajouter (itérable consommé au fil de l'eau)
+            chunk_size: Nombre de ventes par lot
+            compact: Compacter à la fin si besoin (False si l'appelant enchaîne les appels)
+            owner: Si fourni, les ventes existantes d'un autre vendeur ne sont pas remplacées
+            conflicts: Liste complétée avec les ids ignorés pour cette raison
+            
+        Returns:
+            int: Nombre de ventes ajoutées
+        """
+        count = 0
+        chunk: List[Dict] = []
+        for sale in sales:
+            chunk.append(sale_to_dict(sale))
+            if len(chunk) >= chunk_size:
+                count += self._add_chunk(chunk, owner, conflicts)
+                chunk = []
+        if chunk:
+            count += self._add_chunk(chunk, owner, conflicts)
+        
+        # Compaction vérifiée une seule fois en fin d'import (et non à chaque lot)
+        if compact:
+            self._schedule_compaction()
+        return count
+    
+    def _add_chunk(
+        self,
+        chunk: List[Dict],
+        owner: Optional[str] = None,
+        conflicts: Optional[List[str]] = None
+    ) -> int:
+        """
+        Indexer puis persister un lot de ventes
+        
+        Args:
+            chunk: Ventes du lot
+            owner: Si fourni, les ventes existantes d'un autre vendeur sont ignorées
+            conflicts: Liste complétée avec les ids ignorés
+            
+        Returns:
+            int: Nombre de ventes écrites
+        """
+        with self._lock:
+            if owner is not None:
+                # Même règle que upsert_sales : la vente d'un autre vendeur n'est pas remplacée
+                accepted = []
+                for sale_data in chunk:
+                    current = self.get_sale_by_id(sale_data["id"])
+                    if current is not None and current.get("created_by") != owner:
+                        if conflicts is not None:
+                            conflicts.append(sale_data["id"])
+                        continue
+                    accepted.append(sale_data)
+                chunk = accepted
+                if not chunk:
+                    return 0
+            if not self._reads_from_storage():
+                self._ensure_loaded()
+                # Dernière version de chaque id du lot (les doublons se remplacent)
+                indexed: Dict[str, Dict] = {}
+                for sale_data in chunk:
+                    # Même id : la vente importée remplace l'existante (comme le stockage)
+                    current = self._sales_by_id.get(sale_data["id"])
+                    if current is not None:
+                        self._unindex_sale(current)
+                    self._index_sale(sale_data, dated=False)
+                    indexed[sale_data["id"]] = sale_data
+                self._index_dates(list(indexed.values()))
+            commit = self._writer.submit(partial(self.storage.append_many, chunk))
+            for sale_data in chunk:
+                self._record_change(sale_data["id"])
+        commit.result()
+        # Un événement par lot : les clients rechargent au lieu de recevoir chaque vente
+        self._publish("resync", {"count": len(chunk)})
+        return len(chunk)
+    
+    def upsert_sales(self, sales: Iterable[Sale], owner: Optional[str] = None) -> Dict:
+        """
+        Créer ou remplacer des ventes par leur id (rejouer un lot est sans effet)
+        
+        Args:
+            sales: Ventes à enregistrer
+            owner: Si fourni, les ventes existantes d'un autre vendeur ne sont pas modifiées
+            
+        Returns:
+            Dict: {"created", "updated", "unchanged": int, "conflicts": List[str]}
+        """
+        result = {"created": 0, "updated": 0, "unchanged": 0, "conflicts": []}
+        events: List[Tuple[str, Dict]] = []
+        commit: Optional[Future] = None
+        with self._lock:
+            for sale in sales:
+                sale_data = sale_to_dict(sale)
+                current = self.get_sale_by_id(sale.id)
+                if current is not None and owner is not None and current.get("created_by") != owner:
+                    result["conflicts"].append(sale.id)
+                    continue
+                if current == sale_data:
+                    result["unchanged"] += 1
+                    continue
+                
+                if not self._reads_from_storage():
+                    if current is not None:
+                        self._unindex_sale(current)
+                    self._index_sale(sale_data)
+                # append remplace une vente de même id (journal et SQLite)
+                commit = self._writer.submit(partial(self.storage.append, sale_data))
+                self._record_change(sale.id)
+                events.append(("created" if current is None else "updated", sale_data))
+                result["created" if current is None else "updated"] += 1
+        
+        # Écritures acquittées dans l'ordre : attendre la dernière suffit
+        if commit is not None:
+            commit.result()
+        for event_type, sale_data in events:
+            self._publish(event_type, sale_data)
+        self._schedule_compaction()
+        return result
+    
+    def _record_change(self, sale_id: str) -> None:
+        """
+        Incrémenter la version et journaliser la vente modifiée
+        
+        Args:
+            sale_id: ID de la vente ajoutée, remplacée ou supprimée
+        """
+        self._version += 1
+        if len(self._change_log) == self._change_log.maxlen:
+            # L'entrée la plus ancienne va être évincée
+            self._changes_floor = self._change_log[0][0]
+        self._change_log.append((self._version, sale_id))
+    
+    def get_changes(self, since: Optional[str]) -> Dict:
+        """
+        Obtenir les ventes modifiées depuis une version
+        
+        Args:
+            since: Version renvoyée par un appel précédent (None : aucune)
+            
+        Returns:
+            Dict: {"version": str, "reset": bool, "changes": List[Dict]} ; reset indique
+            que la version est inconnue ou trop ancienne et qu'il faut tout recharger
+            
+        Raises:
+            ValueError: Si la version est mal formée
+        """
+        version = self.get_data_version()
+        if since is None:
+            return {"version": version, "reset": True, "changes": []}
+        
+        prefix, _, number = since.rpartition("-")
+        since_version = int(number)
+        if prefix != self._version_prefix or not self._changes_floor <= since_version <= self._version:
+            return {"version": version, "reset": True, "changes": []}
+        
+        # Parcours depuis la fin : coût proportionnel au nombre de changements
+        changed_ids: Dict[str, None] = {}
+        # Copie du journal en une opération : un écrivain peut y ajouter pendant le parcours
+        for change_version, sale_id in reversed(list(self._change_log)):
+            if change_version <= since_version:
+                break
+            changed_ids.setdefault(sale_id, None)
+        
+        changes = []
+        for sale_id in reversed(list(changed_ids)):
+            sale = self.get_sale_by_id(sale_id)
+            if sale is None:
+                changes.append({"type": "delete", "id": sale_id})
+            else:
+                changes.append({"type": "upsert", "sale": sale})
+        return {"version": version, "reset": False, "changes": changes}
+    
+    def add_listener(self, listener: Callable[[str, Dict], None]) -> None:
+        """
+        Abonner une fonction aux ajouts et suppressions de ventes
+        
+        Args:
+            listener: Fonction appelée avec ("created" | "updated", vente), ("deleted", {"id": ...})
+                ou ("resync", {"count": ...}) après un import en lots
+        """
+        self._listeners.append(listener)
+    
+    def _publish(self, event_type: str, sale: Dict) -> None:
+        """
+        Notifier les abonnés d'un changement
+        
+        Args:
+            event_type: "created", "updated", "deleted" ou "resync"
+            sale: Vente concernée
+        """
+        for listener in self._listeners:
+            listener(event_type, sale)
+    
+    def get_data_version(self) -> str:
+        """
+        Obtenir la version courante des données de ventes
+        
+        Returns:
+            str: Identifiant qui change à chaque ajout, suppression ou sauvegarde
+        """
+        # ETag vérifié avant toute lecture : les écritures des autres processus comptent
+        self._revalidate()
+        return f"{self._version_prefix}-{self._version}"
+    
     def get_sale_by_id(self, sale_id: str) -> Optional[Dict]:
         """
         Récupérer une vente par son ID
@@ -87,11 +893,11 @@ class SalesService:
         Returns:
             Optional[Dict]: Vente ou None
         """
-        sales = self.load_sales()
-        for sale in sales:
-            if sale.get("id") == sale_id:
-                return sale
-        return None
+        if self._reads_from_storage():
+            return self.storage.get(sale_id)
+        
+        self._ensure_loaded()
+        return self._sales_by_id.get(sale_id)
     
     def get_sales_by_user(self, username: str) -> List[Dict]:
         """
@@ -103,8 +909,14 @@ class SalesService:
         Returns:
             List[Dict]: Liste des ventes de l'utilisateur
         """
-        sales = self.load_sales()
-        return [sale for sale in sales if sale.get("created_by") == username]
+        if self._reads_from_storage():
+            return self.storage.find_by_user(username)
+        
+        self._ensure_loaded()
+        # Copie des ids en une opération : l'index peut changer pendant la lecture
+        sale_ids = list(self._sale_ids_by_user.get(username, ()))
+        sales = (self._sales_by_id.get(sale_id) for sale_id in sale_ids)
+        return [sale for sale in sales if sale is not None]
     
     def get_total_revenue(self) -> float:
         """
@@ -113,8 +925,11 @@ class SalesService:
         Returns:
             float: Chiffre d'affaires total
         """
-        sales = self.load_sales()
-        return sum(sale.get("total_price", 0) for sale in sales)
+        if self._reads_from_storage():
+            return self.storage.total_revenue()
+        
+        self._ensure_loaded()
+        return self._total_revenue
     
     def get_sales_count(self) -> int:
         """
@@ -123,28 +938,248 @@ class SalesService:
         Returns:
             int: Nombre de ventes
         """
-        return len(self.load_sales())
+        if self._reads_from_storage():
+            return self.storage.count()
+        
+        self._ensure_loaded()
+        return len(self._sales_by_id)
+    
+    def get_user_summary(self, username: str) -> Dict:
+        """
+        Obtenir le nombre de ventes et le chiffre d'affaires d'un utilisateur
+        
+        Args:
+            username: Nom d'utilisateur
+            
+        Returns:
+            Dict: {"count": int, "total_revenue": float}
+        """
+        if self._reads_from_storage():
+            sales = self.storage.find_by_user(username)
+            return {
+                "count": len(sales),
+                "total_revenue": sum(sale.get("total_price", 0) for sale in sales)
+            }
+        
+        self._ensure_loaded()
+        return {
+            "count": len(self._sale_ids_by_user.get(username, ())),
+            "total_revenue": self._revenue_by_user.get(username, 0.0)
+        }
+    
+    def get_sales_page(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        payment: Optional[str] = None,
+        created_by: Optional[str] = None
+    ) -> Dict:
+        """
+        Récupérer une page de ventes, de la plus récente à la plus ancienne
+        
+        Args:
+            limit: Nombre maximum de ventes
+            cursor: Curseur renvoyé par la page précédente (optionnel)
+            start: Premier jour inclus (optionnel)
+            end: Dernier jour inclus (optionnel)
+            payment: Moyen de paiement (optionnel)
+            created_by: Vendeur (optionnel)
+            
+        Returns:
+            Dict: {"sales": List[Dict], "next_cursor": Optional[str]}
+            
+        Raises:
+            ValueError: Si le curseur est invalide
+        """
+        before = decode_cursor(cursor) if cursor else None
+        if self._range_from_storage(start, end):
+            # Période bornée : ventes de la période relues et triées, sans charger le cache
+            sales = sorted(self.iter_sales(start, end, payment, created_by), key=sale_key, reverse=True)
+            if before is not None:
+                sales = [sale for sale in sales if sale_key(sale) < before]
+            page = sales[:max(limit, 1)]
+            more = len(sales) > len(page)
+            return {"sales": page, "next_cursor": encode_cursor(sale_key(page[-1])) if more else None}
+        
+        self._ensure_loaded()
+        view = self._date_view(created_by)
+        
+        def matches_payment(entry: SaleEntry) -> bool:
+            sale = self._entry_sale(entry)
+            return sale is not None and sale.get("payment_method") == payment
+        
+        predicate = matches_payment if payment is not None else None
+        entries, next_key = view.page(max(limit, 1), before, start, end, predicate)
+        sales = (self._entry_sale(entry) for entry in entries)
+        return {
+            "sales": [sale for sale in sales if sale is not None],
+            "next_cursor": encode_cursor(next_key) if next_key else None
+        }
+    
+    def search_sales(self, query: str, limit: int, cursor: Optional[str] = None) -> Dict:
+        """
+        Rechercher des ventes par nom de produit ou de client (préfixes, accents ignorés)
+        
+        Args:
+            query: Texte recherché ; chaque mot doit commencer un mot de la vente
+            limit: Nombre maximum de ventes
+            cursor: Curseur renvoyé par la page précédente (optionnel)
+            
+        Returns:
+            Dict: {"sales": List[Dict], "next_cursor": Optional[str]}
+            
+        Raises:
+            ValueError: Si le curseur est invalide
+        """
+        before = decode_cursor(cursor) if cursor else None
+        self._ensure_loaded()
+        entries, next_key = self._search_index.search(
+            query, max(limit, 1), before, self._date_view(), self._entry_sale
+        )
+        sales = (self._entry_sale(entry) for entry in entries)
+        return {
+            "sales": [sale for sale in sales if sale is not None],
+            "next_cursor": encode_cursor(next_key) if next_key else None
+        }
+    
+    def iter_sales(
+        self,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        payment: Optional[str] = None,
+        created_by: Optional[str] = None
+    ) -> Iterator[Dict]:
+        """
+        Parcourir les ventes par ordre chronologique sans copier la liste
+        
+        Args:
+            start: Premier jour inclus (optionnel)
+            end: Dernier jour inclus (optionnel)
+            payment: Moyen de paiement (optionnel)
+            created_by: Vendeur (optionnel)
+            
+        Yields:
+            Dict: Ventes filtrées
+        """
+        if self._reads_from_storage():
+            # Backend indexé pas encore chargé : seule la plage demandée est lue
+            for sale in self.storage.iter_range(start, end):
+                if created_by is not None and sale.get("created_by") != created_by:
+                    continue
+                if payment is not None and sale.get("payment_method") != payment:
+                    continue
+                yield sale
+            return
+        
+        self._ensure_loaded()
+        # Parcours d'une version figée : cohérent même si des ventes arrivent entre-temps
+        for entry in self._date_view(created_by).iter_range(start, end):
+            sale = self._entry_sale(entry)
+            if sale is None:
+                continue
+            if payment is not None and sale.get("payment_method") != payment:
+                continue
+            yield sale
+    
+    def get_rollups(
+        self,
+        period: str = "day",
+        start: Optional[date] = None,
+        end: Optional[date] = None
+    ) -> List[Dict]:
+        """
+        Obtenir le CA et le nombre de ventes par période et par moyen de paiement
+        
+        Args:
+            period: "day", "week", "month" ou "year"
+            start: Premier jour inclus (optionnel)
+            end: Dernier jour inclus (optionnel)
+            
+        Returns:
+            List[Dict]: Une entrée par période, calculée depuis les buckets journaliers
+        """
+        if self._range_from_storage(start, end):
+            # Buckets de la seule période, calculés à partir du backend
+            rollups = DailyRollups()
+            for sale in self.storage.iter_range(start, end):
+                rollups.add(sale)
+            return rollups.rollup(period, start, end)
+        
+        self._ensure_loaded()
+        return self._rollups.rollup(period, start, end)
+    
+    def get_top(
+        self,
+        metric: str,
+        limit: int,
+        start: Optional[date] = None,
+        end: Optional[date] = None
+    ) -> Dict[str, List[Dict]]:
+        """
+        Obtenir les meilleurs produits et clients d'une période
+        
+        Args:
+            metric: Critère de classement ("revenue", "quantity" ou "count")
+            limit: Nombre d'entrées par classement
+            start: Premier jour inclus (optionnel)
+            end: Dernier jour inclus (optionnel)
+            
+        Returns:
+            Dict[str, List[Dict]]: {"products": [...], "customers": [...]}
+            
+        Raises:
+            ValueError: Si le critère est inconnu
+        """
+        if self._range_from_storage(start, end):
+            # Compteurs de la seule période, calculés à partir du backend
+            leaderboard = SalesLeaderboard()
+            for sale in self.storage.iter_range(start, end):
+                leaderboard.add(sale)
+            return leaderboard.top(metric, limit, None, None, self.iter_sales)
+        
+        self._ensure_loaded()
+        # Seuls les jours des mois incomplets de la période sont relus
+        return self._leaderboard.top(metric, limit, start, end, self.iter_sales)
     
     def delete_sale(self, sale_id: str) -> bool:
         """
         Supprimer une vente
         
+        Coût indépendant du nombre de ventes : pierre tombale dans le journal (et dans les
+        colonnes en mode colonnaire), retirée plus tard par le thread de compaction.
+        
         Args:
             sale_id: ID de la vente
             
         Returns:
             bool: True si la vente a été supprimée
         """
-        sales = self.load_sales()
-        initial_count = len(sales)
-        sales = [sale for sale in sales if sale.get("id") != sale_id]
+        with self._lock:
+            if self._reads_from_storage():
+                if self.storage.get(sale_id) is None:
+                    return False
+            else:
+                self._ensure_loaded()
+                sale = self._sales_by_id.get(sale_id)
+                if sale is None:
+                    return False
+                self._unindex_sale(sale)
+            commit = self._writer.submit(partial(self.storage.delete, sale_id))
+            self._record_change(sale_id)
         
-        if len(sales) < initial_count:
-            self.save_sales(sales)
-            return True
-        return False
+        commit.result()
+        self._schedule_compaction()
+        self._publish("deleted", {"id": sale_id})
+        return True
+    
+    def close(self) -> None:
+        """Arrêter la compaction, valider les écritures en attente puis fermer le stockage"""
+        self._compactor.close()
+        self._writer.close()
+        self.storage.close()
 
 
 # Instance singleton du service
-sales_service = SalesService()
-
+sales_service = SalesService(storage=create_sales_storage())
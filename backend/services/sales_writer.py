@@ -0,0 +1,104 @@
+"""
+Écrivain unique des ventes (Domain-Driven Design)
+Responsabilités :
+- Toutes les écritures de stockage sérialisées dans un seul thread, dans l'ordre de soumission
+- Écritures en attente regroupées en un seul commit durable (group commit)
+- Chaque appelant n'attend que l'acquittement du lot contenant son écriture
+"""
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Tuple
+
+from config import SALES_WRITER_MAX_BATCH
+from storage import SalesStorage
+
+# Écriture en attente : (opération, clé de remplacement, acquittement)
+PendingWrite = Tuple[Callable[[], None], Optional[str], Future]
+
+
+class SalesWriter:
+    """Thread écrivain : exécute les écritures par lots et les valide ensemble"""
+    
+    def __init__(self, storage: SalesStorage, max_batch: int = SALES_WRITER_MAX_BATCH):
+        self.storage = storage
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[Optional[PendingWrite]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+    
+    def submit(self, operation: Callable[[], None], replace_key: Optional[str] = None) -> Future:
+        """
+        Mettre une écriture en file (l'ordre de soumission est l'ordre d'exécution)
+        
+        Args:
+            operation: Écriture à exécuter dans le thread écrivain
+            replace_key: Dans un même lot, seule la dernière écriture de même clé est
+                exécutée (ex. snapshots complets : le plus récent contient les précédents)
+                
+        Returns:
+            Future: Acquitté quand le lot contenant l'écriture est durable
+        """
+        future: Future = Future()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="sales-writer", daemon=True)
+                self._thread.start()
+            self._queue.put((operation, replace_key, future))
+        return future
+    
+    def flush(self) -> None:
+        """Attendre que toutes les écritures déjà soumises soient durables"""
+        if self._thread is not None:
+            self.submit(lambda: None).result()
+    
+    def _run(self) -> None:
+        """Boucle du thread écrivain"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stopping = False
+            # Tout ce qui est arrivé pendant le commit précédent part dans ce lot
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+            if stopping:
+                return
+    
+    def _commit(self, batch: List[PendingWrite]) -> None:
+        """
+        Exécuter un lot d'écritures et le valider en une fois
+        
+        Args:
+            batch: Écritures du lot, dans l'ordre de soumission
+        """
+        last_by_key = {key: position for position, (_, key, _) in enumerate(batch) if key is not None}
+        try:
+            with self.storage.batch():
+                for position, (operation, key, _) in enumerate(batch):
+                    if key is None or last_by_key[key] == position:
+                        operation()
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+        for _, _, future in batch:
+            future.set_result(None)
+    
+    def close(self) -> None:
+        """Valider les écritures en attente puis arrêter le thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._queue.put(None)
+        if thread is not None:
+            thread.join()
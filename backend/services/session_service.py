@@ -4,19 +4,132 @@ Responsabilités :
 - Création et suppression de sessions
 - Vérification de l'état de connexion
 - Récupération des informations de session
+- Expiration des sessions (inactivité et durée maximale)
+- Stockage pluggable (mémoire ou partagé entre workers) avec cache local
 """
 import secrets
+import threading
+import time
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
 from fastapi import Request
+from config import (
+    SESSION_ABSOLUTE_TIMEOUT,
+    SESSION_IDLE_TIMEOUT,
+    SESSION_SWEEP_INTERVAL,
+    SESSION_CACHE_TTL,
+    SESSION_TOUCH_INTERVAL,
+)
+from storage import SessionStore, SessionRecord, MemorySessionStore, create_session_store
 
 
 class SessionService:
     """Service de gestion des sessions utilisateur"""
     
-    def __init__(self):
-        # Sessions actives (en mémoire pour la démo, utiliser Redis en production)
-        self._active_sessions: Dict[str, Dict[str, str]] = {}
+    def __init__(
+        self,
+        store: Optional[SessionStore] = None,
+        idle_timeout: float = SESSION_IDLE_TIMEOUT,
+        absolute_timeout: float = SESSION_ABSOLUTE_TIMEOUT,
+        cache_ttl: float = SESSION_CACHE_TTL,
+        touch_interval: float = SESSION_TOUCH_INTERVAL
+    ):
+        # Stockage des sessions (mémoire par défaut, SQLite pour plusieurs workers)
+        self.store = store or MemorySessionStore()
+        self.idle_timeout = idle_timeout
+        self.absolute_timeout = absolute_timeout
+        # Cache local en lecture seule pour les stockages partagés : token -> (valide jusqu'à, session)
+        self.cache_ttl = cache_ttl if self.store.shared else 0
+        self._cache: Dict[str, Tuple[float, SessionRecord]] = {}
+        # Évite une écriture dans le stockage à chaque requête
+        self.touch_interval = touch_interval
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop_sweeper = threading.Event()
+    
+    def _lookup(self, token: Optional[str]) -> Optional[Dict[str, str]]:
+        """
+        Récupérer une session valide et mettre à jour sa dernière activité
+        
+        Args:
+            token: Token de session
+            
+        Returns:
+            Optional[Dict]: Données de session ou None si absente ou expirée
+        """
+        if not token:
+            return None
+        now = time.time()
+        
+        # Cache local (stockages partagés) : aucun accès au stockage
+        cached = self._cache.get(token)
+        if cached is not None and cached[0] > now and cached[1].expires_at > now:
+            return cached[1].data
+        
+        record = self.store.resolve(
+            token, now, self.idle_timeout, self.absolute_timeout, self.touch_interval
+        )
+        if record is None:
+            self._cache.pop(token, None)
+            return None
+        if self.cache_ttl > 0:
+            self._cache[token] = (now + self.cache_ttl, record)
+        return record.data
+    
+    def resolve_request(self, request: Request) -> Optional[Dict[str, str]]:
+        """
+        Résoudre la session d'une requête une seule fois (mémorisée dans request.state)
+        
+        Args:
+            request: Requête FastAPI
+            
+        Returns:
+            Optional[Dict]: Données de session ou None
+        """
+        if hasattr(request.state, "session"):
+            return request.state.session
+        session = self._lookup(request.cookies.get("session_token"))
+        request.state.session = session
+        request.state.username = session["username"] if session else ""
+        return session
+    
+    def sweep_expired(self) -> int:
+        """
+        Supprimer les sessions expirées et purger le cache local
+        
+        Returns:
+            int: Nombre de sessions supprimées
+        """
+        now = time.time()
+        for token, (valid_until, _) in list(self._cache.items()):
+            if valid_until <= now:
+                self._cache.pop(token, None)
+        return self.store.sweep(now)
+    
+    def start_sweeper(self, interval: float = SESSION_SWEEP_INTERVAL) -> None:
+        """
+        Démarrer le nettoyage périodique en arrière-plan
+        
+        Args:
+            interval: Secondes entre deux nettoyages
+        """
+        if self._sweeper is not None:
+            return
+        self._stop_sweeper.clear()
+        
+        def run() -> None:
+            while not self._stop_sweeper.wait(interval):
+                self.sweep_expired()
+        
+        self._sweeper = threading.Thread(target=run, name="session-sweeper", daemon=True)
+        self._sweeper.start()
+    
+    def stop_sweeper(self) -> None:
+        """Arrêter le nettoyage périodique"""
+        if self._sweeper is None:
+            return
+        self._stop_sweeper.set()
+        self._sweeper.join()
+        self._sweeper = None
     
     def create_session(self, username: str) -> str:
         """
@@ -29,10 +142,15 @@ class SessionService:
             str: Token de session
         """
         token = secrets.token_urlsafe(32)
-        self._active_sessions[token] = {
-            "username": username,
-            "created": datetime.now().isoformat()
-        }
+        now = time.time()
+        self.store.save(token, SessionRecord(
+            data={
+                "username": username,
+                "created": datetime.now().isoformat()
+            },
+            created_at=now,
+            expires_at=min(now + self.absolute_timeout, now + self.idle_timeout)
+        ))
         return token
     
     def get_session(self, token: str) -> Optional[Dict[str, str]]:
@@ -45,7 +163,7 @@ class SessionService:
         Returns:
             Optional[Dict]: Données de session ou None
         """
-        return self._active_sessions.get(token)
+        return self._lookup(token)
     
     def delete_session(self, token: str) -> None:
         """
@@ -54,8 +172,8 @@ class SessionService:
         Args:
             token: Token de session
         """
-        if token in self._active_sessions:
-            del self._active_sessions[token]
+        self._cache.pop(token, None)
+        self.store.delete(token)
     
     def is_logged_in(self, request: Request) -> bool:
         """
@@ -67,10 +185,7 @@ class SessionService:
         Returns:
             bool: True si l'utilisateur est connecté
         """
-        token = request.cookies.get("session_token")
-        if not token:
-            return False
-        return token in self._active_sessions
+        return self.resolve_request(request) is not None
     
     def get_username(self, request: Request) -> str:
         """
@@ -82,10 +197,8 @@ class SessionService:
         Returns:
             str: Nom d'utilisateur ou chaîne vide
         """
-        token = request.cookies.get("session_token")
-        if token and token in self._active_sessions:
-            return self._active_sessions[token]["username"]
-        return ""
+        self.resolve_request(request)
+        return request.state.username
     
     def get_session_token(self, request: Request) -> Optional[str]:
         """
@@ -101,14 +214,14 @@ class SessionService:
     
     def get_active_sessions_count(self) -> int:
         """
-        Obtenir le nombre de sessions actives
+        Obtenir le nombre de sessions actives (non expirées)
         
         Returns:
             int: Nombre de sessions actives
         """
-        return len(self._active_sessions)
+        self.sweep_expired()
+        return self.store.count()
 
 
 # Instance singleton du service
-session_service = SessionService()
-
+session_service = SessionService(create_session_store())
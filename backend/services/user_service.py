@@ -3,36 +3,66 @@ Service de gestion des utilisateurs (Domain-Driven Design)
 Responsabilités :
 - Chargement et sauvegarde des utilisateurs
 - Authentification et vérification des mots de passe
-- Gestion du cache des utilisateurs
+- Gestion du cache des utilisateurs (revalidé si un autre processus modifie le stockage)
 """
-import json
-import os
-from typing import Dict, Optional
-from config import pwd_context, USERS_FILE
+import time
+from typing import Dict, Hashable, Optional
+from config import pwd_context, USERS_FILE, CACHE_REVALIDATE_INTERVAL
+from storage import UserStorage, JsonUserStorage, create_user_storage
+from .password_hasher import PasswordHasher, password_hasher
 
 
 class UserService:
     """Service de gestion des utilisateurs"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        storage: Optional[UserStorage] = None,
+        hasher: Optional[PasswordHasher] = None,
+        revalidate_interval: float = CACHE_REVALIDATE_INTERVAL
+    ):
+        # Backend de stockage (users.json par défaut)
+        self.storage = storage or JsonUserStorage(USERS_FILE)
+        # Pool de processus pour bcrypt sur le chemin de connexion
+        self.hasher = hasher or password_hasher
         self._users_cache: Optional[Dict[str, str]] = None
+        # État du stockage au chargement du cache, comparé au plus une fois par intervalle
+        self.revalidate_interval = revalidate_interval
+        self._cache_generation: Optional[Hashable] = None
+        self._next_revalidation = 0.0
+    
+    def _cache_is_stale(self) -> bool:
+        """
+        Vérifier si le stockage a été modifié depuis le chargement du cache
+        (autre worker, édition de users.json)
+        
+        Returns:
+            bool: True si le cache doit être rechargé
+        """
+        now = time.monotonic()
+        if now < self._next_revalidation:
+            return False
+        self._next_revalidation = now + self.revalidate_interval
+        return self.storage.generation() != self._cache_generation
     
     def load_users(self) -> Dict[str, str]:
         """
-        Charger les utilisateurs depuis le fichier JSON (avec cache)
+        Charger les utilisateurs depuis le backend de stockage (avec cache)
         
         Returns:
             Dict[str, str]: Dictionnaire {username: hashed_password}
         """
-        # Utiliser le cache si disponible
-        if self._users_cache is not None:
+        # Utiliser le cache si disponible et à jour
+        if self._users_cache is not None and not self._cache_is_stale():
             return self._users_cache
         
-        # Charger depuis le fichier si existant
-        if os.path.exists(USERS_FILE):
-            with open(USERS_FILE, "r") as f:
-                self._users_cache = json.load(f)
-                return self._users_cache
+        # Charger depuis le stockage si existant (état relevé avant la lecture)
+        self._cache_generation = self.storage.generation()
+        self._next_revalidation = time.monotonic() + self.revalidate_interval
+        users = self.storage.load_all()
+        if users is not None:
+            self._users_cache = users
+            return self._users_cache
         
         # Créer les utilisateurs par défaut
         default_users = {
@@ -45,14 +75,29 @@ class UserService:
     
     def save_users(self, users: Dict[str, str]) -> None:
         """
-        Sauvegarder les utilisateurs dans le fichier JSON
+        Sauvegarder les utilisateurs dans le backend de stockage
         
         Args:
             users: Dictionnaire {username: hashed_password}
         """
-        with open(USERS_FILE, "w") as f:
-            json.dump(users, f, indent=2)
+        self.storage.save_all(users)
         self._users_cache = users  # Mettre à jour le cache
+        self._cache_generation = self.storage.generation()
+    
+    def get_password_hash(self, username: str) -> Optional[str]:
+        """
+        Récupérer le hash du mot de passe d'un utilisateur
+        
+        Args:
+            username: Nom d'utilisateur
+            
+        Returns:
+            Optional[str]: Hash du mot de passe ou None si inconnu
+        """
+        # Backend indexé : lecture ponctuelle sans charger tous les utilisateurs
+        if self._users_cache is None and self.storage.indexed:
+            return self.storage.get(username)
+        return self.load_users().get(username)
     
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
         """
@@ -90,12 +135,28 @@ class UserService:
         Returns:
             bool: True si l'authentification réussit
         """
-        users = self.load_users()
+        hashed_password = self.get_password_hash(username)
         
-        if username not in users:
+        if hashed_password is None:
             return False
         
-        return self.verify_password(password, users[username])
+        return self.verify_password(password, hashed_password)
+    
+    async def verify_password_async(self, plain_password: str, hashed_password: str) -> bool:
+        """
+        Vérifier un mot de passe en déléguant bcrypt au pool de processus
+        
+        Args:
+            plain_password: Mot de passe en clair
+            hashed_password: Hash lu au préalable (get_password_hash)
+            
+        Returns:
+            bool: True si le mot de passe correspond
+            
+        Raises:
+            PasswordHasherBusyError: Si le pool de hashage est saturé
+        """
+        return await self.hasher.verify(plain_password, hashed_password)
     
     def user_exists(self, username: str) -> bool:
         """
@@ -107,8 +168,7 @@ class UserService:
         Returns:
             bool: True si l'utilisateur existe
         """
-        users = self.load_users()
-        return username in users
+        return self.get_password_hash(username) is not None
     
     def initialize(self) -> None:
         """Initialiser le service (charger les utilisateurs au démarrage)"""
@@ -116,5 +176,5 @@ class UserService:
 
 
 # Instance singleton du service
-user_service = UserService()
+user_service = UserService(create_user_storage())
 
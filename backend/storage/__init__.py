@@ -0,0 +1,94 @@
+"""
+Backends de stockage de l'application
+"""
+import os
+
+from config import (
+    STORAGE_BACKEND,
+    SQLITE_FILE,
+    USERS_FILE,
+    SALES_FILE,
+    SALES_JOURNAL_FILE,
+    SALES_JOURNAL_COMPACT_EVERY,
+    SALES_CHANGE_LOG_SIZE,
+    SALES_SEGMENTS_DIR,
+    SALES_SEGMENT_CACHE_SIZE,
+    SALES_COMPACTION_RATIO,
+    SESSION_BACKEND,
+)
+from .base import SalesStorage, UserStorage, SessionStore, SessionRecord
+from .json_storage import JsonSalesStorage, JsonUserStorage
+from .memory_storage import MemorySessionStore
+from .segment_storage import SegmentedSalesStorage
+from .sqlite_storage import SqliteSalesStorage, SqliteUserStorage, SqliteSessionStore
+
+
+def create_sales_storage(backend: str = STORAGE_BACKEND) -> SalesStorage:
+    """
+    Créer le backend de stockage des ventes configuré
+    
+    Args:
+        backend: "json", "segments" ou "sqlite"
+        
+    Returns:
+        SalesStorage: Backend de stockage
+    """
+    if backend == "sqlite":
+        return SqliteSalesStorage(SQLITE_FILE, SALES_CHANGE_LOG_SIZE)
+    if backend == "segments":
+        storage = SegmentedSalesStorage(SALES_SEGMENTS_DIR, SALES_SEGMENT_CACHE_SIZE, SALES_COMPACTION_RATIO)
+        if not storage.segments() and os.path.exists(SALES_FILE):
+            # Première utilisation : reprise du snapshot JSON et de son journal
+            legacy = JsonSalesStorage(SALES_FILE, SALES_JOURNAL_FILE)
+            storage.save_all(legacy.load_all())
+            legacy.close()
+        return storage
+    return JsonSalesStorage(SALES_FILE, SALES_JOURNAL_FILE, SALES_JOURNAL_COMPACT_EVERY)
+
+
+def create_user_storage(backend: str = STORAGE_BACKEND) -> UserStorage:
+    """
+    Créer le backend de stockage des utilisateurs configuré
+    
+    Args:
+        backend: "json" ou "sqlite"
+        
+    Returns:
+        UserStorage: Backend de stockage
+    """
+    if backend == "sqlite":
+        return SqliteUserStorage(SQLITE_FILE)
+    return JsonUserStorage(USERS_FILE)
+
+
+def create_session_store(backend: str = SESSION_BACKEND) -> SessionStore:
+    """
+    Créer le stockage de sessions configuré
+    
+    Args:
+        backend: "memory" (un seul worker) ou "sqlite" (partagé entre workers)
+        
+    Returns:
+        SessionStore: Stockage des sessions
+    """
+    if backend == "sqlite":
+        return SqliteSessionStore(SQLITE_FILE)
+    return MemorySessionStore()
+
+
+__all__ = [
+    "SalesStorage",
+    "UserStorage",
+    "JsonSalesStorage",
+    "JsonUserStorage",
+    "SegmentedSalesStorage",
+    "SqliteSalesStorage",
+    "SqliteUserStorage",
+    "SessionStore",
+    "SessionRecord",
+    "MemorySessionStore",
+    "SqliteSessionStore",
+    "create_sales_storage",
+    "create_user_storage",
+    "create_session_store",
+]
@@ -0,0 +1,359 @@
+"""
+Interfaces des backends de stockage
+Responsabilités :
+- Contrat commun entre les services et la persistance
+- Implémentations par défaut (parcours complet) pour les backends sans index
+"""
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, Hashable, Iterator, List, Optional
+
+
+class SalesStorage(ABC):
+    """Backend de stockage des ventes"""
+    
+    # True si le backend répond aux lectures ponctuelles sans tout charger en mémoire
+    indexed = False
+    # True si chaque écriture acquittée est durable sans réécriture complète (sinon la
+    # compaction demandée par needs_compaction a lieu avant d'acquitter l'écriture)
+    durable_appends = True
+    # True si le backend se compacte lui-même (compact) au lieu de recevoir l'état complet
+    compacts_in_place = False
+    
+    @abstractmethod
+    def load_all(self) -> List[Dict]:
+        """
+        Charger toutes les ventes
+        
+        Returns:
+            List[Dict]: Liste des ventes
+        """
+    
+    @abstractmethod
+    def save_all(self, sales: List[Dict]) -> None:
+        """
+        Remplacer toutes les ventes stockées
+        
+        Args:
+            sales: Liste des ventes
+        """
+    
+    @abstractmethod
+    def append(self, sale: Dict) -> None:
+        """
+        Persister l'ajout d'une vente
+        
+        Args:
+            sale: Vente ajoutée
+        """
+    
+    def append_many(self, sales: List[Dict]) -> None:
+        """
+        Persister l'ajout d'un lot de ventes (une seule écriture si le backend le permet)
+        
+        Args:
+            sales: Ventes ajoutées
+        """
+        for sale in sales:
+            self.append(sale)
+    
+    @abstractmethod
+    def delete(self, sale_id: str) -> None:
+        """
+        Persister la suppression d'une vente
+        
+        Args:
+            sale_id: ID de la vente supprimée
+        """
+    
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """
+        Regrouper les écritures du bloc en un seul commit durable (group commit)
+        
+        Utilisé par l'écrivain unique du service de ventes ; par défaut chaque
+        écriture est déjà validée individuellement.
+        """
+        yield
+    
+    def poll_changes(self) -> Optional[List[Dict]]:
+        """
+        Lire les mutations écrites par d'autres processus depuis le dernier appel
+        
+        Appelé périodiquement par le service (voir CACHE_REVALIDATE_INTERVAL) : doit
+        rester peu coûteux quand rien n'a changé. Les écritures de ce processus, déjà
+        appliquées en mémoire, ne sont pas renvoyées. Par défaut : aucun autre processus.
+        
+        Returns:
+            Optional[List[Dict]]: Entrées {"op": "add", "sale": ...} ou {"op": "delete", "id": ...}
+            dans l'ordre des écritures (vide si rien n'a changé), ou None si l'état stocké a
+            été remplacé et doit être rechargé entièrement avec load_all
+        """
+        return []
+    
+    def needs_compaction(self) -> bool:
+        """
+        Indiquer si le service doit réécrire l'état complet via save_all
+        
+        Returns:
+            bool: True si une compaction est nécessaire
+        """
+        return False
+    
+    def stored_records(self) -> Optional[int]:
+        """
+        Nombre d'enregistrements stockés, pierres tombales et versions remplacées comprises
+        
+        Comparé au nombre de ventes vivantes, donne la part d'enregistrements morts qui
+        déclenche la compaction en arrière-plan.
+        
+        Returns:
+            Optional[int]: Nombre d'enregistrements, ou None si le backend supprime
+            physiquement (ou ne le sait pas encore)
+        """
+        return None
+    
+    def compact(self) -> None:
+        """
+        Réécrire le stockage sans enregistrements morts (si compacts_in_place)
+        
+        Appelé par le thread écrivain du service, dans l'ordre des autres écritures.
+        """
+    
+    def get(self, sale_id: str) -> Optional[Dict]:
+        """
+        Récupérer une vente par son ID
+        
+        Args:
+            sale_id: ID de la vente
+            
+        Returns:
+            Optional[Dict]: Vente ou None
+        """
+        for sale in self.load_all():
+            if sale.get("id") == sale_id:
+                return sale
+        return None
+    
+    def find_by_user(self, username: str) -> List[Dict]:
+        """
+        Récupérer les ventes d'un utilisateur
+        
+        Args:
+            username: Nom d'utilisateur
+            
+        Returns:
+            List[Dict]: Ventes de l'utilisateur
+        """
+        return [sale for sale in self.load_all() if sale.get("created_by") == username]
+    
+    def iter_range(self, start: Optional[date] = None, end: Optional[date] = None) -> Iterator[Dict]:
+        """
+        Parcourir les ventes d'un intervalle de jours par ordre chronologique
+        
+        Args:
+            start: Premier jour inclus (optionnel)
+            end: Dernier jour inclus (optionnel)
+            
+        Yields:
+            Dict: Ventes triées par (sale_date, id)
+        """
+        low = start.isoformat() if start else ""
+        high = (end + timedelta(days=1)).isoformat() if end else None
+        sales = [
+            sale for sale in self.load_all()
+            if low <= str(sale.get("sale_date") or "") and (high is None or str(sale.get("sale_date") or "") < high)
+        ]
+        sales.sort(key=lambda sale: (str(sale.get("sale_date") or ""), str(sale.get("id") or "")))
+        yield from sales
+    
+    def count(self) -> int:
+        """
+        Compter les ventes stockées
+        
+        Returns:
+            int: Nombre de ventes
+        """
+        return len(self.load_all())
+    
+    def total_revenue(self) -> float:
+        """
+        Calculer le chiffre d'affaires stocké
+        
+        Returns:
+            float: Chiffre d'affaires total
+        """
+        return sum(sale.get("total_price", 0) for sale in self.load_all())
+    
+    def close(self) -> None:
+        """Libérer les ressources du backend"""
+
+
+class UserStorage(ABC):
+    """Backend de stockage des utilisateurs"""
+    
+    # True si le backend répond aux lectures ponctuelles sans tout charger en mémoire
+    indexed = False
+    
+    @abstractmethod
+    def load_all(self) -> Optional[Dict[str, str]]:
+        """
+        Charger tous les utilisateurs
+        
+        Returns:
+            Optional[Dict[str, str]]: {username: hashed_password} ou None si le stockage est vide
+        """
+    
+    @abstractmethod
+    def save_all(self, users: Dict[str, str]) -> None:
+        """
+        Remplacer tous les utilisateurs stockés
+        
+        Args:
+            users: Dictionnaire {username: hashed_password}
+        """
+    
+    def generation(self) -> Optional[Hashable]:
+        """
+        Identifier l'état stocké sans le charger (vérification de fraîcheur du cache)
+        
+        Returns:
+            Optional[Hashable]: Valeur qui change à chaque modification, y compris par un
+            autre processus ; None par défaut (cache jamais invalidé)
+        """
+        return None
+    
+    def get(self, username: str) -> Optional[str]:
+        """
+        Récupérer le hash du mot de passe d'un utilisateur
+        
+        Args:
+            username: Nom d'utilisateur
+            
+        Returns:
+            Optional[str]: Hash du mot de passe ou None
+        """
+        return (self.load_all() or {}).get(username)
+    
+    def close(self) -> None:
+        """Libérer les ressources du backend"""
+
+
+@dataclass
+class SessionRecord:
+    """Session stockée : données publiques et horodatages d'expiration"""
+    data: Dict[str, str]
+    created_at: float
+    expires_at: float
+
+
+class SessionStore(ABC):
+    """Stockage des sessions utilisateur"""
+    
+    # True si le stockage est partagé entre processus (workers uvicorn)
+    shared = False
+    
+    @abstractmethod
+    def save(self, token: str, record: SessionRecord) -> None:
+        """
+        Enregistrer une session
+        
+        Args:
+            token: Token de session
+            record: Session à enregistrer
+        """
+    
+    @abstractmethod
+    def load(self, token: str) -> Optional[SessionRecord]:
+        """
+        Lire une session
+        
+        Args:
+            token: Token de session
+            
+        Returns:
+            Optional[SessionRecord]: Session ou None
+        """
+    
+    @abstractmethod
+    def touch(self, token: str, expires_at: float) -> None:
+        """
+        Repousser l'échéance d'une session
+        
+        Args:
+            token: Token de session
+            expires_at: Nouvelle échéance
+        """
+    
+    @abstractmethod
+    def delete(self, token: str) -> None:
+        """
+        Supprimer une session
+        
+        Args:
+            token: Token de session
+        """
+    
+    def resolve(
+        self,
+        token: str,
+        now: float,
+        idle_timeout: float,
+        absolute_timeout: float,
+        touch_interval: float
+    ) -> Optional[SessionRecord]:
+        """
+        Lire une session valide et repousser son échéance d'inactivité
+        
+        Implémentation par défaut : load puis touch si l'échéance a assez bougé.
+        Un stockage distant peut la surcharger pour tout faire en un aller-retour.
+        
+        Args:
+            token: Token de session
+            now: Timestamp courant
+            idle_timeout: Inactivité maximale
+            absolute_timeout: Durée de vie maximale
+            touch_interval: Écart minimal avant de réécrire l'échéance
+            
+        Returns:
+            Optional[SessionRecord]: Session valide ou None si absente ou expirée
+        """
+        record = self.load(token)
+        if record is None:
+            return None
+        if record.expires_at <= now:
+            self.delete(token)
+            return None
+        
+        # Échéance d'inactivité repoussée, sans dépasser la durée maximale
+        expires_at = min(record.created_at + absolute_timeout, now + idle_timeout)
+        if expires_at - record.expires_at >= touch_interval:
+            record.expires_at = expires_at
+            self.touch(token, expires_at)
+        return record
+    
+    @abstractmethod
+    def sweep(self, now: float) -> int:
+        """
+        Supprimer les sessions expirées
+        
+        Args:
+            now: Timestamp courant
+            
+        Returns:
+            int: Nombre de sessions supprimées
+        """
+    
+    @abstractmethod
+    def count(self) -> int:
+        """
+        Compter les sessions stockées
+        
+        Returns:
+            int: Nombre de sessions
+        """
+    
+    def close(self) -> None:
+        """Libérer les ressources du stockage"""
@@ -0,0 +1,59 @@
+"""
+Verrou exclusif entre processus (fichier verrouillé avec flock)
+Responsabilités :
+- Exclusion mutuelle des workers qui écrivent les mêmes fichiers de ventes
+- Réentrant dans un processus (un lot d'écritures peut reprendre le verrou)
+"""
+import os
+import threading
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows : exclusion limitée au processus courant
+    fcntl = None
+
+
+class FileLock:
+    """Verrou exclusif sur un fichier, partagé par les threads et les processus"""
+    
+    def __init__(self, lock_file: str):
+        self.lock_file = lock_file
+        # Threads du processus : un seul détenteur, qui peut reprendre le verrou
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd: Optional[int] = None
+    
+    def acquire(self) -> None:
+        """Prendre le verrou (bloquant)"""
+        self._thread_lock.acquire()
+        if self._depth == 0 and fcntl is not None:
+            try:
+                if self._fd is None:
+                    self._fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            except BaseException:
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+    
+    def release(self) -> None:
+        """Rendre le verrou"""
+        self._depth -= 1
+        if self._depth == 0 and self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._thread_lock.release()
+    
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+    
+    def close(self) -> None:
+        """Fermer le fichier de verrou"""
+        with self._thread_lock:
+            if self._fd is not None and self._depth == 0:
+                os.close(self._fd)
+                self._fd = None
@@ -0,0 +1,270 @@
+"""
+Backends de stockage JSON (défaut pour les petites installations)
+Responsabilités :
+- Snapshot des ventes dans sales.json, avec journal optionnel
+- Utilisateurs dans users.json
+- Détection des modifications faites par d'autres processus (stat des fichiers)
+- Journal et compaction sous verrou exclusif entre processus (aucune écriture perdue)
+"""
+import json
+import os
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import ContextManager, Dict, Hashable, Iterator, List, Optional, Tuple
+
+from .base import SalesStorage, UserStorage
+from .file_lock import FileLock
+from .sales_journal import SalesJournal
+
+
+def write_json_atomic(path: str, data) -> None:
+    """
+    Écrire un fichier JSON de façon atomique (fichier temporaire puis renommage)
+    
+    Args:
+        path: Chemin du fichier
+        data: Données à sérialiser
+    """
+    tmp_file = f"{path}.tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(data, f, indent=2)
+        # Contenu sur disque avant le renommage : jamais de fichier vide après une coupure
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, path)
+
+
+def file_stamp(path: str) -> Optional[Tuple[int, int, int]]:
+    """
+    Identifier l'état d'un fichier sans le lire
+    
+    Args:
+        path: Chemin du fichier
+        
+    Returns:
+        Optional[Tuple[int, int, int]]: (inode, date de modification en ns, taille),
+        ou None si le fichier n'existe pas ; change à chaque réécriture atomique
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def apply_entries(sales: List[Dict], entries: List[Dict]) -> List[Dict]:
+    """
+    Appliquer des entrées de journal à une liste de ventes
+    
+    Args:
+        sales: Ventes
+        entries: Entrées {"op": "add", "sale": ...} ou {"op": "delete", "id": ...}
+        
+    Returns:
+        List[Dict]: Ventes après application des entrées
+    """
+    sales_by_id = {sale.get("id"): sale for sale in sales}
+    for entry in entries:
+        if entry.get("op") == "add":
+            sales_by_id[entry["sale"].get("id")] = entry["sale"]
+        elif entry.get("op") == "delete":
+            sales_by_id.pop(entry.get("id"), None)
+    return list(sales_by_id.values())
+
+
+class JsonSalesStorage(SalesStorage):
+    """Ventes dans un snapshot JSON, avec journal append-only optionnel"""
+    
+    def __init__(self, sales_file: str, journal_file: Optional[str] = None, compact_every: int = 1000):
+        self.sales_file = sales_file
+        # Verrou entre workers : ajouts au journal, chargement et réécriture du snapshot
+        self._lock: Optional[FileLock] = FileLock(f"{journal_file}.lock") if journal_file else None
+        # Mode journal : chaque mutation est ajoutée au journal au lieu de réécrire le fichier
+        self._journal: Optional[SalesJournal] = SalesJournal(journal_file, lock=self._lock) if journal_file else None
+        self.compact_every = compact_every
+        # Sans journal, une écriture n'est durable qu'après la réécriture du snapshot
+        self.durable_appends = self._journal is not None
+        # Avec journal, la compaction relit l'état stocké sous verrou (écritures des autres
+        # workers comprises) au lieu de réécrire l'état en mémoire de ce processus
+        self.compacts_in_place = self._journal is not None
+        self._dirty = False
+        # Ventes du dernier snapshot lu ou écrit (enregistrements morts : voir stored_records)
+        self._snapshot_count: Optional[int] = None
+        # Snapshot chargé ou écrit en dernier par ce processus
+        self._snapshot_stamp: Optional[Tuple[int, int, int]] = None
+        # Lecture du journal (poll_changes) exclusive avec sa remise à zéro (save_all) ;
+        # toujours pris après le verrou entre processus
+        self._poll_lock = threading.Lock()
+        # Écritures des autres workers intégrées au snapshot lors d'une réécriture, à renvoyer
+        # par le prochain poll_changes (None : état remplacé, tout recharger)
+        self._carried: Optional[List[Dict]] = []
+    
+    def _exclusive(self) -> ContextManager:
+        """Verrou entre processus (sans journal : aucun)"""
+        return self._lock if self._lock is not None else nullcontext()
+    
+    def _foreign_tail(self) -> Optional[List[Dict]]:
+        """
+        Écritures des autres workers pas encore lues (appelé sous les deux verrous)
+        
+        Returns:
+            Optional[List[Dict]]: Entrées du journal, ou None si un autre worker a réécrit
+            le snapshot depuis le dernier chargement
+        """
+        if file_stamp(self.sales_file) != self._snapshot_stamp:
+            return None
+        return self._journal.read_new()
+    
+    def _carry(self, entries: Optional[List[Dict]]) -> None:
+        """
+        Garder des entrées pour le prochain poll_changes
+        
+        Args:
+            entries: Entrées intégrées au snapshot, ou None (rechargement complet nécessaire)
+        """
+        if entries is None:
+            self._carried = None
+        elif self._carried is not None:
+            self._carried.extend(entries)
+    
+    def _write_snapshot(self, sales: List[Dict]) -> None:
+        """
+        Écrire le snapshot et vider le journal (appelé sous les deux verrous)
+        
+        Args:
+            sales: État complet des ventes
+        """
+        write_json_atomic(self.sales_file, sales)
+        # Le snapshot contient tout : le journal peut être vidé
+        if self._journal is not None:
+            self._journal.reset()
+        self._snapshot_stamp = file_stamp(self.sales_file)
+        self._snapshot_count = len(sales)
+        self._dirty = False
+    
+    def load_all(self) -> List[Dict]:
+        """Charger le snapshot puis rejouer le journal"""
+        # Verrou entre processus : pas de compaction entre la lecture du snapshot et celle du journal
+        with self._exclusive(), self._poll_lock:
+            self._carried = []
+            # Relevé avant la lecture : un remplacement pendant la lecture sera redétecté
+            self._snapshot_stamp = file_stamp(self.sales_file)
+            sales: List[Dict] = []
+            if os.path.exists(self.sales_file):
+                with open(self.sales_file, "r") as f:
+                    sales = json.load(f)
+            self._snapshot_count = len(sales)
+            
+            if self._journal is not None:
+                sales = self._journal.replay(sales)
+            return sales
+    
+    def save_all(self, sales: List[Dict]) -> None:
+        """Réécrire le snapshot et vider le journal (écritures des autres workers conservées)"""
+        with self._exclusive(), self._poll_lock:
+            if self._journal is not None:
+                tail = self._foreign_tail()
+                if tail is None:
+                    # Snapshot réécrit ailleurs : le journal courant lui est postérieur
+                    self._journal.offset = 0
+                    tail = self._journal.read_new() or []
+                if tail:
+                    # Lignes ajoutées par les autres workers depuis la dernière lecture :
+                    # appliquées par-dessus l'état reçu, puis transmises au service
+                    sales = apply_entries(sales, tail)
+                    self._carry(tail)
+            self._write_snapshot(sales)
+    
+    def compact(self) -> None:
+        """Réécrire le snapshot à partir du snapshot et du journal stockés, sous verrou exclusif"""
+        with self._exclusive(), self._poll_lock:
+            # Écritures des autres workers non encore lues : transmises au service
+            self._carry(self._foreign_tail())
+            sales: List[Dict] = []
+            if os.path.exists(self.sales_file):
+                with open(self.sales_file, "r") as f:
+                    sales = json.load(f)
+            self._write_snapshot(self._journal.replay(sales))
+    
+    def poll_changes(self) -> Optional[List[Dict]]:
+        """Snapshot remplacé : tout recharger ; sinon lire la fin du journal"""
+        with self._poll_lock:
+            carried, self._carried = self._carried, []
+            if carried is None or file_stamp(self.sales_file) != self._snapshot_stamp:
+                return None
+            if self._journal is None:
+                return carried
+            changes = self._journal.read_new()
+            return None if changes is None else carried + changes
+    
+    def append(self, sale: Dict) -> None:
+        """Journaliser l'ajout (ou marquer le snapshot à réécrire)"""
+        if self._journal is None:
+            self._dirty = True
+            return
+        self._journal.append_add(sale)
+    
+    def append_many(self, sales: List[Dict]) -> None:
+        """Journaliser le lot en une écriture (ou marquer le snapshot à réécrire)"""
+        if self._journal is None:
+            self._dirty = True
+            return
+        self._journal.append_add_many(sales)
+    
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Un seul fsync du journal pour tout le lot (sans journal : snapshot réécrit par compaction)"""
+        if self._journal is None:
+            yield
+            return
+        with self._journal.batch():
+            yield
+    
+    def delete(self, sale_id: str) -> None:
+        """Journaliser la suppression (ou marquer le snapshot à réécrire)"""
+        if self._journal is None:
+            self._dirty = True
+            return
+        self._journal.append_delete(sale_id)
+    
+    def needs_compaction(self) -> bool:
+        """Seuil du journal atteint, ou mutation en attente sans journal"""
+        # Sans journal, chaque mutation impose la réécriture complète du snapshot
+        if self._journal is None:
+            return self._dirty
+        return self._journal.entries_count >= self.compact_every
+    
+    def stored_records(self) -> Optional[int]:
+        """Ventes du snapshot + lignes du journal (ajouts et pierres tombales)"""
+        if self._journal is None or self._snapshot_count is None:
+            return None
+        return self._snapshot_count + self._journal.entries_count
+    
+    def close(self) -> None:
+        """Fermer le journal"""
+        if self._journal is not None:
+            self._journal.close()
+        if self._lock is not None:
+            self._lock.close()
+
+
+class JsonUserStorage(UserStorage):
+    """Utilisateurs dans un fichier JSON {username: hashed_password}"""
+    
+    def __init__(self, users_file: str):
+        self.users_file = users_file
+    
+    def generation(self) -> Optional[Hashable]:
+        """Inode, date de modification et taille de users.json"""
+        return file_stamp(self.users_file)
+    
+    def load_all(self) -> Optional[Dict[str, str]]:
+        """Charger users.json (None si absent)"""
+        if not os.path.exists(self.users_file):
+            return None
+        with open(self.users_file, "r") as f:
+            return json.load(f)
+    
+    def save_all(self, users: Dict[str, str]) -> None:
+        """Réécrire users.json"""
+        write_json_atomic(self.users_file, users)
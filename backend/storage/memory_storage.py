@@ -0,0 +1,65 @@
+"""
+Stockage des sessions en mémoire (un seul processus)
+Responsabilités :
+- Sessions dans un dictionnaire local au processus
+- Expiration par tas des échéances (seules les échéances dépassées sont dépilées)
+"""
+import heapq
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from .base import SessionRecord, SessionStore
+
+
+class MemorySessionStore(SessionStore):
+    """Sessions en mémoire du processus"""
+    
+    def __init__(self):
+        self._records: Dict[str, SessionRecord] = {}
+        # Tas des échéances (expiration, token) ; une entrée peut être périmée
+        # si la session a été utilisée depuis : elle est alors replanifiée
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._lock = threading.Lock()
+    
+    def save(self, token: str, record: SessionRecord) -> None:
+        """Enregistrer la session et planifier son échéance"""
+        with self._lock:
+            self._records[token] = record
+            heapq.heappush(self._expiry_heap, (record.expires_at, token))
+    
+    def load(self, token: str) -> Optional[SessionRecord]:
+        """Lire la session"""
+        return self._records.get(token)
+    
+    def touch(self, token: str, expires_at: float) -> None:
+        """Repousser l'échéance (l'entrée du tas sera replanifiée au nettoyage)"""
+        with self._lock:
+            record = self._records.get(token)
+            if record is not None:
+                record.expires_at = expires_at
+    
+    def delete(self, token: str) -> None:
+        """Supprimer la session"""
+        with self._lock:
+            self._records.pop(token, None)
+    
+    def sweep(self, now: float) -> int:
+        """Dépiler les échéances dépassées"""
+        removed = 0
+        with self._lock:
+            while self._expiry_heap and self._expiry_heap[0][0] <= now:
+                _, token = heapq.heappop(self._expiry_heap)
+                record = self._records.get(token)
+                if record is None:
+                    continue
+                if record.expires_at <= now:
+                    del self._records[token]
+                    removed += 1
+                else:
+                    # Session utilisée depuis : replanifier à sa nouvelle échéance
+                    heapq.heappush(self._expiry_heap, (record.expires_at, token))
+        return removed
+    
+    def count(self) -> int:
+        """Nombre de sessions en mémoire"""
+        return len(self._records)
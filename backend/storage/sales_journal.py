@@ -0,0 +1,210 @@
+"""
+Journal des ventes en ajout seul (JSONL)
+Responsabilités :
+- Écriture d'une ligne par mutation (ajout / suppression)
+- Rejeu du journal sur un snapshot au démarrage
+- Lecture des entrées ajoutées par d'autres processus (suivi de la fin du fichier)
+- Remise à zéro après compaction du snapshot
+- Écritures sous verrou entre processus (lignes jamais entremêlées)
+"""
+import json
+import os
+import uuid
+from contextlib import contextmanager, nullcontext
+from typing import ContextManager, Dict, Iterator, List, Optional, TextIO
+
+from .file_lock import FileLock
+
+
+class SalesJournal:
+    """Journal append-only des mutations de ventes"""
+    
+    def __init__(self, journal_file: str, writer_id: Optional[str] = None, lock: Optional[FileLock] = None):
+        self.journal_file = journal_file
+        # Verrou partagé avec les autres workers (None : un seul processus écrit le fichier)
+        self.lock = lock
+        self._handle: Optional[TextIO] = None
+        self.entries_count = 0
+        # Dans un lot, les entrées restent en mémoire tampon jusqu'au sync final
+        self._deferred = False
+        # Auteur des entrées de ce processus : ignorées lors du suivi du journal
+        self.writer_id = writer_id or uuid.uuid4().hex[:12]
+        # Fin de ligne des entrées de ce processus ("writer" est toujours la dernière clé)
+        self._own_suffix = f',"writer":"{self.writer_id}"}}\n'.encode()
+        # Octets du journal déjà appliqués en mémoire (rejeu puis suivi)
+        self.offset = 0
+        self._repaired = False
+    
+    def _exclusive(self) -> ContextManager:
+        """Verrou entre processus s'il est configuré"""
+        return self.lock if self.lock is not None else nullcontext()
+    
+    def _flush(self) -> None:
+        """Transmettre les entrées au système (sauf pendant un lot)"""
+        if not self._deferred:
+            self._handle.flush()
+    
+    def _write(self, entry: Dict) -> None:
+        """
+        Écrire une entrée à la fin du journal
+        
+        Args:
+            entry: Entrée à sérialiser
+        """
+        with self._exclusive():
+            if self._handle is None:
+                self._handle = open(self.journal_file, "a")
+            self._handle.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            self._flush()
+        self.entries_count += 1
+    
+    def append_add(self, sale: Dict) -> None:
+        """
+        Journaliser l'ajout d'une vente
+        
+        Args:
+            sale: Vente ajoutée
+        """
+        self._write({"op": "add", "sale": sale, "writer": self.writer_id})
+    
+    def append_add_many(self, sales: List[Dict]) -> None:
+        """
+        Journaliser l'ajout d'un lot de ventes (un seul flush)
+        
+        Args:
+            sales: Ventes ajoutées
+        """
+        with self._exclusive():
+            if self._handle is None:
+                self._handle = open(self.journal_file, "a")
+            self._handle.writelines(
+                json.dumps({"op": "add", "sale": sale, "writer": self.writer_id}, separators=(",", ":")) + "\n"
+                for sale in sales
+            )
+            self._flush()
+        self.entries_count += len(sales)
+    
+    def append_delete(self, sale_id: str) -> None:
+        """
+        Journaliser la suppression d'une vente
+        
+        Args:
+            sale_id: ID de la vente supprimée
+        """
+        self._write({"op": "delete", "id": sale_id, "writer": self.writer_id})
+    
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Écrire les entrées du bloc puis les rendre durables en un seul fsync"""
+        # Verrou gardé jusqu'au sync : les lignes en tampon ne sont écrites qu'à la fin
+        with self._exclusive():
+            self._deferred = True
+            try:
+                yield
+            finally:
+                self._deferred = False
+            self.sync()
+    
+    def sync(self) -> None:
+        """Vider le tampon et forcer l'écriture sur disque"""
+        if self._handle is not None:
+            self._handle.flush()
+            os.fsync(self._handle.fileno())
+    
+    def replay(self, sales: List[Dict]) -> List[Dict]:
+        """
+        Rejouer le journal sur un snapshot
+        
+        Args:
+            sales: Ventes du snapshot
+            
+        Returns:
+            List[Dict]: Ventes après application du journal
+        """
+        self.entries_count = 0
+        self.offset = 0
+        if self._handle is not None:
+            # Entrées de ce processus encore en tampon (lot en cours) : relues avec le reste
+            self._handle.flush()
+        if not os.path.exists(self.journal_file):
+            return sales
+        
+        sales_by_id = {sale.get("id"): sale for sale in sales}
+        valid_offset = 0
+        truncated = False
+        with open(self.journal_file, "rb") as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("ligne incomplète")
+                    entry = json.loads(line)
+                except ValueError:
+                    # Dernière ligne tronquée (arrêt pendant une écriture)
+                    truncated = True
+                    break
+                if entry.get("op") == "add":
+                    sale = entry["sale"]
+                    sales_by_id[sale.get("id")] = sale
+                elif entry.get("op") == "delete":
+                    sales_by_id.pop(entry.get("id"), None)
+                valid_offset += len(line)
+                self.entries_count += 1
+        
+        self.offset = valid_offset
+        if truncated and not self._repaired:
+            # Couper la ligne tronquée pour que les prochains ajouts restent lisibles ;
+            # au premier chargement seulement (ensuite, ce peut être une écriture en cours
+            # d'un autre processus)
+            os.truncate(self.journal_file, valid_offset)
+        self._repaired = True
+        return list(sales_by_id.values())
+    
+    def read_new(self) -> Optional[List[Dict]]:
+        """
+        Lire les entrées ajoutées par d'autres processus depuis la dernière lecture
+        
+        Returns:
+            Optional[List[Dict]]: Entrées dans l'ordre du journal, ou None si le journal
+            a été vidé entre-temps (compaction par un autre processus : tout recharger)
+        """
+        try:
+            size = os.path.getsize(self.journal_file)
+        except FileNotFoundError:
+            size = 0
+        if size < self.offset:
+            return None
+        if size == self.offset:
+            return []
+        
+        entries = []
+        with open(self.journal_file, "rb") as f:
+            f.seek(self.offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Ligne en cours d'écriture : relue au prochain appel
+                    break
+                self.offset += len(line)
+                if line.endswith(self._own_suffix):
+                    # Écriture de ce processus, déjà appliquée en mémoire
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+        return entries
+    
+    def reset(self) -> None:
+        """Vider le journal (après écriture d'un nouveau snapshot)"""
+        self.close()
+        with open(self.journal_file, "w"):
+            pass
+        self.entries_count = 0
+        self.offset = 0
+    
+    def close(self) -> None:
+        """Fermer le fichier du journal"""
+        if self._handle is not None:
+            with self._exclusive():
+                # Tampon éventuel écrit sous verrou
+                self._handle.close()
+            self._handle = None
@@ -0,0 +1,528 @@
+"""
+Backend de stockage des ventes en segments mensuels
+Responsabilités :
+- Un fichier JSONL par mois de vente (ajouts / suppressions, format du journal)
+- Manifeste : intervalle de dates, nombre de ventes, CA et taille de chaque segment
+- Compaction des seuls segments dont les lignes mortes dépassent le seuil
+- Lectures par intervalle limitées aux segments qui le recouvrent
+- Segments chargés à la demande et gardés dans un cache LRU (mois clos relus au besoin)
+"""
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from contextlib import ExitStack, contextmanager
+from datetime import date, timedelta
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from .base import SalesStorage
+from .json_storage import file_stamp, write_json_atomic
+from .sales_journal import SalesJournal
+
+MANIFEST_FILE = "manifest.json"
+# Segment des ventes dont la date n'a pas la forme YYYY-MM...
+UNDATED_SEGMENT = "undated"
+
+
+def segment_key(sale: Dict) -> str:
+    """
+    Segment d'une vente : mois de sa date
+    
+    Args:
+        sale: Vente
+        
+    Returns:
+        str: "YYYY-MM" ou UNDATED_SEGMENT
+    """
+    month = str(sale.get("sale_date") or "")[:7]
+    if len(month) == 7 and month[4] == "-" and month[:4].isdigit() and month[5:].isdigit():
+        return month
+    return UNDATED_SEGMENT
+
+
+def _segment_stats(sales: Iterator[Dict]) -> Dict:
+    """
+    Calculer l'entrée de manifeste d'un segment à partir de ses ventes
+    
+    Args:
+        sales: Ventes du segment
+        
+    Returns:
+        Dict: {"min_date", "max_date", "count", "revenue"} (dates None si segment vide)
+    """
+    stats = {"min_date": None, "max_date": None, "count": 0, "revenue": 0.0}
+    for sale in sales:
+        _widen(stats, sale)
+        stats["count"] += 1
+        stats["revenue"] += sale.get("total_price", 0)
+    return stats
+
+
+def _widen(stats: Dict, sale: Dict) -> None:
+    """
+    Élargir l'intervalle de dates d'un segment à une vente
+    
+    Args:
+        stats: Entrée de manifeste
+        sale: Vente ajoutée au segment
+    """
+    sale_date = str(sale.get("sale_date") or "")
+    if stats["min_date"] is None or sale_date < stats["min_date"]:
+        stats["min_date"] = sale_date
+    if stats["max_date"] is None or sale_date > stats["max_date"]:
+        stats["max_date"] = sale_date
+
+
+class SegmentedSalesStorage(SalesStorage):
+    """
+    Ventes découpées en un fichier par mois, décrites par un manifeste
+    
+    Les comptages et le CA sont lus dans le manifeste ; les lectures par intervalle
+    n'ouvrent que les segments dont l'intervalle [min_date, max_date] le recoupe.
+    Une suppression ou un remplacement nécessite de savoir où est la vente : l'index
+    id -> segment est construit au premier besoin (une lecture de tous les segments).
+    Les suppressions et remplacements sont des lignes ajoutées ; compact réécrit les
+    segments dont la part de lignes mortes atteint compaction_ratio.
+    """
+    
+    indexed = True
+    compacts_in_place = True
+    
+    def __init__(self, directory: str, cache_size: int = 12, compaction_ratio: float = 0.25):
+        self.directory = directory
+        self.cache_size = cache_size
+        self.compaction_ratio = compaction_ratio
+        os.makedirs(directory, exist_ok=True)
+        self._manifest_file = os.path.join(directory, MANIFEST_FILE)
+        # Écritures (thread écrivain) et lectures directes (requêtes) sérialisées
+        self._lock = threading.RLock()
+        # Auteur commun aux journaux des segments (ignoré par poll_changes)
+        self._writer_id = uuid.uuid4().hex[:12]
+        self._segments: Dict[str, Dict] = {}
+        self._journals: Dict[str, SalesJournal] = {}
+        # Contenu des segments lus récemment : segment -> {id: vente}
+        self._cache: "OrderedDict[str, Dict[str, Dict]]" = OrderedDict()
+        # id -> (segment, total_price), construit au premier besoin
+        self._locations: Optional[Dict[str, Tuple[str, float]]] = None
+        # Lot en cours : journaux en écriture différée, manifeste écrit à la fin
+        self._batch: Optional[ExitStack] = None
+        self._batched: Set[str] = set()
+        self._manifest_stamp = None
+        self._open_manifest()
+    
+    def _segment_file(self, key: str) -> str:
+        """Chemin du fichier d'un segment"""
+        return os.path.join(self.directory, f"{key}.jsonl")
+    
+    def _read_manifest(self) -> Dict[str, Dict]:
+        """
+        Lire le manifeste (vide s'il n'existe pas)
+        
+        Returns:
+            Dict[str, Dict]: Segment -> {"min_date", "max_date", "count", "revenue", "records", "size"}
+        """
+        self._manifest_stamp = file_stamp(self._manifest_file)
+        if self._manifest_stamp is None:
+            return {}
+        with open(self._manifest_file, "r") as f:
+            return json.load(f)["segments"]
+    
+    def _open_manifest(self) -> None:
+        """Lire le manifeste et recalculer les segments modifiés depuis son écriture (arrêt brutal)"""
+        self._segments = self._read_manifest()
+        stale = False
+        for name in os.listdir(self.directory):
+            if name.endswith(".jsonl") and name[:-len(".jsonl")] not in self._segments:
+                self._segments[name[:-len(".jsonl")]] = {"size": -1}
+        for key, info in list(self._segments.items()):
+            if os.path.exists(self._segment_file(key)) and \
+                    os.path.getsize(self._segment_file(key)) == info.get("size"):
+                continue
+            # Segment écrit après le dernier manifeste : entrée recalculée
+            stale = True
+            segment = self._load_segment(key)
+            self._refresh_stats(key, segment, self._journal(key).entries_count)
+        if stale:
+            self._write_manifest()
+    
+    def _write_manifest(self) -> None:
+        """Écrire le manifeste (atomique), sauf pendant un lot"""
+        if self._batch is not None:
+            return
+        for key in self._batched:
+            self._segments[key]["size"] = os.path.getsize(self._segment_file(key))
+        self._batched.clear()
+        write_json_atomic(self._manifest_file, {"segments": dict(sorted(self._segments.items()))})
+        self._manifest_stamp = file_stamp(self._manifest_file)
+    
+    def _refresh_stats(self, key: str, sales: Dict[str, Dict], records: Optional[int] = None) -> None:
+        """
+        Recalculer l'entrée de manifeste d'un segment à partir de son contenu
+        
+        Args:
+            key: Segment
+            sales: Contenu du segment
+            records: Lignes du fichier (défaut : une par vente, segment juste réécrit)
+        """
+        stats = _segment_stats(sales.values())
+        stats["records"] = len(sales) if records is None else records
+        path = self._segment_file(key)
+        stats["size"] = os.path.getsize(path) if os.path.exists(path) else 0
+        self._segments[key] = stats
+    
+    def _journal(self, key: str) -> SalesJournal:
+        """
+        Journal d'un segment (créé au premier usage)
+        
+        Args:
+            key: Segment
+            
+        Returns:
+            SalesJournal: Journal du fichier du segment
+        """
+        journal = self._journals.get(key)
+        if journal is None:
+            journal = self._journals[key] = SalesJournal(self._segment_file(key), self._writer_id)
+            # Contenu connu : taille au dernier manifeste lu (suivi par poll_changes)
+            journal.offset = max(self._segments.get(key, {}).get("size", 0), 0)
+        return journal
+    
+    def _load_segment(self, key: str) -> Dict[str, Dict]:
+        """
+        Contenu d'un segment, lu au premier accès puis gardé en cache (LRU)
+        
+        Args:
+            key: Segment
+            
+        Returns:
+            Dict[str, Dict]: id -> vente
+        """
+        sales = self._cache.get(key)
+        if sales is not None:
+            self._cache.move_to_end(key)
+            return sales
+        sales = {sale.get("id"): sale for sale in self._journal(key).replay([])}
+        self._cache[key] = sales
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return sales
+    
+    def _location_index(self) -> Dict[str, Tuple[str, float]]:
+        """
+        Index id -> (segment, total_price), construit au premier besoin
+        
+        Returns:
+            Dict[str, Tuple[str, float]]: Emplacement de chaque vente
+        """
+        if self._locations is None:
+            locations = {}
+            for key in sorted(self._segments):
+                for sale_id, sale in self._load_segment(key).items():
+                    locations[sale_id] = (key, sale.get("total_price", 0))
+            self._locations = locations
+        return self._locations
+    
+    def _overlapping(self, start: Optional[date], end: Optional[date]) -> List[str]:
+        """
+        Segments dont l'intervalle de dates recoupe un intervalle de jours
+        
+        Args:
+            start: Premier jour inclus (optionnel)
+            end: Dernier jour inclus (optionnel)
+            
+        Returns:
+            List[str]: Segments, du plus ancien au plus récent
+        """
+        low = start.isoformat() if start else None
+        high = (end + timedelta(days=1)).isoformat() if end else None
+        keys = []
+        for key, info in sorted(self._segments.items()):
+            if not info.get("count"):
+                continue
+            if low is not None and info["max_date"] < low:
+                continue
+            if high is not None and info["min_date"] >= high:
+                continue
+            keys.append(key)
+        return keys
+    
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Un fsync par segment modifié et une écriture du manifeste pour tout le lot"""
+        with self._lock:
+            if self._batch is not None:
+                yield
+                return
+            with ExitStack() as stack:
+                self._batch = stack
+                try:
+                    yield
+                finally:
+                    self._batch = None
+            # Journaux synchronisés à la sortie de la pile : le manifeste les suit
+            self._write_manifest()
+    
+    def _write_op(self, key: str) -> SalesJournal:
+        """
+        Journal d'un segment prêt pour une écriture (différée si un lot est en cours)
+        
+        Args:
+            key: Segment modifié
+            
+        Returns:
+            SalesJournal: Journal du segment
+        """
+        journal = self._journal(key)
+        if self._batch is not None and key not in self._batched:
+            self._batch.enter_context(journal.batch())
+        self._batched.add(key)
+        return journal
+    
+    def _remove_from(self, key: str, sale_id: str, total_price: float) -> None:
+        """
+        Retirer une vente d'un segment (ligne de suppression, compteurs du manifeste)
+        
+        Args:
+            key: Segment contenant la vente
+            sale_id: ID de la vente
+            total_price: Montant de la vente retirée
+        """
+        self._write_op(key).append_delete(sale_id)
+        stats = self._segments[key]
+        # La ligne supprimée et la pierre tombale restent dans le fichier jusqu'à compaction
+        stats["records"] = stats.get("records", stats["count"]) + 1
+        stats["count"] -= 1
+        stats["revenue"] -= total_price
+        cached = self._cache.get(key)
+        if cached is not None:
+            cached.pop(sale_id, None)
+    
+    def _add(self, sale: Dict) -> None:
+        """
+        Ajouter ou remplacer une vente dans le segment de son mois
+        
+        Args:
+            sale: Vente
+        """
+        locations = self._location_index()
+        sale_id = sale.get("id")
+        total_price = sale.get("total_price", 0)
+        key = segment_key(sale)
+        previous = locations.get(sale_id)
+        if previous is not None and previous[0] != key:
+            # Date modifiée d'un mois à l'autre : la vente change de segment
+            self._remove_from(previous[0], sale_id, previous[1])
+            previous = None
+        
+        self._write_op(key).append_add(sale)
+        stats = self._segments.setdefault(
+            key, {"min_date": None, "max_date": None, "count": 0, "revenue": 0.0, "records": 0}
+        )
+        _widen(stats, sale)
+        stats["records"] = stats.get("records", stats["count"]) + 1
+        if previous is None:
+            stats["count"] += 1
+            stats["revenue"] += total_price
+        else:
+            stats["revenue"] += total_price - previous[1]
+        cached = self._cache.get(key)
+        if cached is not None:
+            cached[sale_id] = sale
+        locations[sale_id] = (key, total_price)
+    
+    def load_all(self) -> List[Dict]:
+        """Charger tous les segments (manifeste relu : état écrit par les autres processus)"""
+        with self._lock:
+            for journal in self._journals.values():
+                journal.close()
+            self._journals = {}
+            self._cache.clear()
+            self._open_manifest()
+            sales: List[Dict] = []
+            locations = {}
+            for key in sorted(self._segments):
+                segment = self._load_segment(key)
+                sales.extend(segment.values())
+                for sale_id, sale in segment.items():
+                    locations[sale_id] = (key, sale.get("total_price", 0))
+            self._locations = locations
+            return sales
+    
+    def save_all(self, sales: List[Dict]) -> None:
+        """Réécrire chaque segment sans historique (ajouts seuls) et le manifeste"""
+        by_segment: Dict[str, Dict[str, Dict]] = {}
+        for sale in sales:
+            by_segment.setdefault(segment_key(sale), {})[sale.get("id")] = sale
+        
+        with self._lock:
+            for journal in self._journals.values():
+                journal.close()
+            self._journals = {}
+            self._cache.clear()
+            for key, segment in by_segment.items():
+                self._rewrite_segment(key, segment)
+            for key in set(self._segments) - set(by_segment):
+                os.remove(self._segment_file(key))
+            
+            self._segments = {}
+            for key, segment in by_segment.items():
+                self._refresh_stats(key, segment)
+            self._batched.clear()
+            self._locations = {
+                sale_id: (key, sale.get("total_price", 0))
+                for key, segment in by_segment.items()
+                for sale_id, sale in segment.items()
+            }
+            self._write_manifest()
+    
+    def _rewrite_segment(self, key: str, segment: Dict[str, Dict]) -> None:
+        """
+        Réécrire un segment avec ses seules ventes vivantes (fichier temporaire puis renommage)
+        
+        Args:
+            key: Segment
+            segment: Contenu du segment (id -> vente)
+        """
+        path = self._segment_file(key)
+        tmp_file = f"{path}.tmp"
+        with open(tmp_file, "w") as f:
+            f.writelines(
+                json.dumps({"op": "add", "sale": sale, "writer": self._writer_id}, separators=(",", ":")) + "\n"
+                for sale in segment.values()
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, path)
+    
+    def compact(self) -> None:
+        """Réécrire les segments dont la part de lignes mortes atteint compaction_ratio"""
+        with self.batch():
+            for key, info in list(self._segments.items()):
+                records = info.get("records", info.get("count", 0))
+                dead = records - info.get("count", 0)
+                if dead <= 0 or dead < self.compaction_ratio * records:
+                    continue
+                segment = self._load_segment(key)
+                journal = self._journals.get(key)
+                if journal is not None:
+                    # Même objet conservé (lot en cours) : il reprend à la fin du nouveau fichier
+                    journal.close()
+                if segment:
+                    self._rewrite_segment(key, segment)
+                    self._refresh_stats(key, segment)
+                else:
+                    # Mois entièrement supprimé : segment retiré du manifeste
+                    os.remove(self._segment_file(key))
+                    del self._segments[key]
+                    self._journals.pop(key, None)
+                    self._cache.pop(key, None)
+                    self._batched.discard(key)
+                    continue
+                if journal is not None:
+                    journal.offset = self._segments[key]["size"]
+                    journal.entries_count = len(segment)
+    
+    def stored_records(self) -> Optional[int]:
+        """Somme des lignes des segments (manifeste)"""
+        with self._lock:
+            return sum(info.get("records", info.get("count", 0)) for info in self._segments.values())
+    
+    def append(self, sale: Dict) -> None:
+        """Ajouter la vente au segment de son mois"""
+        with self.batch():
+            self._add(sale)
+    
+    def append_many(self, sales: List[Dict]) -> None:
+        """Ajouter un lot (un fsync par segment touché, un manifeste)"""
+        with self.batch():
+            for sale in sales:
+                self._add(sale)
+    
+    def delete(self, sale_id: str) -> None:
+        """Journaliser la suppression dans le segment de la vente"""
+        with self.batch():
+            location = self._location_index().pop(sale_id, None)
+            if location is not None:
+                self._remove_from(location[0], sale_id, location[1])
+    
+    def get(self, sale_id: str) -> Optional[Dict]:
+        """Lecture du seul segment contenant la vente"""
+        with self._lock:
+            location = self._location_index().get(sale_id)
+            if location is None:
+                return None
+            return self._load_segment(location[0]).get(sale_id)
+    
+    def iter_range(self, start: Optional[date] = None, end: Optional[date] = None) -> Iterator[Dict]:
+        """Lecture des seuls segments recoupant l'intervalle (dates du manifeste)"""
+        low = start.isoformat() if start else ""
+        high = (end + timedelta(days=1)).isoformat() if end else None
+        with self._lock:
+            keys = self._overlapping(start, end)
+        for key in keys:
+            with self._lock:
+                sales = [
+                    sale for sale in self._load_segment(key).values()
+                    if low <= str(sale.get("sale_date") or "") and (high is None or str(sale.get("sale_date") or "") < high)
+                ]
+            sales.sort(key=lambda sale: (str(sale.get("sale_date") or ""), str(sale.get("id") or "")))
+            yield from sales
+    
+    def count(self) -> int:
+        """Somme des comptages du manifeste"""
+        with self._lock:
+            return sum(info.get("count", 0) for info in self._segments.values())
+    
+    def total_revenue(self) -> float:
+        """Somme des CA du manifeste"""
+        with self._lock:
+            return sum(info.get("revenue", 0.0) for info in self._segments.values())
+    
+    def segments(self) -> Dict[str, Dict]:
+        """
+        Copie du manifeste (supervision)
+        
+        Returns:
+            Dict[str, Dict]: Segment -> {"min_date", "max_date", "count", "revenue", "records", "size"}
+        """
+        with self._lock:
+            return {key: dict(info) for key, info in sorted(self._segments.items())}
+    
+    def poll_changes(self) -> Optional[List[Dict]]:
+        """Manifeste inchangé : rien ; sinon fin des segments agrandis par un autre processus"""
+        with self._lock:
+            if file_stamp(self._manifest_file) == self._manifest_stamp:
+                return []
+            segments = self._read_manifest()
+            if set(self._segments) - set(segments):
+                # Segment supprimé : réécriture complète par un autre processus
+                return None
+            
+            changes: List[Dict] = []
+            for key in sorted(segments):
+                entries = self._journal(key).read_new()
+                if entries is None:
+                    return None
+                cached = self._cache.get(key)
+                for entry in entries:
+                    if entry.get("op") == "add":
+                        sale = entry["sale"]
+                        if cached is not None:
+                            cached[sale.get("id")] = sale
+                        if self._locations is not None:
+                            self._locations[sale.get("id")] = (key, sale.get("total_price", 0))
+                    elif entry.get("op") == "delete":
+                        if cached is not None:
+                            cached.pop(entry.get("id"), None)
+                        if self._locations is not None and self._locations.get(entry.get("id"), (key,))[0] == key:
+                            self._locations.pop(entry.get("id"), None)
+                changes.extend(entries)
+            self._segments = segments
+            return changes
+    
+    def close(self) -> None:
+        """Fermer les journaux des segments"""
+        with self._lock:
+            for journal in self._journals.values():
+                journal.close()
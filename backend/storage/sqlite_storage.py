@@ -0,0 +1,389 @@
+"""
+Backends de stockage SQLite (mode WAL)
+Responsabilités :
+- Lectures indexées sans charger tout le jeu de données
+- Lecteurs concurrents non bloquants pour l'écrivain (WAL)
+- Une connexion par thread (threadpool FastAPI)
+- Sessions partagées entre plusieurs workers d'une même machine
+- Changements des autres processus lisibles sans tout recharger (table sales_changes)
+"""
+import json
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import date, timedelta
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional
+
+from .base import SalesStorage, SessionRecord, SessionStore, UserStorage
+
+
+class SqliteDatabase:
+    """Connexions SQLite par thread, configurées en mode WAL"""
+    
+    def __init__(self, db_file: str):
+        self.db_file = db_file
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+    
+    def connection(self) -> sqlite3.Connection:
+        """
+        Récupérer la connexion du thread courant
+        
+        Returns:
+            sqlite3.Connection: Connexion SQLite
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+    
+    def close(self) -> None:
+        """Fermer toutes les connexions ouvertes"""
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+class SqliteSalesStorage(SalesStorage):
+    """Ventes dans une table SQLite indexée sur id, created_by et sale_date"""
+    
+    indexed = True
+    
+    def __init__(self, db_file: str, change_log_size: int = 10000):
+        self._db = SqliteDatabase(db_file)
+        # Lot en cours dans ce thread (les écritures ne valident pas individuellement)
+        self._batching = threading.local()
+        # Changements conservés dans sales_changes (un processus plus en retard recharge tout)
+        self.change_log_size = change_log_size
+        # Auteur des changements de ce processus : ignorés par poll_changes
+        self._writer_id = uuid.uuid4().hex[:12]
+        self._seen_lock = threading.Lock()
+        conn = self._db.connection()
+        with conn:
+            # Colonnes indexées + document JSON complet (tolère l'ajout de champs)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sales ("
+                " id TEXT PRIMARY KEY,"
+                " created_by TEXT,"
+                " sale_date TEXT,"
+                " total_price REAL NOT NULL DEFAULT 0,"
+                " data TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sales_created_by ON sales (created_by)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sales_sale_date ON sales (sale_date)")
+            # Ventes modifiées, dans l'ordre des commits (sale_id NULL : table remplacée)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sales_changes ("
+                " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " writer TEXT NOT NULL,"
+                " sale_id TEXT)"
+            )
+        # Dernier changement connu : seuls les suivants sont lus par poll_changes
+        self._seen_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM sales_changes").fetchone()[0]
+    
+    @staticmethod
+    def _row(sale: Dict) -> tuple:
+        """
+        Convertir une vente en ligne SQL
+        
+        Args:
+            sale: Vente
+            
+        Returns:
+            tuple: Valeurs des colonnes
+        """
+        return (
+            sale.get("id"),
+            sale.get("created_by"),
+            sale.get("sale_date"),
+            sale.get("total_price", 0),
+            json.dumps(sale, separators=(",", ":")),
+        )
+    
+    def _select(self, where: str = "", params: tuple = ()) -> List[Dict]:
+        """
+        Lire des ventes dans l'ordre d'insertion
+        
+        Args:
+            where: Clause WHERE optionnelle
+            params: Paramètres de la clause
+            
+        Returns:
+            List[Dict]: Ventes trouvées
+        """
+        cursor = self._db.connection().execute(f"SELECT data FROM sales {where} ORDER BY rowid", params)
+        return [json.loads(data) for (data,) in cursor]
+    
+    def load_all(self) -> List[Dict]:
+        """Charger toutes les ventes"""
+        return self._select()
+    
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Ouvrir une transaction, ou rejoindre celle du lot en cours
+        
+        Yields:
+            sqlite3.Connection: Connexion du thread courant
+        """
+        conn = self._db.connection()
+        if getattr(self._batching, "active", False):
+            yield conn
+            return
+        with conn:
+            yield conn
+    
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Toutes les écritures du bloc dans une seule transaction"""
+        with self._db.connection():
+            self._batching.active = True
+            try:
+                yield
+            finally:
+                self._batching.active = False
+    
+    def _log_changes(self, conn: sqlite3.Connection, sale_ids: Iterable[str]) -> None:
+        """
+        Enregistrer les ventes modifiées dans la transaction en cours
+        
+        Args:
+            conn: Connexion de la transaction
+            sale_ids: IDs des ventes ajoutées, remplacées ou supprimées
+        """
+        conn.executemany(
+            "INSERT INTO sales_changes (writer, sale_id) VALUES (?, ?)",
+            ((self._writer_id, sale_id) for sale_id in sale_ids)
+        )
+        conn.execute(
+            "DELETE FROM sales_changes WHERE seq <= (SELECT MAX(seq) FROM sales_changes) - ?",
+            (self.change_log_size,)
+        )
+    
+    def save_all(self, sales: List[Dict]) -> None:
+        """Remplacer le contenu de la table"""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM sales")
+            conn.executemany("INSERT OR REPLACE INTO sales VALUES (?, ?, ?, ?, ?)", map(self._row, sales))
+            # Les changements antérieurs sont remplacés par un marqueur de rechargement
+            conn.execute("DELETE FROM sales_changes")
+            marker = conn.execute(
+                "INSERT INTO sales_changes (writer, sale_id) VALUES (?, NULL)", (self._writer_id,)
+            ).lastrowid
+            with self._seen_lock:
+                # Le marqueur (écrit par ce processus) suit immédiatement : pas de trou détecté
+                self._seen_seq = marker - 1
+    
+    def append(self, sale: Dict) -> None:
+        """Insérer une vente"""
+        with self._transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO sales VALUES (?, ?, ?, ?, ?)", self._row(sale))
+            self._log_changes(conn, (sale.get("id"),))
+    
+    def append_many(self, sales: List[Dict]) -> None:
+        """Insérer un lot dans une seule transaction"""
+        with self._transaction() as conn:
+            conn.executemany("INSERT OR REPLACE INTO sales VALUES (?, ?, ?, ?, ?)", map(self._row, sales))
+            self._log_changes(conn, (sale.get("id") for sale in sales))
+    
+    def delete(self, sale_id: str) -> None:
+        """Supprimer une vente"""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM sales WHERE id = ?", (sale_id,))
+            self._log_changes(conn, (sale_id,))
+    
+    def poll_changes(self) -> Optional[List[Dict]]:
+        """Lire les changements des autres processus dans sales_changes, puis leurs ventes"""
+        conn = self._db.connection()
+        with self._seen_lock:
+            rows = conn.execute(
+                "SELECT seq, writer, sale_id FROM sales_changes WHERE seq > ? ORDER BY seq", (self._seen_seq,)
+            ).fetchall()
+            if not rows:
+                return []
+            # Trou : changements purgés avant d'avoir été lus
+            missed = rows[0][0] != self._seen_seq + 1
+            self._seen_seq = rows[-1][0]
+        
+        # Dernière position de chaque vente modifiée par un autre processus
+        changed: Dict[str, None] = {}
+        for _, writer, sale_id in rows:
+            if writer == self._writer_id:
+                continue
+            if sale_id is None:
+                missed = True
+                break
+            changed.pop(sale_id, None)
+            changed[sale_id] = None
+        if missed:
+            return None
+        
+        # Contenu actuel des ventes (absente : supprimée)
+        sale_ids = list(changed)
+        current: Dict[str, Dict] = {}
+        for start in range(0, len(sale_ids), 500):
+            part = sale_ids[start:start + 500]
+            placeholders = ",".join("?" * len(part))
+            for sale in self._select(f"WHERE id IN ({placeholders})", tuple(part)):
+                current[sale.get("id")] = sale
+        return [
+            {"op": "add", "sale": current[sale_id]} if sale_id in current else {"op": "delete", "id": sale_id}
+            for sale_id in sale_ids
+        ]
+    
+    def get(self, sale_id: str) -> Optional[Dict]:
+        """Lecture par clé primaire"""
+        sales = self._select("WHERE id = ?", (sale_id,))
+        return sales[0] if sales else None
+    
+    def find_by_user(self, username: str) -> List[Dict]:
+        """Lecture via l'index created_by"""
+        return self._select("WHERE created_by = ?", (username,))
+    
+    def iter_range(self, start: Optional[date] = None, end: Optional[date] = None) -> Iterator[Dict]:
+        """Lecture via l'index sale_date, sans charger les autres ventes"""
+        low = start.isoformat() if start else ""
+        high = (end + timedelta(days=1)).isoformat() if end else "\uffff"
+        # Lignes lues d'un coup : le générateur peut être repris depuis un autre thread
+        rows = self._db.connection().execute(
+            "SELECT data FROM sales WHERE sale_date >= ? AND sale_date < ? ORDER BY sale_date, id", (low, high)
+        ).fetchall()
+        for (data,) in rows:
+            yield json.loads(data)
+    
+    def count(self) -> int:
+        """Compter les lignes sans désérialiser les ventes"""
+        return self._db.connection().execute("SELECT COUNT(*) FROM sales").fetchone()[0]
+    
+    def total_revenue(self) -> float:
+        """Somme calculée par SQLite"""
+        return self._db.connection().execute("SELECT COALESCE(SUM(total_price), 0) FROM sales").fetchone()[0]
+    
+    def close(self) -> None:
+        """Fermer les connexions"""
+        self._db.close()
+
+
+class SqliteUserStorage(UserStorage):
+    """Utilisateurs dans une table SQLite (clé primaire username)"""
+    
+    indexed = True
+    
+    def __init__(self, db_file: str):
+        self._db = SqliteDatabase(db_file)
+        conn = self._db.connection()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS users ("
+                " username TEXT PRIMARY KEY,"
+                " hashed_password TEXT NOT NULL)"
+            )
+            # Compteur incrémenté à chaque modification, quel que soit le processus
+            conn.execute("CREATE TABLE IF NOT EXISTS generations (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO generations VALUES ('users', 0)")
+            for event in ("INSERT", "UPDATE", "DELETE"):
+                conn.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS users_generation_{event.lower()} AFTER {event} ON users "
+                    "BEGIN UPDATE generations SET value = value + 1 WHERE name = 'users'; END"
+                )
+    
+    def generation(self) -> Optional[Hashable]:
+        """Compteur de modifications de la table users"""
+        return self._db.connection().execute("SELECT value FROM generations WHERE name = 'users'").fetchone()[0]
+    
+    def load_all(self) -> Optional[Dict[str, str]]:
+        """Charger tous les utilisateurs (None si la table est vide)"""
+        rows = self._db.connection().execute("SELECT username, hashed_password FROM users").fetchall()
+        return dict(rows) if rows else None
+    
+    def save_all(self, users: Dict[str, str]) -> None:
+        """Remplacer le contenu de la table"""
+        conn = self._db.connection()
+        with conn:
+            conn.execute("DELETE FROM users")
+            conn.executemany("INSERT INTO users VALUES (?, ?)", users.items())
+    
+    def get(self, username: str) -> Optional[str]:
+        """Lecture par clé primaire"""
+        row = self._db.connection().execute(
+            "SELECT hashed_password FROM users WHERE username = ?", (username,)
+        ).fetchone()
+        return row[0] if row else None
+    
+    def close(self) -> None:
+        """Fermer les connexions"""
+        self._db.close()
+
+
+class SqliteSessionStore(SessionStore):
+    """Sessions dans une table SQLite, partagées entre processus"""
+    
+    shared = True
+    
+    def __init__(self, db_file: str):
+        self._db = SqliteDatabase(db_file)
+        conn = self._db.connection()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " token TEXT PRIMARY KEY,"
+                " data TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            # Index des échéances : le nettoyage ne lit que les sessions expirées
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions (expires_at)")
+    
+    def save(self, token: str, record: SessionRecord) -> None:
+        """Insérer la session"""
+        conn = self._db.connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?)",
+                (token, json.dumps(record.data), record.created_at, record.expires_at)
+            )
+    
+    def load(self, token: str) -> Optional[SessionRecord]:
+        """Lecture par clé primaire"""
+        row = self._db.connection().execute(
+            "SELECT data, created_at, expires_at FROM sessions WHERE token = ?", (token,)
+        ).fetchone()
+        if row is None:
+            return None
+        return SessionRecord(json.loads(row[0]), row[1], row[2])
+    
+    def touch(self, token: str, expires_at: float) -> None:
+        """Mettre à jour l'échéance"""
+        conn = self._db.connection()
+        with conn:
+            conn.execute("UPDATE sessions SET expires_at = ? WHERE token = ?", (expires_at, token))
+    
+    def delete(self, token: str) -> None:
+        """Supprimer la session"""
+        conn = self._db.connection()
+        with conn:
+            conn.execute("DELETE FROM sessions WHERE token = ?", (token,))
+    
+    def sweep(self, now: float) -> int:
+        """Supprimer les sessions expirées via l'index des échéances"""
+        conn = self._db.connection()
+        with conn:
+            return conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,)).rowcount
+    
+    def count(self) -> int:
+        """Nombre de sessions stockées"""
+        return self._db.connection().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+    
+    def close(self) -> None:
+        """Fermer les connexions"""
+        self._db.close()
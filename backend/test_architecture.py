@@ -43,6 +43,39 @@ def test_user_service():
         exists = user_service.user_exists("nonexistent")
         print(f"  ✅ Utilisateur inexistant: {not exists}")
         
+        # Test vérification dans le pool de processus borné
+        import asyncio
+        from services import PasswordHasher, PasswordHasherBusyError
+        hasher = PasswordHasher(workers=1, queue_limit=0)
+        hashed = user_service.hash_password("secret")
+        
+        async def verify_with_full_queue():
+            first = asyncio.ensure_future(hasher.verify("secret", hashed))
+            await asyncio.sleep(0)
+            try:
+                await hasher.verify("secret", hashed)
+                rejected = False
+            except PasswordHasherBusyError:
+                rejected = True
+            return await first, rejected
+        
+        verified, rejected = asyncio.run(verify_with_full_queue())
+        hasher.shutdown()
+        print(f"  ✅ Vérification dans le pool: {verified}")
+        print(f"  ✅ File pleine refusée: {rejected}")
+        
+        # Test limitation des tentatives (seaux à jetons, LRU borné)
+        from services import LoginThrottle, TokenBucketLimiter
+        throttle = LoginThrottle(
+            user_limiter=TokenBucketLimiter(capacity=2, refill_rate=0.01, max_keys=2),
+            ip_limiter=TokenBucketLimiter(capacity=10, refill_rate=0.01, max_keys=2)
+        )
+        attempts = [throttle.check("admin", "10.0.0.1") for _ in range(3)]
+        print(f"  ✅ 3e tentative refusée: {attempts[:2] == [0.0, 0.0] and attempts[2] > 0}")
+        throttle.check("a", "10.0.0.2")
+        throttle.check("b", "10.0.0.3")
+        print(f"  ✅ LRU borné: {len(throttle.user_limiter._buckets) == 2}")
+        
         return True
     except Exception as e:
         print(f"  ❌ Erreur UserService: {e}")
@@ -73,6 +106,49 @@ def test_session_service():
         session = session_service.get_session(token)
         print(f"  ✅ Session supprimée: {session is None}")
         
+        # Test expiration (inactivité et durée maximale)
+        import time
+        from services import SessionService
+        short_sessions = SessionService(idle_timeout=0.05, absolute_timeout=0.2, touch_interval=0)
+        token = short_sessions.create_session("admin")
+        time.sleep(0.1)
+        print(f"  ✅ Session inactive expirée: {short_sessions.get_session(token) is None}")
+        token = short_sessions.create_session("admin")
+        for _ in range(8):
+            time.sleep(0.03)
+            short_sessions.get_session(token)
+        print(f"  ✅ Durée maximale atteinte: {short_sessions.get_session(token) is None}")
+        short_sessions.create_session("admin")
+        time.sleep(0.1)
+        print(f"  ✅ Sessions actives après nettoyage: {short_sessions.get_active_sessions_count() == 0}")
+        
+        # Test stockage partagé entre workers (deux services, une base SQLite)
+        import os
+        import tempfile
+        from storage import SqliteSessionStore
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_file = os.path.join(tmp_dir, "sessions.db")
+            worker_a = SessionService(SqliteSessionStore(db_file))
+            worker_b = SessionService(SqliteSessionStore(db_file))
+            token = worker_a.create_session("admin")
+            print(f"  ✅ Session partagée: {worker_b.get_session(token)['username']}")
+            worker_a.store.close()
+            worker_b.store.close()
+        
+        # Test résolution unique par requête (request.state)
+        from types import SimpleNamespace
+        from storage import MemorySessionStore
+        calls = []
+        store = MemorySessionStore()
+        store_resolve = store.resolve
+        store.resolve = lambda *args: calls.append(args) or store_resolve(*args)
+        per_request = SessionService(store)
+        token = per_request.create_session("admin")
+        request = SimpleNamespace(cookies={"session_token": token}, state=SimpleNamespace())
+        logged_in = per_request.is_logged_in(request)
+        username = per_request.get_username(request)
+        print(f"  ✅ Session résolue une fois: {logged_in and username == 'admin' and len(calls) == 1}")
+        
         return True
     except Exception as e:
         print(f"  ❌ Erreur SessionService: {e}")
@@ -102,13 +178,19 @@ def test_sales_service():
             sale_date=datetime.now().isoformat(),
             created_by="admin"
         )
+        version = sales_service.get_data_version()
         sales_service.add_sale(test_sale)
         print(f"  ✅ Vente ajoutée: {test_sale.id}")
+        print(f"  ✅ Version des données changée: {sales_service.get_data_version() != version}")
         
         # Test récupération par ID
         sale = sales_service.get_sale_by_id(test_sale.id)
         print(f"  ✅ Vente récupérée: {sale['product_name']}")
         
+        # Test récupération par utilisateur (index created_by)
+        user_sales = sales_service.get_sales_by_user("admin")
+        print(f"  ✅ Ventes de admin: {any(s['id'] == test_sale.id for s in user_sales)}")
+        
         # Test statistiques
         revenue = sales_service.get_total_revenue()
         print(f"  ✅ Chiffre d'affaires: {revenue}€")
@@ -116,6 +198,41 @@ def test_sales_service():
         # Test suppression
         deleted = sales_service.delete_sale(test_sale.id)
         print(f"  ✅ Vente supprimée: {deleted}")
+        print(f"  ✅ Index à jour: {sales_service.get_sale_by_id(test_sale.id) is None}")
+        
+        # Agrégats maintenus incrémentalement
+        expected_revenue = sum(s.get("total_price", 0) for s in sales_service.load_sales())
+        consistent = abs(sales_service.get_total_revenue() - expected_revenue) < 1e-6
+        print(f"  ✅ Agrégats cohérents: {consistent}")
+        assert consistent
+        print(f"  ✅ Résumé admin: {sales_service.get_user_summary('admin')}")
+        
+        # Même id ajouté deux fois : la vente est remplacée, jamais comptée deux fois
+        import os
+        import tempfile
+        from services import SalesService
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            service = SalesService(os.path.join(tmp_dir, "sales.json"))
+            events = []
+            service.add_listener(lambda event_type, sale: events.append(event_type))
+            service.add_sale(test_sale)
+            service.add_sale(test_sale)
+            top = service.get_top("revenue", 5)["products"]
+            rollups = service.get_rollups("year")
+            replaced = (service.get_sales_count() == 1 and service.get_total_revenue() == 50.0
+                        and top[0]["revenue"] == 50.0 and top[0]["count"] == 1
+                        and rollups[0]["count"] == 1 and rollups[0]["revenue"] == 50.0
+                        and len(service.get_sales_page(10)["sales"]) == 1
+                        and events == ["created", "updated"])
+            print(f"  ✅ Vente ajoutée deux fois remplacée: {replaced}")
+            assert replaced
+            
+            service.delete_sale(test_sale.id)
+            emptied = (service.get_total_revenue() == 0 and service.get_top("revenue", 5)["products"] == []
+                       and service.get_rollups("year") == [] and service.get_sales_page(10)["sales"] == [])
+            print(f"  ✅ Agrégats vidés à la suppression: {emptied}")
+            assert emptied
+            service.close()
         
         return True
     except Exception as e:
@@ -125,6 +242,1040 @@ def test_sales_service():
         return False
 
 
+def test_sales_journal():
+    """Tester le mode journal (append-only) du service de ventes"""
+    print("\n📒 Test SalesJournal...")
+    
+    try:
+        import os
+        import tempfile
+        from services import SalesService, Sale
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sales_file = os.path.join(tmp_dir, "sales.json")
+            journal_file = os.path.join(tmp_dir, "sales.journal.jsonl")
+            service = SalesService(sales_file, journal_file=journal_file, compact_every=3)
+            
+            for i in range(2):
+                service.add_sale(Sale(
+                    id=f"sale-{i}", product_name="Produit", quantity=1,
+                    unit_price=5.0, total_price=5.0, customer_name="Client",
+                    sale_date=datetime.now().isoformat(), created_by="admin"
+                ))
+            print(f"  ✅ Snapshot non réécrit: {not os.path.exists(sales_file)}")
+            
+            # Rejeu du journal par une nouvelle instance
+            replayed = SalesService(sales_file, journal_file=journal_file)
+            print(f"  ✅ Journal rejoué: {len(replayed.load_sales()) == 2}")
+            
+            # La 3e entrée déclenche la compaction (thread de compaction)
+            service.delete_sale("sale-0")
+            service._compactor.flush()
+            print(f"  ✅ Compaction: {os.path.getsize(journal_file) == 0}")
+            
+            reloaded = SalesService(sales_file, journal_file=journal_file)
+            assert [s["id"] for s in reloaded.load_sales()] == ["sale-1"]
+            print("  ✅ Snapshot compacté rechargé")
+        
+        return True
+    except Exception as e:
+        print(f"  ❌ Erreur SalesJournal: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_sqlite_storage():
+    """Tester le backend de stockage SQLite (ventes et utilisateurs)"""
+    print("\n🗄️  Test SQLite storage...")
+    
+    try:
+        import os
+        import tempfile
+        from services import SalesService, UserService, Sale
+        from storage import SqliteSalesStorage, SqliteUserStorage
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_file = os.path.join(tmp_dir, "boutique.db")
+            
+            sales_storage = SqliteSalesStorage(db_file)
+            service = SalesService(storage=sales_storage)
+            service.add_sale(Sale(
+                id="sale-sqlite", product_name="Produit", quantity=2,
+                unit_price=5.0, total_price=10.0, customer_name="Client",
+                sale_date=datetime.now().isoformat(), created_by="admin"
+            ))
+            
+            # Lectures indexées sans chargement complet
+            sale = service.get_sale_by_id("sale-sqlite")
+            print(f"  ✅ Vente lue sans cache: {sale['product_name']} ({not service._loaded})")
+            print(f"  ✅ Ventes de admin: {len(service.get_sales_by_user('admin'))}")
+            print(f"  ✅ Chiffre d'affaires: {service.get_total_revenue()}€")
+            print(f"  ✅ Vente supprimée: {service.delete_sale('sale-sqlite')}")
+            sales_storage.close()
+            
+            user_storage = SqliteUserStorage(db_file)
+            users = UserService(user_storage)
+            users.initialize()
+            print(f"  ✅ Authentification admin: {users.authenticate('admin', 'admin123')}")
+            user_storage.close()
+        
+        return True
+    except Exception as e:
+        print(f"  ❌ Erreur SQLite storage: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_sales_rollups():
+    """Tester les agrégats temporels (buckets journaliers)"""
+    print("\n📅 Test SalesRollups...")
+    
+    try:
+        import os
+        import tempfile
+        from services import SalesService, Sale
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            service = SalesService(os.path.join(tmp_dir, "sales.json"))
+            for i, (sale_date, payment) in enumerate([
+                ("2024-12-16T10:00:00", "Carte"),
+                ("2024-12-17T11:00:00", "Espèces"),
+                ("2025-01-02T09:30:00", "Carte"),
+            ]):
+                service.add_sale(Sale(
+                    id=f"sale-{i}", product_name="Produit", quantity=1,
+                    unit_price=10.0, total_price=10.0, customer_name="Client",
+                    sale_date=sale_date, created_by="admin", payment_method=payment
+                ))
+            
+            months = service.get_rollups("month")
+            assert [m["period"] for m in months] == ["2024-12", "2025-01"]
+            assert months[0]["count"] == 2 and months[0]["by_payment"]["Espèces"]["revenue"] == 10.0
+            print(f"  ✅ Rollup mensuel: {len(months)} périodes")
+            
+            service.delete_sale("sale-2")
+            years = service.get_rollups("year")
+            assert years == [{"period": "2024", "count": 2, "revenue": 20.0, "by_payment": {
+                "Carte": {"count": 1, "revenue": 10.0},
+                "Espèces": {"count": 1, "revenue": 10.0},
+            }}]
+            print(f"  ✅ Rollup annuel après suppression: {years[0]['revenue']}€")
+        
+        return True
+    except Exception as e:
+        print(f"  ❌ Erreur SalesRollups: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_sales_columns():
+    """Tester le stockage colonnaire des ventes"""
+    print("\n🧱 Test SalesColumns...")
+    
+    try:
+        import os
+        import tempfile
+        from services import SalesService, SalesColumns, Sale
+        
+        sale = Sale(
+            id="sale-0", product_name="Produit", quantity=2, unit_price=5.0,
+            total_price=10.0, customer_name="Client", sale_date="2025-01-02T09:30:00",
+            created_by="admin", payment_method="Carte"
+        )
+        print(f"  ✅ Sale sans __dict__: {not hasattr(sale, '__dict__')}")
+        
+        # Reconstitution exacte, y compris hors schéma
+        columns = SalesColumns()
+        legacy = {"id": "old", "product_name": "Ancien", "quantity": 1, "unit_price": 3,
+                  "total_price": 3, "customer_name": "Client", "sale_date": "2024-01-01",
+                  "created_by": "vendeur", "note": "import"}
+        columns["old"] = legacy
+        assert columns["old"] == legacy and type(columns["old"]["total_price"]) is int
+        print(f"  ✅ Vente hors schéma reconstituée: {columns['old']['note']}")
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sales_file = os.path.join(tmp_dir, "sales.json")
+            service = SalesService(sales_file, columnar=True)
+            for i in range(4):
+                service.add_sale(Sale(
+                    id=f"sale-{i}", product_name="Produit", quantity=1,
+                    unit_price=10.0, total_price=10.0 * (i + 1), customer_name="Client",
+                    sale_date=f"2025-01-0{i + 1}T09:00:00", created_by="admin" if i % 2 else "vendeur",
+                    payment_method="Carte"
+                ))
+            service.delete_sale("sale-1")
+            
+            # Même état qu'un service en dictionnaires relu depuis le disque
+            reloaded = SalesService(sales_file, columnar=True)
+            reference = SalesService(sales_file)
+            assert reloaded.load_sales() == reference.load_sales() == service.load_sales()
+            assert reloaded.get_user_summary("admin") == reference.get_user_summary("admin")
+            assert reloaded.get_total_revenue() == reference.get_total_revenue() == 80.0
+            print(f"  ✅ Agrégats colonnaires: {reloaded.get_total_revenue()}€")
+            print(f"  ✅ CA par vendeur: {reloaded._sales_by_id.sum_by('created_by')}")
+            print(f"  ✅ Ventes par paiement: {reloaded._sales_by_id.count_by('payment_method')}")
+        
+        return True
+    except Exception as e:
+        print(f"  ❌ Erreur SalesColumns: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_sales_pagination():
+    """Tester la pagination par curseur (index trié par date)"""
+    print("\n📄 Test pagination des ventes...")
+    
+    try:
+        import os
+        import tempfile
+        from datetime import date
+        from services import SalesService, Sale
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            service = SalesService(os.path.join(tmp_dir, "sales.json"))
+            for day in range(1, 8):
+                service.add_sale(Sale(
+                    id=f"sale-{day}", product_name="Produit", quantity=1,
+                    unit_price=10.0, total_price=10.0, customer_name="Client",
+                    sale_date=f"2024-12-{day:02d}T12:00:00",
+                    created_by="admin" if day % 2 else "boutique",
+                    payment_method="Carte"
+                ))
+            
+            # Parcours complet page par page, du plus récent au plus ancien
+            ids, cursor = [], None
+            while True:
+                page = service.get_sales_page(3, cursor)
+                ids += [sale["id"] for sale in page["sales"]]
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    break
+            assert ids == [f"sale-{day}" for day in range(7, 0, -1)]
+            print(f"  ✅ {len(ids)} ventes parcourues par pages de 3")
+            
+            page = service.get_sales_page(10, start=date(2024, 12, 2), end=date(2024, 12, 5), created_by="admin")
+            assert [sale["id"] for sale in page["sales"]] == ["sale-5", "sale-3"]
+            print("  ✅ Filtres période et vendeur")
+            
+            # Parcours chronologique utilisé par l'export en streaming
+            exported = [sale["id"] for sale in service.iter_sales(start=date(2024, 12, 6))]
+            assert exported == ["sale-6", "sale-7"]
+            print("  ✅ Parcours chronologique pour l'export")
+        
+        return True
+    except Exception as e:
+        print(f"  ❌ Erreur pagination: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_response_cache():
+    """Tester le cache des réponses pré-sérialisées"""
+    print("\n📦 Test ResponseCache...")
+    
+    try:
+        import gzip
+        import json
+        from services import ResponseCache
+        
+        cache = ResponseCache(max_bytes=200, gzip_min_size=10)
+        builds = []
+        
+        def build(n):
+            builds.append(n)
+            return {"sales": [{"id": f"sale-{i}", "product_name": "Café"} for i in range(n)]}
+        
+        entry = cache.get_or_build(("sales", 2), "v1", lambda: build(2))
+        assert cache.get_or_build(("sales", 2), "v1", lambda: build(2)) is entry
+        print(f"  ✅ Corps encodé une seule fois: {len(builds) == 1}")
+        print(f"  ✅ JSON identique: {json.loads(entry.body) == build(2)}")
+        print(f"  ✅ Variante gzip: {gzip.decompress(cache.compressed(('sales', 2), entry)) == entry.body}")
+        
+        cache.get_or_build(("sales", 2), "v2", lambda: build(2))
+        print(f"  ✅ Invalidation à la nouvelle version: {len(builds) == 3}")
+        
+        for n in range(3, 6):
+            cache.get_or_build(("sales", n), "v2", lambda: build(n))
+        print(f"  ✅ Budget respecté (LRU): {cache.size <= 200 and ('sales', 2) not in cache._entries}")
+        
+        return True
+    except Exception as e:
+        print(f"  ❌ Erreur ResponseCache: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_sales_stream():
+    """Tester la diffusion des ventes (flux SSE)"""
+    print("\n📡 Test SalesBroadcaster...")
+    
+    try:
+        import asyncio
+        import os
+        import tempfile
+        from services import SalesService, SalesBroadcaster, Sale
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            service = SalesService(os.path.join(tmp_dir, "sales.json"))
+            broadcaster = SalesBroadcaster(queue_size=2)
+            service.add_listener(broadcaster.publish)
+            
+            def new_sale(i):
+                return Sale(
+                    id=f"sale-{i}", product_name="Produit", quantity=1, unit_price=10.0,
+                    total_price=10.0, customer_name="Client", sale_date="2025-01-02T09:30:00",
+                    created_by="admin"
+                )
+            
+            async def scenario():
+                queue = broadcaster.subscribe()
+                # Publication depuis un thread du threadpool, comme une route synchrone
+                await asyncio.to_thread(service.add_sale, new_sale(0))
+                created = await asyncio.wait_for(queue.get(), 1)
+                await asyncio.to_thread(service.delete_sale, "sale-0")
+                deleted = await asyncio.wait_for(queue.get(), 1)
+                for i in range(1, 4):
+                    await asyncio.to_thread(service.add_sale, new_sale(i))
+                await asyncio.sleep(0.05)
+                overflow = await asyncio.wait_for(queue.get(), 1)
+                broadcaster.unsubscribe(queue)
+                return created, deleted, overflow
+            
+            created, deleted, overflow = asyncio.run(scenario())
+            print(f"  ✅ Vente poussée: {created['type']} {created['sale']['id']}")
+            print(f"  ✅ Suppression poussée: {deleted == {'type': 'deleted', 'sale': {'id': 'sale-0'}}}")
+            print(f"  ✅ Client en retard resynchronisé: {overflow['type'] == 'resync'}")
+            print(f"  ✅ Désabonné: {broadcaster.subscribers_count == 0}")
+        
+        return True
+    except Exception as e:
+        print(f"  ❌ Erreur SalesBroadcaster: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_sales_changes():
+    """Tester les upserts idempotents et le journal des changements"""
+    print("\n🔄 Test synchronisation différentielle...")
+    
+    try:
+        import json
+        import os
+        import tempfile
+        from services import SalesService, sale_from_dict
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            service = SalesService(os.path.join(tmp_dir, "sales.json"))
+            since = service.get_data_version()
+            batch = [
+                {"id": f"client-{i}", "product_name": "Café", "quantity": 2, "unit_price": 1.5,
+                 "sale_date": "2025-03-01T10:00:00", "payment_method": "Carte"}
+                for i in range(3)
+            ]
+            parsed = [sale_from_dict(sale, created_by="admin") for sale in batch]
+            first = service.upsert_sales(parsed, owner="admin")
+            replay = service.upsert_sales(parsed, owner="admin")
+            print(f"  ✅ Lot créé: {first['created'] == 3}")
+            print(f"  ✅ Lot rejoué sans effet: {replay['unchanged'] == 3 and service.get_sales_count() == 3}")
+            
+            other = service.upsert_sales([sale_from_dict(batch[0], created_by="vendeur")], owner="vendeur")
+            print(f"  ✅ Vente d'un autre vendeur protégée: {other['conflicts'] == ['client-0']}")
+            
+            middle = service.get_data_version()
+            batch[1]["quantity"] = 5
+            service.upsert_sales([sale_from_dict(batch[1], created_by="admin")], owner="admin")
+            service.delete_sale("client-2")
+            changes = service.get_changes(middle)
+            assert not changes["reset"]
+            assert [c["type"] for c in changes["changes"]] == ["upsert", "delete"]
+            assert changes["changes"][0]["sale"]["total_price"] == 7.5
+            print(f"  ✅ Changements depuis {middle}: {len(changes['changes'])}")
+            print(f"  ✅ Depuis le début: {len(service.get_changes(since)['changes']) == 3}")
+            print(f"  ✅ Version inconnue: {service.get_changes('autre-1')['reset']}")
+            
+            try:
+                sale_from_dict({"id": "x", "product_name": "Café", "quantity": 1.5,
+                                "unit_price": 1, "sale_date": "2025-03-01"}, created_by="admin")
+                rejected = False
+            except ValueError:
+                rejected = True
+            print(f"  ✅ Vente invalide refusée: {rejected}")
+            
+            utc = sale_from_dict({"id": "z", "product_name": "Café", "quantity": 1, "unit_price": 1,
+                                  "sale_date": "2025-03-01T10:00:00.000Z"}, created_by="admin")
+            print(f"  ✅ Date UTC du navigateur acceptée: {utc.sale_date == '2025-03-01T10:00:00.000+00:00'}")
+            
+            # Nombres non finis (NaN, Infinity, 1e999 lu comme inf) : refusés, jamais une erreur 500
+            from fastapi import HTTPException
+            from routers.api_router import api_upsert_sales
+            from services import SalesImporter
+            bad_lines = [
+                '{"id": "nan", "product_name": "Café", "quantity": 1, "unit_price": NaN, "sale_date": "2025-03-01"}',
+                '{"id": "inf", "product_name": "Café", "quantity": 1, "unit_price": 2, "total_price": Infinity, "sale_date": "2025-03-01"}',
+                '{"id": "big", "product_name": "Café", "quantity": 1e999, "unit_price": 2, "sale_date": "2025-03-01"}',
+                '{"id": "huge", "product_name": "Café", "quantity": 1' + '0' * 400 + ', "unit_price": 2, "sale_date": "2025-03-01"}',
+            ]
+            count = service.get_sales_count()
+            statuses = []
+            for line in bad_lines:
+                try:
+                    api_upsert_sales(sales=[json.loads(line)], username="admin")
+                    statuses.append(200)
+                except HTTPException as e:
+                    statuses.append(e.status_code)
+            print(f"  ✅ Nombres non finis refusés par POST /api/sales: {statuses}")
+            assert statuses == [422] * len(bad_lines)
+            report = SalesImporter(workers=0).import_lines(service, [line.encode() for line in bad_lines], created_by="admin")
+            print(f"  ✅ Lignes ignorées à l'import: {[e['line'] for e in report['errors']]}")
+            assert report["imported"] == 0 and [e["line"] for e in report["errors"]] == [1, 2, 3, 4]
+            assert service.get_sales_count() == count
+        
+        return True
+    except Exception as e:
+        print(f"  ❌ Erreur synchronisation: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_sales_import():
+    """Tester l'import en masse par lots"""
+    print("\n📥 Test import en masse...")
+    
+    try:
+        import json
+        import os
+        import tempfile
+        from services import SalesService, SalesImporter
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            service = SalesService(os.path.join(tmp_dir, "sales.json"))
+            lines = [
+                json.dumps({"id": f"imp-{i}", "product_name": "Thé", "quantity": 1, "unit_price": 2.0,
+                            "sale_date": f"2025-01-{10 - i:02d}T09:00:00"}).encode()
+                for i in range(5)
+            ]
+            lines.insert(2, b"{pas du json}")
+            lines.append(lines[0])
+            
+            importer = SalesImporter(workers=0, chunk_size=2)
+            report = importer.import_lines(service, lines, created_by="admin")
+            print(f"  ✅ Ventes importées: {report['imported']}")
+            print(f"  ✅ Ligne invalide signalée: {[e['line'] for e in report['errors']] == [3]}")
+            
+            # Le doublon remplace la vente existante au lieu de l'ajouter deux fois
+            assert service.get_sales_count() == 5
+            page = service.get_sales_page(limit=10)
+            dates = [sale["sale_date"] for sale in page["sales"]]
+            print(f"  ✅ Index par date trié sans doublon: {dates == sorted(dates, reverse=True) and len(dates) == 5}")
+            print(f"  ✅ CA total: {service.get_total_revenue() == 10.0}")
+            
+            reloaded = SalesService(os.path.join(tmp_dir, "sales.json"))
+            print(f"  ✅ Ventes persistées: {reloaded.get_sales_count() == 5}")
+            
+            # Un autre vendeur ne remplace pas la vente d'admin : ligne signalée en conflit
+            foreign = [
+                json.dumps({"id": "imp-0", "product_name": "Volé", "quantity": 1, "unit_price": 99.0,
+                            "sale_date": "2025-01-10T09:00:00"}).encode(),
+                json.dumps({"id": "imp-new", "product_name": "Thé", "quantity": 1, "unit_price": 2.0,
+                            "sale_date": "2025-01-11T09:00:00"}).encode(),
+            ]
+            report = importer.import_lines(service, foreign, created_by="vendeur")
+            print(f"  ✅ Conflit signalé: {report['conflicts'] == ['imp-0'] and report['rejected'] == 1}")
+            kept = service.get_sale_by_id("imp-0")
+            print(f"  ✅ Vente d'un autre vendeur intacte: {kept['created_by'] == 'admin' and kept['product_name'] == 'Thé'}")
+            assert report["imported"] == 1 and service.get_sales_count() == 6
+        
+        return True
+    except Exception as e:
+        print(f"  ❌ Erreur import: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_sales_search():
+    """Tester l'index de recherche des ventes"""
+    print("\n🔎 Test recherche...")
+    
+    try:
+        import os
+        import tempfile
+        from services import SalesService, Sale
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            service = SalesService(os.path.join(tmp_dir, "sales.json"))
+            names = [("Café crème", "Élodie Martin"), ("Thé vert", "Jérôme Petit"),
+                     ("Chocolat chaud", "Élodie Durand"), ("Éclair au café", "Zoé")]
+            for i, (product, customer) in enumerate(names):
+                service.add_sale(Sale(
+                    id=f"search-{i}", product_name=product, quantity=1, unit_price=2.0,
+                    total_price=2.0, customer_name=customer,
+                    sale_date=f"2025-04-0{i + 1}T10:00:00", created_by="admin"
+                ))
+            
+            def ids(query, limit=10, cursor=None):
+                return [sale["id"] for sale in service.search_sales(query, limit, cursor)["sales"]]
+            
+            print(f"  ✅ Accents et casse ignorés: {ids('CAFE') == ['search-3', 'search-0']}")
+            print(f"  ✅ Recherche par préfixe: {ids('choc') == ['search-2']}")
+            print(f"  ✅ Produit et client combinés: {ids('caf elo') == ['search-0']}")
+            print(f"  ✅ Aucun résultat: {ids('inconnu') == [] and ids('!!') == []}")
+            
+            first = service.search_sales("e", 2)
+            rest = ids("e", 10, first["next_cursor"])
+            print(f"  ✅ Pagination: {[s['id'] for s in first['sales']] + rest == ['search-3', 'search-2', 'search-0']}")
+            
+            service.delete_sale("search-0")
+            print(f"  ✅ Index mis à jour à la suppression: {ids('creme') == []}")
+        
+        return True
+    except Exception as e:
+        print(f"  ❌ Erreur recherche: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_sales_leaderboard():
+    """Tester les classements maintenus à chaque ajout/suppression"""
+    print("\n🏅 Test classements...")
+    
+    try:
+        import os
+        import random
+        import tempfile
+        from datetime import date
+        from services import SalesService, Sale
+        
+        def brute_force(sales, start, end):
+            totals = {}
+            for sale in sales:
+                day = date.fromisoformat(sale["sale_date"][:10])
+                if (start and day < start) or (end and day > end):
+                    continue
+                totals[sale["product_name"]] = totals.get(sale["product_name"], 0) + sale["total_price"]
+            best = sorted(totals.items(), key=lambda item: (-item[1], item[0]))[:3]
+            return [(name, round(revenue, 2)) for name, revenue in best]
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            service = SalesService(os.path.join(tmp_dir, "sales.json"))
+            rng = random.Random(7)
+            for i in range(300):
+                quantity = rng.randint(1, 5)
+                service.add_sale(Sale(
+                    id=f"top-{i}", product_name=rng.choice(["Café", "Thé", "Croissant", "Jus"]),
+                    quantity=quantity, unit_price=1.5, total_price=quantity * 1.5,
+                    customer_name=rng.choice(["", "Élodie", "Zoé"]),
+                    sale_date=f"2025-{rng.randint(1, 4):02d}-{rng.randint(1, 28):02d}T10:00:00",
+                    created_by="admin"
+                ))
+            for i in range(0, 300, 7):
+                service.delete_sale(f"top-{i}")
+            
+            sales = service.load_sales()
+            ranges = [(None, None), (date(2025, 2, 1), date(2025, 2, 28)),
+                      (date(2025, 1, 15), date(2025, 3, 10)), (date(2025, 3, 3), date(2025, 3, 9)),
+                      (date(2025, 2, 10), None), (None, date(2025, 2, 27))]
+            consistent = True
+            for start, end in ranges:
+                top = service.get_top("revenue", 3, start, end)
+                found = [(entry["name"], entry["revenue"]) for entry in top["products"]]
+                consistent = consistent and found == brute_force(sales, start, end)
+            print(f"  ✅ Classements identiques au calcul complet: {consistent}")
+            
+            customers = service.get_top("count", 5)["customers"]
+            print(f"  ✅ Ventes sans client ignorées: {sorted(c['name'] for c in customers) == ['Zoé', 'Élodie']}")
+            
+            try:
+                service.get_top("inconnu", 3)
+                rejected = False
+            except ValueError:
+                rejected = True
+            print(f"  ✅ Critère inconnu refusé: {rejected}")
+            assert consistent
+        
+        return True
+    except Exception as e:
+        print(f"  ❌ Erreur classements: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_sales_writer():
+    """Tester l'écrivain unique et le commit groupé"""
+    print("\n✍️  Test écrivain unique...")
+    
+    try:
+        import os
+        import tempfile
+        import threading
+        from services import SalesService, SalesWriter, Sale
+        from storage import JsonSalesStorage
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sales_file = os.path.join(tmp_dir, "sales.json")
+            journal_file = os.path.join(tmp_dir, "sales.journal.jsonl")
+            storage = JsonSalesStorage(sales_file, journal_file, compact_every=10000)
+            
+            # Écrivain bloqué sur une première écriture : les suivantes forment un seul lot
+            writer = SalesWriter(storage)
+            release = threading.Event()
+            written = []
+            writer.submit(release.wait)
+            commits = [writer.submit(lambda n=n: written.append(n), replace_key="snapshot") for n in range(3)]
+            commits.append(writer.submit(lambda: written.append("append")))
+            release.set()
+            for commit in commits:
+                commit.result(timeout=5)
+            print(f"  ✅ Seul le dernier snapshot du lot est écrit: {written == [2, 'append']}")
+            writer.close()
+            
+            service = SalesService(storage=storage)
+            
+            def add_many(worker):
+                for i in range(25):
+                    service.add_sale(Sale(
+                        id=f"w{worker}-{i}", product_name="Produit", quantity=1, unit_price=1.0,
+                        total_price=1.0, customer_name="", sale_date="2025-05-01T10:00:00",
+                        created_by=f"vendeur{worker}"
+                    ))
+            
+            threads = [threading.Thread(target=add_many, args=(worker,)) for worker in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            service.close()
+            
+            with open(journal_file) as f:
+                journal_lines = sum(1 for _ in f)
+            reloaded = SalesService(sales_file, journal_file=journal_file)
+            print(f"  ✅ Aucune écriture perdue: {reloaded.get_sales_count() == 200 and journal_lines == 200}")
+            print(f"  ✅ CA cohérent: {service.get_total_revenue() == 200.0}")
+            assert reloaded.get_sales_count() == 200 and written == [2, "append"]
+        
+        return True
+    except Exception as e:
+        print(f"  ❌ Erreur écrivain: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_sales_snapshots():
+    """Tester les versions immuables de l'index par date et les lectures concurrentes"""
+    print("\n📸 Test snapshots copie à l'écriture...")
+    
+    try:
+        import os
+        import tempfile
+        import threading
+        from services import SalesService, Sale
+        from services.sales_date_index import SalesDateIndex
+        
+        index = SalesDateIndex(chunk_size=4)
+        index.add_many([{"id": f"s{i:02d}", "sale_date": f"2025-05-{i + 1:02d}"} for i in range(20)])
+        before = index.snapshot()
+        index.add({"id": "new", "sale_date": "2025-05-10T12:00:00"})
+        index.remove({"id": "s00", "sale_date": "2025-05-01"})
+        after = index.snapshot()
+        old_ids = [entry[1] for entry in before.iter_range()]
+        new_ids = [entry[1] for entry in after.iter_range()]
+        print(f"  ✅ Ancienne version inchangée: {old_ids == [f's{i:02d}' for i in range(20)]}")
+        print(f"  ✅ Nouvelle version à jour: {len(after) == 20 and 'new' in new_ids and 's00' not in new_ids}")
+        shared = len(set(map(id, before.chunks)) & set(map(id, after.chunks)))
+        print(f"  ✅ Blocs non modifiés partagés: {shared >= len(before.chunks) - 2}")
+        assert old_ids == [f"s{i:02d}" for i in range(20)] and "new" in new_ids and "s00" not in new_ids
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            service = SalesService(
+                os.path.join(tmp_dir, "sales.json"), journal_file=os.path.join(tmp_dir, "sales.journal.jsonl")
+            )
+            stop = threading.Event()
+            errors = []
+            
+            def write():
+                for i in range(90):
+                    service.add_sale(Sale(
+                        id=f"c{i:03d}", product_name="Café", quantity=1, unit_price=1.0, total_price=1.0,
+                        customer_name=f"Client {i % 7}", sale_date=f"2025-05-{i % 28 + 1:02d}T10:00:00",
+                        created_by="admin"
+                    ))
+                    if i % 3 == 0:
+                        service.delete_sale(f"c{i:03d}")
+                stop.set()
+            
+            def read():
+                try:
+                    while not stop.is_set():
+                        # Pagination complète : chaque vente au plus une fois, dans l'ordre
+                        seen, cursor = [], None
+                        while True:
+                            page = service.get_sales_page(limit=7, cursor=cursor)
+                            seen.extend((sale["sale_date"], sale["id"]) for sale in page["sales"])
+                            cursor = page["next_cursor"]
+                            if cursor is None:
+                                break
+                        if seen != sorted(set(seen), reverse=True):
+                            errors.append("page")
+                        service.get_rollups("day")
+                        service.get_top("revenue", 3)
+                        service.search_sales("caf", 5)
+                except Exception as e:
+                    errors.append(repr(e))
+            
+            readers = [threading.Thread(target=read) for _ in range(2)]
+            writer = threading.Thread(target=write)
+            for thread in readers + [writer]:
+                thread.start()
+            for thread in readers + [writer]:
+                thread.join()
+            service.close()
+            print(f"  ✅ Lectures concurrentes sans erreur: {errors == []}")
+            print(f"  ✅ Ventes finales: {service.get_sales_count() == 60}")
+            assert errors == [] and service.get_sales_count() == 60
+        
+        return True
+    except Exception as e:
+        print(f"  ❌ Erreur snapshots: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_cache_coherence():
+    """Tester la revalidation des caches modifiés par un autre processus"""
+    print("\n🔄 Test cohérence des caches entre processus...")
+    
+    try:
+        import json
+        import os
+        import tempfile
+        import threading
+        from services import SalesService, UserService, Sale
+        from storage import JsonUserStorage, SqliteSalesStorage, SqliteUserStorage
+        
+        def make_sale(sale_id, price=10.0):
+            return Sale(
+                id=sale_id, product_name="Café", quantity=1, unit_price=price, total_price=price,
+                customer_name="Client", sale_date="2025-06-01T10:00:00", created_by="admin"
+            )
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sales_file = os.path.join(tmp_dir, "sales.json")
+            journal_file = os.path.join(tmp_dir, "sales.journal.jsonl")
+            # Deux instances sur les mêmes fichiers : deux workers
+            worker_a = SalesService(sales_file, journal_file=journal_file, compact_every=5, revalidate_interval=0)
+            worker_b = SalesService(sales_file, journal_file=journal_file, compact_every=5, revalidate_interval=0)
+            worker_a.save_sales([])
+            print(f"  ✅ Worker B chargé: {worker_b.get_sales_count() == 0}")
+            
+            version = worker_b.get_data_version()
+            worker_a.add_sale(make_sale("a-1"))
+            worker_a.add_sale(make_sale("a-2"))
+            print(f"  ✅ Ajouts de A vus par B (suivi du journal): {worker_b.get_sale_by_id('a-2') is not None}")
+            print(f"  ✅ Version de B changée: {worker_b.get_data_version() != version}")
+            worker_b.delete_sale("a-1")
+            print(f"  ✅ Suppression de B vue par A: {worker_a.get_sale_by_id('a-1') is None}")
+            worker_a.upsert_sales([make_sale("a-2", 25.0)])
+            print(f"  ✅ Remplacement vu par B: {worker_b.get_total_revenue() == 25.0}")
+            assert worker_b.get_sale_by_id("a-1") is None and worker_a.get_sales_count() == 1
+            
+            # Compaction par A (snapshot réécrit, journal vidé) : rechargement complet par B
+            for i in range(5):
+                worker_a.add_sale(make_sale(f"c-{i}"))
+            worker_a._compactor.flush()
+            compacted = os.path.getsize(sales_file) > 2
+            print(f"  ✅ Rechargé après compaction: {compacted and worker_b.get_sales_count() == 6}")
+            assert worker_b.get_sales_count() == 6
+            
+            # Vérification limitée à une par intervalle
+            worker_c = SalesService(sales_file, journal_file=journal_file, revalidate_interval=3600)
+            worker_c.get_sales_count()
+            worker_a.add_sale(make_sale("late"))
+            print(f"  ✅ Vérification espacée (intervalle): {worker_c.get_sale_by_id('late') is None}")
+            assert worker_c.get_sale_by_id("late") is None and worker_b.get_sale_by_id("late") is not None
+            for worker in (worker_a, worker_b, worker_c):
+                worker.close()
+            
+            # Compaction par A d'une vente acquittée par B mais pas encore lue par A
+            os.remove(sales_file)
+            os.remove(journal_file)
+            worker_a = SalesService(sales_file, journal_file=journal_file, revalidate_interval=3600)
+            worker_b = SalesService(sales_file, journal_file=journal_file, revalidate_interval=0)
+            worker_a.add_sale(make_sale("s1"))
+            worker_b.add_sale(make_sale("s2"))
+            worker_a.compact()
+            on_disk = {sale["id"] for sale in SalesService(sales_file, journal_file=journal_file).load_sales()}
+            print(f"  ✅ Vente de B conservée par la compaction de A: {on_disk == {'s1', 's2'}}")
+            assert on_disk == {"s1", "s2"} and worker_a.get_sale_by_id("s2") is not None
+            assert {sale["id"] for sale in worker_b.load_sales()} == {"s1", "s2"}
+            worker_b.add_sale(make_sale("s3"))
+            worker_a.save_sales(worker_a.load_sales())
+            on_disk = {sale["id"] for sale in SalesService(sales_file, journal_file=journal_file).load_sales()}
+            assert on_disk == {"s1", "s2", "s3"} and worker_a.get_sale_by_id("s3") is not None
+            
+            # Lots écrits en même temps par deux workers : lignes jamais entremêlées
+            def write_batches(worker, prefix):
+                for batch in range(20):
+                    worker.add_sales([make_sale(f"{prefix}-{batch}-{i}") for i in range(200)], compact=False)
+            
+            threads = [
+                threading.Thread(target=write_batches, args=(worker, prefix))
+                for worker, prefix in ((worker_a, "a"), (worker_b, "b"))
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            with open(journal_file, "rb") as f:
+                lines = f.readlines()
+            intact = all(json.loads(line)["op"] == "add" for line in lines)
+            print(f"  ✅ Journal intact ({len(lines)} lignes): {intact}")
+            assert intact and len(lines) == 8000
+            worker_a.close()
+            worker_b.close()
+            
+            # SQLite : changements relus dans sales_changes
+            db_file = os.path.join(tmp_dir, "boutique.db")
+            sqlite_a = SalesService(storage=SqliteSalesStorage(db_file), revalidate_interval=0)
+            sqlite_b = SalesService(storage=SqliteSalesStorage(db_file), revalidate_interval=0)
+            sqlite_b.load_sales()
+            sqlite_a.add_sales([make_sale("s-1"), make_sale("s-2")])
+            sqlite_a.delete_sale("s-1")
+            print(f"  ✅ SQLite: changements de A vus par B: {[s['id'] for s in sqlite_b.load_sales()] == ['s-2']}")
+            assert [sale["id"] for sale in sqlite_b.load_sales()] == ["s-2"]
+            sqlite_a.close()
+            sqlite_b.close()
+            
+            # Utilisateurs : users.json modifié par un autre processus
+            users_file = os.path.join(tmp_dir, "users.json")
+            users_a = UserService(JsonUserStorage(users_file), revalidate_interval=0)
+            users_b = UserService(JsonUserStorage(users_file), revalidate_interval=0)
+            users_a.save_users({"admin": "hash-1"})
+            users_b.load_users()
+            users_a.save_users({"admin": "hash-1", "vendeur": "hash-2"})
+            print(f"  ✅ users.json rechargé: {users_b.user_exists('vendeur')}")
+            sqlite_users_a = UserService(SqliteUserStorage(db_file), revalidate_interval=0)
+            sqlite_users_b = UserService(SqliteUserStorage(db_file), revalidate_interval=0)
+            sqlite_users_a.save_users({"admin": "hash-1"})
+            sqlite_users_b.load_users()
+            sqlite_users_a.save_users({"admin": "hash-1", "vendeur": "hash-2"})
+            print(f"  ✅ Table users rechargée: {sqlite_users_b.user_exists('vendeur')}")
+            assert users_b.user_exists("vendeur") and sqlite_users_b.user_exists("vendeur")
+            sqlite_users_a.storage.close()
+            sqlite_users_b.storage.close()
+        
+        return True
+    except Exception as e:
+        print(f"  ❌ Erreur cohérence des caches: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_sales_segments():
+    """Tester le stockage en segments mensuels et l'élagage par le manifeste"""
+    print("\n🗂️  Test segments mensuels...")
+    
+    try:
+        import json
+        import os
+        import tempfile
+        from datetime import date
+        from services import SalesService, Sale
+        from storage import SegmentedSalesStorage
+        
+        def make_sale(sale_id, sale_date, price=10.0):
+            return Sale(
+                id=sale_id, product_name="Café", quantity=1, unit_price=price, total_price=price,
+                customer_name="Client", sale_date=sale_date, created_by="admin"
+            )
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            directory = os.path.join(tmp_dir, "segments")
+            storage = SegmentedSalesStorage(directory, cache_size=2)
+            service = SalesService(storage=storage)
+            service.add_sales([
+                make_sale(f"s{month}-{day}", f"2025-{month:02d}-{day:02d}T10:00:00")
+                for month in range(1, 7) for day in (1, 15)
+            ])
+            with open(os.path.join(directory, "manifest.json")) as f:
+                march = json.load(f)["segments"]["2025-03"]
+            print(f"  ✅ Un fichier par mois: {len([n for n in os.listdir(directory) if n.endswith('.jsonl')]) == 6}")
+            print(f"  ✅ Manifeste (dates, nombre, CA): {march['min_date'][:10]}..{march['max_date'][:10]}, {march['count']} ventes")
+            print(f"  ✅ Totaux lus dans le manifeste: {service.get_sales_count() == 12 and not service._loaded}")
+            assert march["count"] == 2 and march["revenue"] == 20.0
+            
+            # Export d'un mois : seul le segment de mars est ouvert
+            storage._cache.clear()
+            exported = [sale["id"] for sale in service.iter_sales(date(2025, 3, 1), date(2025, 3, 31))]
+            print(f"  ✅ Segments élagués: {exported == ['s3-1', 's3-15'] and list(storage._cache) == ['2025-03']}")
+            assert exported == ["s3-1", "s3-15"] and list(storage._cache) == ["2025-03"]
+            
+            # Classement, agrégats et pages d'une période : mêmes résultats que le cache, segment d'avril seul lu
+            storage._cache.clear()
+            april = (date(2025, 4, 1), date(2025, 4, 30))
+            top = service.get_top("revenue", 5, *april)
+            rollups = service.get_rollups("day", *april)
+            first = service.get_sales_page(1, None, *april)
+            rest = service.get_sales_page(5, first["next_cursor"], *april)
+            pruned = list(storage._cache) == ["2025-04"] and not service._loaded
+            loaded = SalesService(storage=SegmentedSalesStorage(directory))
+            loaded.load_sales()
+            same = (top == loaded.get_top("revenue", 5, *april) and rollups == loaded.get_rollups("day", *april)
+                    and [s["id"] for s in first["sales"] + rest["sales"]] == ["s4-15", "s4-1"]
+                    and rest["next_cursor"] is None)
+            print(f"  ✅ Période servie par les segments: {pruned and same}")
+            assert pruned and same
+            loaded.close()
+            
+            # Vente déplacée d'un mois à l'autre, puis suppression
+            service.upsert_sales([make_sale("s3-1", "2025-05-20T10:00:00", 20.0)])
+            service.delete_sale("s1-1")
+            segments = storage.segments()
+            print(f"  ✅ Changement de mois: {segments['2025-03']['count'] == 1 and segments['2025-05']['count'] == 3}")
+            service.close()
+            
+            reloaded = SalesService(storage=SegmentedSalesStorage(directory))
+            sales = {sale["id"]: sale for sale in reloaded.load_sales()}
+            print(f"  ✅ Rechargé: {len(sales) == 11 and sales['s3-1']['sale_date'].startswith('2025-05')}")
+            print(f"  ✅ CA cohérent: {reloaded.get_total_revenue() == 120.0}")
+            assert len(sales) == 11 and "s1-1" not in sales and reloaded.get_total_revenue() == 120.0
+            reloaded.close()
+        
+        return True
+    except Exception as e:
+        print(f"  ❌ Erreur segments: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def test_tombstone_compaction():
+    """Tester les suppressions en pierres tombales et la compaction en arrière-plan"""
+    print("\n🪦 Test pierres tombales et compaction...")
+    
+    try:
+        import json
+        import os
+        import tempfile
+        import threading
+        from services import SalesService, SalesColumns, Sale
+        from storage import SegmentedSalesStorage
+        
+        def make_sale(sale_id, sale_date="2025-01-10T10:00:00"):
+            return Sale(
+                id=sale_id, product_name="Café", quantity=1, unit_price=10.0, total_price=10.0,
+                customer_name="Client", sale_date=sale_date, created_by="admin"
+            )
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sales_file = os.path.join(tmp_dir, "sales.json")
+            journal_file = os.path.join(tmp_dir, "sales.journal.jsonl")
+            service = SalesService(
+                sales_file, journal_file=journal_file, compact_every=10 ** 6,
+                columnar=True, compaction_min_dead=5
+            )
+            service.add_sales([make_sale(f"s{i}") for i in range(20)])
+            
+            # Sous le seuil : pierres tombales dans les colonnes et le journal, rien n'est réécrit
+            service.delete_sale("s0")
+            service.delete_sale("s1")
+            service._compactor.flush()
+            stats = service.get_storage_stats()
+            print(f"  ✅ Pierres tombales: {stats['memory_tombstones']} en mémoire, {stats['dead']} enregistrements morts")
+            assert stats["memory_tombstones"] == 2 and stats["dead"] == 4 and stats["compaction"]["runs"] == 0
+            assert len(service._sales_by_id._state.ids) == 20 and service.get_sale_by_id("s0") is None
+            
+            # Seuil relevé pendant une série de suppressions, puis rétabli : une seule
+            # compaction des colonnes et du snapshot par le thread de compaction
+            service.compaction_min_dead = 10 ** 6
+            for i in range(2, 6):
+                service.delete_sale(f"s{i}")
+            service._compactor.flush()
+            assert service.get_storage_stats()["dead"] == 12
+            service.compaction_min_dead = 5
+            service._compactor.notify()
+            service._compactor.flush()
+            stats = service.get_storage_stats()
+            with open(sales_file) as f:
+                snapshot = json.load(f)
+            print(f"  ✅ Compaction en arrière-plan: {stats['compaction']['runs']} passe(s), {stats['compaction']['reclaimed']} récupérés")
+            assert stats["dead"] == 0 and stats["memory_tombstones"] == 0
+            assert stats["compaction"]["runs"] == 1 and stats["compaction"]["reclaimed"] == 18
+            assert len(snapshot) == 14 and os.path.getsize(journal_file) == 0
+            assert [sale["id"] for sale in service.load_sales()] == [f"s{i}" for i in range(6, 20)]
+            assert service.get_total_revenue() == 140.0 and service._sales_by_id.count_by("created_by") == {"admin": 14}
+            service.close()
+            
+            # Lectures sans verrou pendant remplacements, suppressions et compactions
+            columns = SalesColumns()
+            for i in range(2000):
+                columns[f"id{i}"] = {"id": f"id{i}", "sale_date": "2025-01-01", "note": i}
+            errors = []
+            done = threading.Event()
+            
+            def read_columns():
+                while not done.is_set():
+                    for i in range(0, 4000, 7):
+                        try:
+                            sale = columns.get(f"id{i}")
+                        except Exception as e:
+                            errors.append(repr(e))
+                            return
+                        if sale is not None and (sale["id"] != f"id{i}" or sale["note"] != i):
+                            errors.append(f"id{i} -> {sale['id']}")
+            
+            reader = threading.Thread(target=read_columns)
+            reader.start()
+            for round_number in range(30):
+                for i in range(round_number, 4000, 3):
+                    columns[f"id{i}"] = {"id": f"id{i}", "sale_date": "2025-01-02", "note": i}
+                for i in range(round_number, 4000, 5):
+                    columns.pop(f"id{i}", None)
+                columns.compact()
+            done.set()
+            reader.join()
+            print(f"  ✅ Lectures cohérentes pendant la compaction: {not errors}")
+            assert not errors, errors[:3]
+            
+            # Segments : seul le mois chargé de pierres tombales est réécrit
+            directory = os.path.join(tmp_dir, "segments")
+            segmented = SalesService(
+                storage=SegmentedSalesStorage(directory), revalidate_interval=0, compaction_min_dead=1
+            )
+            segmented.add_sales([make_sale(f"j{i}") for i in range(4)])
+            segmented.add_sales([make_sale(f"f{i}", "2025-02-10T10:00:00") for i in range(4)])
+            february = os.stat(os.path.join(directory, "2025-02.jsonl")).st_mtime_ns
+            segmented.delete_sale("j0")
+            segmented.delete_sale("j1")
+            segmented._compactor.flush()
+            segments = segmented.storage.segments()
+            untouched = os.stat(os.path.join(directory, "2025-02.jsonl")).st_mtime_ns == february
+            print(f"  ✅ Segment compacté seul: {segments['2025-01']['records'] == 2 and untouched}")
+            assert segments["2025-01"]["records"] == 2 and untouched
+            assert segmented.get_storage_stats()["dead"] == 0 and segmented.get_sales_count() == 6
+            segmented.close()
+        
+        return True
+    except Exception as e:
+        print(f"  ❌ Erreur pierres tombales: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
 def test_routers():
     """Tester que les routers sont bien configurés"""
     print("\n🛣️  Test Routers...")
@@ -159,6 +1310,22 @@ def main():
     results.append(("UserService", test_user_service()))
     results.append(("SessionService", test_session_service()))
     results.append(("SalesService", test_sales_service()))
+    results.append(("SalesJournal", test_sales_journal()))
+    results.append(("SQLiteStorage", test_sqlite_storage()))
+    results.append(("SalesRollups", test_sales_rollups()))
+    results.append(("SalesColumns", test_sales_columns()))
+    results.append(("Pagination", test_sales_pagination()))
+    results.append(("ResponseCache", test_response_cache()))
+    results.append(("SalesStream", test_sales_stream()))
+    results.append(("SalesChanges", test_sales_changes()))
+    results.append(("SalesImport", test_sales_import()))
+    results.append(("SalesSearch", test_sales_search()))
+    results.append(("SalesLeaderboard", test_sales_leaderboard()))
+    results.append(("SalesWriter", test_sales_writer()))
+    results.append(("SalesSnapshots", test_sales_snapshots()))
+    results.append(("CacheCoherence", test_cache_coherence()))
+    results.append(("SalesSegments", test_sales_segments()))
+    results.append(("TombstoneCompaction", test_tombstone_compaction()))
     results.append(("Routers", test_routers()))
     
     print("\n" + "=" * 60)
@@ -1,4 +1,7 @@
-let sales = JSON.parse(localStorage.getItem("sales")) || [];
+// Ventes reçues du serveur (flux SSE) et ventes supprimées côté serveur, par id
+const serverSales = new Map();
+const deletedIds = new Set();
+let sales = mergeSales();
 let currentFilter = "all";
 
 const tableBody = document.getElementById("fullSalesTableBody");
@@ -88,12 +91,63 @@ function renderSales(filter) {
   totalValueSpan.textContent = `${total} € (${count} vente${count > 1 ? 's' : ''})`;
 }
 
+// Ventes locales complétées par celles du serveur (la version serveur prime), par date
+function mergeSales() {
+  const local = JSON.parse(localStorage.getItem("sales")) || [];
+  const merged = local.filter(sale => !serverSales.has(String(sale.id)) && !deletedIds.has(String(sale.id)));
+  merged.push(...serverSales.values());
+  return merged.sort((a, b) => new Date(a.date) - new Date(b.date));
+}
+
+// Vente de l'API au format des ventes locales
+function fromServer(sale) {
+  return {
+    id: sale.id,
+    title: sale.product_name,
+    qty: sale.quantity,
+    price: sale.unit_price,
+    payment: sale.payment_method,
+    date: sale.sale_date,
+    synced: true
+  };
+}
+
 // Synchronisation temps réel
 function syncData() {
-  sales = JSON.parse(localStorage.getItem("sales")) || [];
+  sales = mergeSales();
   renderSales(currentFilter);
 }
 
+// Événement du flux : vente ajoutée, remplacée ou supprimée
+function applySaleEvent(event) {
+  const sale = JSON.parse(event.data);
+  if (event.type === "deleted") {
+    serverSales.delete(String(sale.id));
+    deletedIds.add(String(sale.id));
+  } else {
+    serverSales.set(String(sale.id), fromServer(sale));
+    deletedIds.delete(String(sale.id));
+  }
+  syncData();
+}
+
+// Ventes récentes relues depuis l'API (import en masse, retard du flux, navigateur sans SSE)
+function refreshFromServer() {
+  fetch("/api/sales?limit=1000")
+    .then(response => {
+      if (!response.ok) throw new Error(response.status);
+      return response.json();
+    })
+    .then(page => {
+      serverSales.clear();
+      page.sales.forEach(sale => serverSales.set(String(sale.id), fromServer(sale)));
+      syncData();
+    })
+    .catch(() => {
+      // Serveur indisponible : affichage des ventes déjà connues
+    });
+}
+
 // Écouter les changements dans d'autres onglets
 window.addEventListener('storage', (e) => {
   if (e.key === 'sales') {
@@ -101,8 +155,19 @@ window.addEventListener('storage', (e) => {
   }
 });
 
-// Rafraîchir automatiquement toutes les 5 secondes
-setInterval(syncData, 5000);
+// Ventes poussées par le serveur (Server-Sent Events) : chaque événement est appliqué
+refreshFromServer();
+if (window.EventSource) {
+  const stream = new EventSource("/api/sales/stream");
+  ["created", "updated", "deleted"].forEach(type => {
+    stream.addEventListener(type, applySaleEvent);
+  });
+  // Lot importé ou événements perdus : la liste est relue
+  stream.addEventListener("resync", refreshFromServer);
+} else {
+  // Navigateur sans SSE : relecture périodique de l'API
+  setInterval(refreshFromServer, 5000);
+}
 
 // Affichage initial
 renderSales("all");
@@ -6,6 +6,9 @@ const yearTotal = document.getElementById("yearTotal");
 const revenueTotal = document.getElementById("revenueTotal");
 
 const tableBody = document.getElementById("salesTableBody");
+const topProducts = document.getElementById("topProducts");
+const topCustomers = document.getElementById("topCustomers");
+const topCustomersTitle = document.getElementById("topCustomersTitle");
 const canvas = document.getElementById("chart");
 const ctx = canvas.getContext("2d");
 
@@ -57,13 +60,13 @@ function confirmSale() {
   const price = Number(priceInput.value);
   const payment = paymentInput.value;
 
-  if (!title || qty <= 0 || price <= 0) {
-    alert("Veuillez remplir tous les champs");
+  if (!title || !Number.isInteger(qty) || qty <= 0 || price <= 0) {
+    alert("Veuillez remplir tous les champs (quantité entière)");
     return;
   }
 
   const sale = {
-    id: Date.now(),
+    id: newSaleId(),
     title,
     qty,
     price,
@@ -75,6 +78,7 @@ function confirmSale() {
   saveSales();
   closeModal();
   render();
+  pushPendingSales();
 }
 
 /* ===============================
@@ -96,7 +100,7 @@ function renderSales() {
     const tr = document.createElement("tr");
     tr.innerHTML = `
       <td>${new Date(sale.date).toLocaleDateString()}</td>
-      <td>${sale.title}</td>
+      <td>${sale.title}${sale.rejected ? ` ⚠️ non envoyée (${sale.rejected})` : ""}</td>
       <td>${sale.qty}</td>
       <td>${sale.payment}</td>
       <td>${sale.price * sale.qty} €</td>
@@ -293,6 +297,38 @@ function drawChart() {
   ctx.stroke();
 }
 
+/* ===============================
+   CLASSEMENTS (calculés par le serveur)
+================================ */
+function loadLeaderboard() {
+  fetch("/api/sales/top?by=revenue&n=5&period=month")
+    .then(response => {
+      if (!response.ok) throw new Error(response.status);
+      return response.json();
+    })
+    .then(top => {
+      renderLeaderboard(topProducts, top.products);
+      renderLeaderboard(topCustomers, top.customers);
+      topCustomersTitle.classList.toggle("hidden", top.customers.length === 0);
+    })
+    .catch(() => {
+      // Hors ligne : le classement précédent reste affiché
+    });
+}
+
+function renderLeaderboard(list, entries) {
+  list.innerHTML = "";
+  entries.forEach(entry => {
+    const li = document.createElement("li");
+    const name = document.createElement("span");
+    const revenue = document.createElement("span");
+    name.textContent = `${entry.name} (${entry.quantity})`;
+    revenue.textContent = `${entry.revenue} €`;
+    li.append(name, revenue);
+    list.appendChild(li);
+  });
+}
+
 /* ===============================
    STOCKAGE
 ================================ */
@@ -300,6 +336,88 @@ function saveSales() {
   localStorage.setItem("sales", JSON.stringify(sales));
 }
 
+/* ===============================
+   ENVOI AU SERVEUR
+================================ */
+// Identifiant unique côté client (l'id sert de clé d'idempotence au serveur)
+function newSaleId() {
+  if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+  // Hors contexte sécurisé (http) : randomUUID indisponible, 128 bits aléatoires
+  return Array.from(crypto.getRandomValues(new Uint8Array(16)), b => b.toString(16).padStart(2, "0")).join("");
+}
+
+// Vente que le serveur refusera à coup sûr : signalée au lieu d'être renvoyée indéfiniment
+function isValidSale(sale) {
+  return Boolean(sale.title) && Number.isInteger(sale.qty) && sale.qty > 0 &&
+    Number.isFinite(sale.price) && sale.price >= 0 && !isNaN(new Date(sale.date));
+}
+
+function toPayload(sale) {
+  return {
+    id: String(sale.id),
+    product_name: sale.title,
+    quantity: sale.qty,
+    unit_price: sale.price,
+    // Décalage explicite : "Z" n'est pas lu par datetime.fromisoformat avant Python 3.11
+    sale_date: new Date(sale.date).toISOString().replace("Z", "+00:00"),
+    payment_method: sale.payment
+  };
+}
+
+// Seules les ventes pas encore envoyées partent (l'envoi est rejouable sans doublon)
+function pushPendingSales() {
+  const pending = sales.filter(sale => !sale.synced && !sale.rejected);
+  pending.filter(sale => !isValidSale(sale)).forEach(sale => {
+    sale.rejected = "invalide";
+  });
+  const valid = pending.filter(sale => !sale.rejected);
+  if (valid.length < pending.length) saveSales();
+  if (valid.length === 0) return;
+
+  sendSales(valid)
+    .then(() => {
+      saveSales();
+      loadLeaderboard();
+    })
+    .catch(() => {
+      // Hors ligne ou serveur indisponible : nouvel essai au prochain chargement
+    });
+}
+
+function sendSales(batch) {
+  return fetch("/api/sales", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(batch.map(toPayload))
+  }).then(response => {
+    if (response.status === 422) {
+      // Lot refusé en entier : vente par vente pour isoler la ou les lignes fautives
+      if (batch.length > 1) {
+        return Promise.all(batch.map(sale => sendSales([sale])));
+      }
+      markSales(batch, () => "invalide");
+      return;
+    }
+    if (!response.ok) throw new Error(response.status);
+    return response.json().then(result => {
+      // Id déjà utilisé par un autre vendeur : jamais accepté, inutile de renvoyer
+      const conflicts = new Set(result.conflicts || []);
+      markSales(batch, sale => (conflicts.has(String(sale.id)) ? "conflit" : null));
+    });
+  });
+}
+
+// Le tableau a pu être rechargé entre-temps : marquage par id
+function markSales(batch, rejection) {
+  const outcomes = new Map(batch.map(sale => [sale.id, rejection(sale)]));
+  sales.forEach(sale => {
+    if (!outcomes.has(sale.id)) return;
+    const rejected = outcomes.get(sale.id);
+    if (rejected) sale.rejected = rejected;
+    else sale.synced = true;
+  });
+}
+
 /* ===============================
    SYNCHRONISATION TEMPS RÉEL
 ================================ */
@@ -322,4 +440,6 @@ setInterval(syncData, 5000);
 /* ===============================
    INIT
 ================================ */
-render();
\ No newline at end of file
+render();
+pushPendingSales();
+loadLeaderboard();
\ No newline at end of file